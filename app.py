@@ -15,11 +15,15 @@ def create_app():
 		pass
 
 	db.init_app(app)
+	from services import database
+	database.init_app(app)
 	
 	# import models BEFORE init_app so user_loader is registered
 	from models.user import User
 	from models.blog import Post, Comment, Like
 	from models.product import Product
+	from models.image import StoredImage
+	from models.order import Order, OrderItem
 	
 	login_manager.init_app(app)
 
@@ -43,9 +47,32 @@ def create_app():
 		# blog blueprint may not exist during early development
 		pass
 
-	# create database tables if they don't exist
+	# marketplace orders (stock reservations)
+	from routes.orders import orders_bp
+	app.register_blueprint(orders_bp)
+
+	# fingerprinted, far-future cacheable static files and uploads
+	from routes.assets import assets_bp
+	from services.assets import asset_url
+	app.register_blueprint(assets_bp)
+	app.add_template_global(asset_url)
+
+	# uploaded image helpers for templates
+	from services.images import upload_url, upload_srcset, responsive_image, image_ready
+	app.add_template_global(upload_url)
+	app.add_template_global(upload_srcset)
+	app.add_template_global(responsive_image)
+	app.add_template_global(image_ready)
+
+	# proximity search; importing it also starts geocoding locations/addresses
+	from services.geo import distance_km
+	app.add_template_global(distance_km)
+
+	# create or upgrade the database schema
 	with app.app_context():
-		db.create_all()
+		from migrations import upgrade
+		for name in upgrade():
+			print(f"[setup] Applied migration {name}.")
 
 		# Ensure there is at least one admin user. Credentials can be provided via
 		# environment variables: ADMIN_USERNAME, ADMIN_EMAIL, ADMIN_PASSWORD.
@@ -81,4 +108,8 @@ def create_app():
 
 if __name__ == '__main__':
 	app = create_app()
+	# pick up uploads a previous run accepted but never processed; deployments
+	# run scripts/resume_uploads.py instead, once rather than per worker
+	from services.images import resume_pending
+	resume_pending(app)
 	app.run(debug=True)
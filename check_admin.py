@@ -1,5 +1,6 @@
 from app import create_app
 from models.user import User
+from services.passwords import needs_rehash
 
 app = create_app()
 with app.app_context():
@@ -9,6 +10,7 @@ with app.app_context():
         print(f'✓ Admin email: {admin.email}')
         print(f'✓ Admin role: {admin.role}')
         print(f'✓ Password hash: {admin.password_hash}')
+        print(f'✓ Hash uses current parameters: {not needs_rehash(admin.password_hash)}')
         # Test password check
         result = admin.check_password('admin123')
         print(f'Password check result: {result}')
@@ -7,12 +7,123 @@ class Config:
 	SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or \
 		'sqlite:///' + os.path.join(basedir, 'instance', 'app.db')
 	SQLALCHEMY_TRACK_MODIFICATIONS = False
+	# Applied to every new SQLite connection (see services/database.py). WAL
+	# lets readers and a writer work at once; writers queue for up to
+	# busy_timeout ms instead of failing with "database is locked".
+	SQLITE_PRAGMAS = {
+		'journal_mode': 'wal',
+		'synchronous': 'normal',
+		'busy_timeout': int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000)),
+		'cache_size': -16000,  # KiB per connection
+		'mmap_size': 128 * 1024 * 1024,
+	}
+	# Connection pool for server databases (PostgreSQL, MySQL): connections
+	# kept open per process, extra ones allowed under bursts, seconds to wait
+	# for a free one, and recycling before the server drops idle connections.
+	DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+	DB_POOL_MAX_OVERFLOW = int(os.environ.get('DB_POOL_MAX_OVERFLOW', 20))
+	DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 10))
+	DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+	SQLALCHEMY_ENGINE_OPTIONS = {} if SQLALCHEMY_DATABASE_URI.startswith('sqlite') else {
+		'pool_size': DB_POOL_SIZE,
+		'max_overflow': DB_POOL_MAX_OVERFLOW,
+		'pool_timeout': DB_POOL_TIMEOUT,
+		'pool_recycle': DB_POOL_RECYCLE,
+		'pool_pre_ping': True,
+	}
+	# Read replicas, comma-separated (e.g. two SQLite files locally). GET/HEAD
+	# requests read from one of them; writes and POST handlers use the
+	# primary. After writing, a visitor reads from the primary for
+	# REPLICA_STICKY_SECONDS (longer than the replicas' usual lag).
+	DATABASE_REPLICA_URLS = [url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+	SQLALCHEMY_BINDS = {f'replica{n}': url for n, url in enumerate(DATABASE_REPLICA_URLS)}
+	REPLICA_BINDS = tuple(SQLALCHEMY_BINDS)
+	REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 10))
+	
+	# Seconds the admin dashboard statistics stay cached
+	STATS_CACHE_TTL = int(os.environ.get('STATS_CACHE_TTL', 30))
+	# Seconds the logged-in user's row is reused across requests in this process
+	# (0 = query it on every request). Role/profile changes are seen immediately
+	# by the process that made them, and by other processes after this delay.
+	USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 0))
+	
+	# Listings switch from ?page=N to keyset cursors after this many pages
+	KEYSET_SHALLOW_PAGES = 5
+	
+	# Products list facets (services/facets.py): seconds the counts stay cached
+	# (changes to products discard them sooner), combinations kept, and how
+	# many locations are offered
+	FACET_CACHE_TTL = int(os.environ.get('FACET_CACHE_TTL', 300))
+	FACET_CACHE_SIZE = 512
+	FACET_LOCATIONS = 12
+	
+	# Offline gazetteer (name, province, latitude, longitude, aliases) that
+	# product locations and user addresses are geocoded with
+	GAZETTEER_PATH = os.environ.get('GAZETTEER_PATH') or os.path.join(basedir, 'data', 'gazetteer.csv')
+	
+	# Search backend: 'fts5' (SQLite full-text) or 'like'; unset picks fts5 on SQLite
+	SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND')
+	# Matches ranked per search (newest first), bounding latency on broad words
+	SEARCH_RANK_WINDOW = 500
+	# Posts per page on the blog and discussions listings
+	POSTS_PER_PAGE = 10
+	# Rendered public pages for anonymous visitors (see services/page_cache.py);
+	# PAGE_CACHE_URL = 'redis://...' shares the cache between workers
+	PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL', 60))
+	PAGE_CACHE_SIZE = 256
+	PAGE_CACHE_URL = os.environ.get('PAGE_CACHE_URL')
+	
+	# Password hashing: any Werkzeug method ('scrypt', 'scrypt:32768:8:1',
+	# 'pbkdf2:sha256:600000'). Hashes made with other settings are upgraded on
+	# the user's next successful login.
+	PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+	PASSWORD_SALT_LENGTH = 16
+	# Threads computing hashes (default: one per CPU) and how many more
+	# requests may wait for one before logins are turned away with a 503
+	PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 0)) or None
+	PASSWORD_HASH_QUEUE = 32
+	# Sliding-window limits as (events, seconds): sign-in attempts per IP,
+	# failed sign-ins per account, registrations per IP. Checked before any
+	# password is hashed. RATE_LIMIT_URL = 'redis://...' shares the counters
+	# between workers.
+	RATE_LIMITS = {
+		'login-ip': (20, 60),
+		'login-account': (5, 300),
+		'register-ip': (10, 3600),
+	}
+	RATE_LIMIT_URL = os.environ.get('RATE_LIMIT_URL')
+	
+	# Seconds a checkout holds stock before the order expires unconfirmed
+	RESERVATION_SECONDS = int(os.environ.get('RESERVATION_SECONDS', 15 * 60))
 	
 	# Image upload configuration
 	UPLOAD_FOLDER = os.path.join(basedir, 'static', 'uploads')
 	MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16 MB max file size
 	ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 	
+	# Uploaded images are resized by a background thread pool
+	IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', 2))
+	IMAGE_PROCESSING_SYNC = False  # process inline instead (scripts, debugging)
+	# Responsive variants: widths (px) and modern formats, besides the fallback
+	IMAGE_WIDTHS = (160, 400, 800, 1600)
+	IMAGE_FORMATS = ('avif', 'webp')
+	# Largest bitmap an upload may decode to (JPEGs count at their reduced scale)
+	IMAGE_DECODE_BUDGET = int(os.environ.get('IMAGE_DECODE_BUDGET', 128 * 1024 * 1024))
+	# Where processed images are stored: 'local' (UPLOAD_FOLDER) or 's3'.
+	# S3_ENDPOINT_URL may be file:///some/dir to use a local stand-in bucket.
+	UPLOAD_STORAGE = os.environ.get('UPLOAD_STORAGE', 'local')
+	S3_BUCKET = os.environ.get('S3_BUCKET')
+	S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL')
+	S3_PUBLIC_URL = os.environ.get('S3_PUBLIC_URL')
+	
+	# Fingerprinted assets (/assets/<hash>/...) are cached by browsers for a year.
+	# Behind nginx, set ASSET_ACCEL_REDIRECT to an internal location aliased to
+	# static/ (e.g. '/_static') so nginx sends the file; USE_X_SENDFILE does the
+	# same for Apache/lighttpd.
+	ASSET_MAX_AGE = 365 * 24 * 3600
+	ASSET_ACCEL_REDIRECT = os.environ.get('ASSET_ACCEL_REDIRECT')
+	USE_X_SENDFILE = os.environ.get('USE_X_SENDFILE', '').lower() in ('1', 'true', 'yes')
+	
 	# Ensure upload folder exists
 	os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 
@@ -2,6 +2,7 @@ from flask_wtf import FlaskForm
 from flask_wtf.file import FileField, FileAllowed
 from wtforms import StringField, PasswordField, SubmitField, SelectField, TextAreaField
 from wtforms.validators import DataRequired, Email, EqualTo, Length, Optional
+from forms.validators import DecodableImage
 
 
 class RegistrationForm(FlaskForm):
@@ -23,6 +24,6 @@ class ProfileForm(FlaskForm):
     phone = StringField('Phone', validators=[Optional(), Length(max=20)])
     address = StringField('Address', validators=[Optional(), Length(max=255)])
     bio = TextAreaField('Bio', validators=[Optional(), Length(max=500)])
-    profile_image = FileField('Profile Image', validators=[FileAllowed(['jpg', 'jpeg', 'png', 'gif', 'webp'], 'Images only!')])
+    profile_image = FileField('Profile Image', validators=[FileAllowed(['jpg', 'jpeg', 'png', 'gif', 'webp'], 'Images only!'), DecodableImage()])
     submit = SubmitField('Complete Profile')
 
@@ -2,6 +2,7 @@ from flask_wtf import FlaskForm
 from flask_wtf.file import FileField, FileAllowed
 from wtforms import StringField, TextAreaField, SubmitField
 from wtforms.validators import DataRequired, Length
+from forms.validators import DecodableImage
 
 
 class PostForm(FlaskForm):
@@ -13,7 +14,7 @@ class PostForm(FlaskForm):
         DataRequired('Content is required'),
         Length(min=10, message='Content must be at least 10 characters')
     ])
-    post_image = FileField('Post Image', validators=[FileAllowed(['jpg', 'jpeg', 'png', 'gif', 'webp'], 'Images only!')])
+    post_image = FileField('Post Image', validators=[FileAllowed(['jpg', 'jpeg', 'png', 'gif', 'webp'], 'Images only!'), DecodableImage()])
     submit = SubmitField('Post')
 
 
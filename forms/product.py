@@ -1,7 +1,8 @@
 from flask_wtf import FlaskForm
-from flask_wtf.file import FileField, FileAllowed
+from flask_wtf.file import FileField, FileAllowed, FileRequired
 from wtforms import StringField, SelectField, TextAreaField, SubmitField, IntegerField, FloatField, BooleanField
 from wtforms.validators import DataRequired, Length, NumberRange, Optional
+from forms.validators import DecodableImage
 
 
 class ProductForm(FlaskForm):
@@ -37,6 +38,28 @@ class ProductForm(FlaskForm):
         DataRequired('Contact is required'),
         Length(min=10, max=20, message='Contact must be between 10 and 20 characters')
     ])
-    product_image = FileField('Product Image', validators=[FileAllowed(['jpg', 'jpeg', 'png', 'gif', 'webp'], 'Images only!')])
+    product_image = FileField('Product Image', validators=[FileAllowed(['jpg', 'jpeg', 'png', 'gif', 'webp'], 'Images only!'), DecodableImage()])
     terms = BooleanField('I agree to the marketplace terms and conditions', validators=[DataRequired()])
     submit = SubmitField('List Product')
+
+
+class ProductRowForm(ProductForm):
+    """One row of a bulk import: ProductForm's rules, with the image named
+    (a file in the uploaded archive) instead of uploaded"""
+    class Meta:
+        csrf = False
+
+    product_image = None
+    terms = None
+    submit = None
+    image = StringField('Image', validators=[Optional(), Length(max=255)])
+
+
+class ProductImportForm(FlaskForm):
+    products_file = FileField('Products file (CSV or JSON Lines)', validators=[
+        FileRequired('Choose a file to import'),
+        FileAllowed(['csv', 'jsonl', 'ndjson'], 'CSV or JSON Lines files only')
+    ])
+    images = FileField('Images (ZIP archive, optional)', validators=[FileAllowed(['zip'], 'ZIP archives only')])
+    terms = BooleanField('Every listed product follows the marketplace terms and conditions', validators=[DataRequired()])
+    submit = SubmitField('Import Products')
@@ -0,0 +1,14 @@
+from wtforms.validators import ValidationError
+from services.images import ImageRejected, inspect_upload
+
+
+class DecodableImage:
+    """Reject uploads that are not images or would decode past the memory budget"""
+
+    def __call__(self, form, field):
+        if not field.data or not getattr(field.data, 'filename', None):
+            return
+        try:
+            inspect_upload(field.data)
+        except ImageRejected as exc:
+            raise ValidationError(str(exc))
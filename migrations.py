@@ -0,0 +1,132 @@
+"""Ordered, idempotent schema migrations.
+
+``upgrade()`` runs at startup in place of a bare ``db.create_all()``. Each
+migration is applied once, in order, and recorded in the ``schema_migrations``
+table. Migrations inspect the live schema before changing it, so they are
+safe both on a brand-new database (where the initial step already builds the
+current schema) and on older databases created before the change existed.
+
+To change the schema: update the model, then append a migration here that
+brings an existing database to the same shape.
+"""
+from datetime import datetime
+from sqlalchemy import inspect, text
+from extensions import db
+from models.image import StoredImage
+from models.order import Order, OrderItem
+from services import geo
+from services.search import SQLiteFTSBackend
+
+schema_migrations = db.Table(
+    'schema_migrations', db.metadata,
+    db.Column('name', db.String(100), primary_key=True),
+    db.Column('applied_at', db.DateTime, nullable=False),
+)
+
+
+def _add_missing_columns(conn, table, columns):
+    existing = {column['name'] for column in inspect(conn).get_columns(table)}
+    for name, ddl in columns:
+        if name not in existing:
+            conn.execute(text(f'ALTER TABLE {table} ADD COLUMN {name} {ddl}'))
+
+
+def _create_model_indexes(conn, *tables):
+    for table in tables:
+        existing = {column['name'] for column in inspect(conn).get_columns(table)}
+        for index in db.metadata.tables[table].indexes:
+            # an index on columns a later migration adds is created by that migration
+            if {column.name for column in index.columns} <= existing:
+                index.create(conn, checkfirst=True)
+
+
+def initial_schema(conn):
+    """Create any missing tables from the models"""
+    db.metadata.create_all(conn)
+
+
+def post_counters(conn):
+    """Denormalized like/comment counters on posts, backfilled from their tables"""
+    _add_missing_columns(conn, 'posts', [
+        ('like_count', 'INTEGER NOT NULL DEFAULT 0'),
+        ('comment_count', 'INTEGER NOT NULL DEFAULT 0'),
+    ])
+    conn.execute(text(
+        'UPDATE posts SET '
+        'like_count = (SELECT COUNT(*) FROM likes WHERE likes.post_id = posts.id), '
+        'comment_count = (SELECT COUNT(*) FROM comments WHERE comments.post_id = posts.id)'
+    ))
+
+
+def hot_path_indexes(conn):
+    """Indexes for the listing, filtering and cascade query shapes"""
+    _create_model_indexes(conn, 'users', 'posts', 'comments', 'likes', 'products')
+
+
+def search_index(conn):
+    """Full-text search tables (SQLite FTS5), filled from existing rows"""
+    if conn.dialect.name != 'sqlite':
+        return
+    SQLiteFTSBackend.create_schema(conn)
+    SQLiteFTSBackend.rebuild(conn)
+
+
+def stored_images(conn):
+    """Reference-counted table of deduplicated uploads"""
+    StoredImage.__table__.create(conn, checkfirst=True)
+
+
+def orders(conn):
+    """Orders holding reserved product stock, and their line items"""
+    Order.__table__.create(conn, checkfirst=True)
+    OrderItem.__table__.create(conn, checkfirst=True)
+    _create_model_indexes(conn, 'orders', 'order_items')
+
+
+def product_facets(conn):
+    """Indexes for faceted filtering of the products list"""
+    _create_model_indexes(conn, 'products')
+
+
+def geo_coordinates(conn):
+    """Coordinates for product locations and user addresses from the gazetteer, and their index"""
+    for table in ('products', 'users'):
+        _add_missing_columns(conn, table, [('latitude', 'FLOAT'), ('longitude', 'FLOAT')])
+    _create_model_indexes(conn, 'products', 'users')
+    geo.backfill(conn)
+
+
+MIGRATIONS = [
+    ('0001_initial_schema', initial_schema),
+    ('0002_post_counters', post_counters),
+    ('0003_hot_path_indexes', hot_path_indexes),
+    ('0004_search_index', search_index),
+    ('0005_stored_images', stored_images),
+    ('0006_orders', orders),
+    ('0007_product_facets', product_facets),
+    ('0008_geo_coordinates', geo_coordinates),
+]
+
+
+def upgrade(engine=None):
+    """
+    Apply pending migrations
+    Args:
+        engine: engine to migrate (defaults to the app's ``db.engine``)
+    Returns:
+        list: names of the migrations applied by this call
+    """
+    engine = engine or db.engine
+    with engine.begin() as conn:
+        schema_migrations.create(conn, checkfirst=True)
+        applied = set(conn.execute(db.select(schema_migrations.c.name)).scalars())
+
+    newly_applied = []
+    for name, migrate in MIGRATIONS:
+        if name in applied:
+            continue
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.execute(schema_migrations.insert().values(name=name, applied_at=datetime.utcnow()))
+        newly_applied.append(name)
+    return newly_applied
@@ -1,5 +1,6 @@
 from extensions import db
 from datetime import datetime
+from flask import g, has_app_context
 
 
 class Post(db.Model):
@@ -12,16 +13,22 @@ class Post(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Denormalized engagement counters, maintained by services/counters.py
+    like_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
     # Relationships
     user = db.relationship('User', backref=db.backref('posts', lazy=True, cascade='all, delete-orphan'))
     comments = db.relationship('Comment', backref=db.backref('post', lazy=True, single_parent=True), cascade='all, delete-orphan')
     likes = db.relationship('Like', backref=db.backref('post', lazy=True), cascade='all, delete-orphan')
     
-    def like_count(self):
-        return len(self.likes)
-    
     def is_liked_by(self, user):
-        return Like.query.filter_by(post_id=self.id, user_id=user.id).first() is not None
+        return self.id in liked_post_ids(user, [self.id])
+
+
+# Listing pages: newest first, and a user's own posts for cascades
+db.Index('ix_posts_created_at', Post.created_at.desc())
+db.Index('ix_posts_user_id', Post.user_id)
 
 
 class Comment(db.Model):
@@ -36,6 +43,11 @@ class Comment(db.Model):
     user = db.relationship('User', backref=db.backref('comments', lazy=True, cascade='all, delete-orphan'))
 
 
+# view_post: a post's comments newest first
+db.Index('ix_comments_post_id_created_at', Comment.post_id, Comment.created_at.desc())
+db.Index('ix_comments_user_id', Comment.user_id)
+
+
 class Like(db.Model):
     __tablename__ = 'likes'
     id = db.Column(db.Integer, primary_key=True)
@@ -47,4 +59,44 @@ class Like(db.Model):
     user = db.relationship('User', backref=db.backref('likes', lazy=True, cascade='all, delete-orphan'))
     
     # Unique constraint: one like per user per post
-    __table_args__ = (db.UniqueConstraint('user_id', 'post_id', name='unique_user_post_like'),)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'post_id', name='unique_user_post_like'),
+        db.Index('ix_likes_post_id', 'post_id'),
+    )
+
+
+def liked_post_ids(user, post_ids):
+    """
+    Resolve which of the given posts a user has liked
+    Args:
+        user: the viewing user (anonymous users have liked nothing)
+        post_ids: iterable of post ids, e.g. the ids on the current page
+    Returns:
+        set: the subset of post_ids liked by the user
+
+    Ids not seen yet in this request are fetched with a single IN (...) query;
+    answers are memoized on ``flask.g`` so repeated ``Post.is_liked_by`` calls
+    while rendering cost nothing. Call it once with a whole page of ids to
+    prime the cache before a listing renders.
+    """
+    if not getattr(user, 'is_authenticated', False):
+        return set()
+    post_ids = list(post_ids)
+    if has_app_context():
+        cache = g.setdefault('_liked_posts', {}).setdefault(user.id, {})
+    else:
+        cache = {}
+    missing = [post_id for post_id in post_ids if post_id not in cache]
+    if missing:
+        found = set(db.session.scalars(
+            db.select(Like.post_id).where(Like.user_id == user.id, Like.post_id.in_(missing))
+        ))
+        for post_id in missing:
+            cache[post_id] = post_id in found
+    return {post_id for post_id in post_ids if cache[post_id]}
+
+
+def forget_liked(user, post_id):
+    """Drop a memoized liked-set answer after the user (un)likes a post"""
+    if has_app_context():
+        g.get('_liked_posts', {}).get(user.id, {}).pop(post_id, None)
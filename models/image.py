@@ -0,0 +1,16 @@
+from extensions import db
+from datetime import datetime
+
+
+class StoredImage(db.Model):
+    """One unique uploaded image (per folder), shared by every row that uses it"""
+    __tablename__ = 'stored_images'
+    id = db.Column(db.Integer, primary_key=True)
+    folder = db.Column(db.String(20), nullable=False)
+    digest = db.Column(db.String(64), nullable=False)  # sha256 of the raw upload
+    key = db.Column(db.String(255), nullable=False)  # current image key (pending or processed)
+    refcount = db.Column(db.Integer, nullable=False, default=1)
+    size = db.Column(db.Integer, nullable=False, default=0)  # raw upload bytes
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (db.UniqueConstraint('folder', 'digest', name='unique_folder_digest'),)
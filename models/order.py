@@ -0,0 +1,43 @@
+from extensions import db
+from datetime import datetime
+
+
+class Order(db.Model):
+    """A checkout: stock held for a buyer until confirmed, cancelled or expired"""
+    __tablename__ = 'orders'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, confirmed, cancelled, expired
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False)  # pending orders are released after this
+    confirmed_at = db.Column(db.DateTime)
+
+    # Relationships
+    user = db.relationship('User', backref=db.backref('orders', lazy=True, cascade='all, delete-orphan'))
+    items = db.relationship('OrderItem', backref=db.backref('order', lazy=True), cascade='all, delete-orphan')
+
+    @property
+    def total(self):
+        return sum(item.price * item.quantity for item in self.items)
+
+
+# expiry sweep: pending orders by deadline; "my orders" newest first
+db.Index('ix_orders_status_expires_at', Order.status, Order.expires_at)
+db.Index('ix_orders_user_id_created_at', Order.user_id, Order.created_at.desc())
+
+
+class OrderItem(db.Model):
+    __tablename__ = 'order_items'
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), nullable=False)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id'))  # None once the listing is deleted
+    name = db.Column(db.String(255), nullable=False)  # product name and price at checkout
+    price = db.Column(db.Float, nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+
+    # Relationships
+    product = db.relationship('Product', backref=db.backref('order_items', lazy=True))
+
+
+db.Index('ix_order_items_order_id', OrderItem.order_id)
+db.Index('ix_order_items_product_id', OrderItem.product_id)
@@ -13,9 +13,23 @@ class Product(db.Model):
     location = db.Column(db.String(255), nullable=False)
     contact = db.Column(db.String(20), nullable=False)
     product_image = db.Column(db.String(255))  # stores filename
+    latitude = db.Column(db.Float)  # geocoded from location (services/geo.py)
+    longitude = db.Column(db.Float)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     user = db.relationship('User', backref=db.backref('products', lazy=True, cascade='all, delete-orphan'))
+
+
+# products_list: newest first, optionally narrowed to one category
+db.Index('ix_products_category_created_at', Product.category, Product.created_at.desc())
+db.Index('ix_products_created_at', Product.created_at.desc())
+db.Index('ix_products_user_id', Product.user_id)
+# products_list facets: one covering index for the grouped counts (services/facets.py),
+# and newest first within a location
+db.Index('ix_products_facets', Product.category, Product.location, Product.price, Product.quantity)
+db.Index('ix_products_location_created_at', Product.location, Product.created_at.desc())
+# proximity search on databases without an R*Tree (services/geo.py)
+db.Index('ix_products_latitude_longitude', Product.latitude, Product.longitude)
@@ -1,6 +1,10 @@
+import threading
+import time
 from extensions import db, login_manager
+from flask import current_app
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy.orm import defer, make_transient_to_detached
+from services.passwords import hash_password, needs_rehash, verify_password
 
 
 class User(UserMixin, db.Model):
@@ -9,20 +13,86 @@ class User(UserMixin, db.Model):
     username = db.Column(db.String(64), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(128), nullable=False)
-    role = db.Column(db.String(20), nullable=False)
+    role = db.Column(db.String(20), nullable=False, index=True)
     profile_complete = db.Column(db.Boolean, default=False)
     phone = db.Column(db.String(20))
     address = db.Column(db.String(255))
+    latitude = db.Column(db.Float)  # geocoded from address (services/geo.py)
+    longitude = db.Column(db.Float)
     bio = db.Column(db.Text)
     profile_image = db.Column(db.String(255))  # stores filename
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return verify_password(self.password_hash, password)
+
+    def upgrade_password_hash(self, password):
+        """Rehash with the current parameters if the stored hash is outdated (call after a successful check)"""
+        if needs_rehash(self.password_hash):
+            self.set_password(password)
+            return True
+        return False
+
+
+# proximity search on databases without an R*Tree (services/geo.py)
+db.Index('ix_users_latitude_longitude', User.latitude, User.longitude)
+
+
+# Built once: primary-key lookup leaving out columns most requests never
+# touch (bio, password_hash are loaded on first access instead)
+_load_user_stmt = db.select(User).options(defer(User.bio), defer(User.password_hash)).where(
+    User.id == db.bindparam('user_id'))
+
+_identity_lock = threading.Lock()
+_identity_cache = {}  # user id -> (expires, column values)
+_identity_generation = {}  # user id -> bumped by forget_user()
+
+
+def _from_cache(user_id):
+    with _identity_lock:
+        entry = _identity_cache.get(user_id)
+    if entry is None or entry[0] <= time.monotonic():
+        return None
+    user = User(**entry[1])
+    make_transient_to_detached(user)  # deferred columns stay unloaded (lazy)
+    return db.session.merge(user, load=False)
+
+
+def _remember(user, ttl, generation):
+    values = {attr.key: user.__dict__[attr.key] for attr in User.__mapper__.column_attrs
+              if attr.key in user.__dict__}
+    with _identity_lock:
+        # skip if forget_user() ran while this row was being loaded
+        if _identity_generation.get(user.id, 0) == generation:
+            _identity_cache[user.id] = (time.monotonic() + ttl, values)
+
+
+def forget_user(user_id):
+    """Drop a user from the identity cache after their row changes (role, profile, deletion)"""
+    with _identity_lock:
+        _identity_cache.pop(user_id, None)
+        _identity_generation[user_id] = _identity_generation.get(user_id, 0) + 1
 
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    """
+    Load the logged-in user once per request
+    One primary-key SELECT with the heavy columns deferred. With
+    USER_CACHE_TTL > 0 the loaded columns are also kept in a per-process
+    cache for that many seconds, skipping the query entirely.
+    """
+    user_id = int(user_id)
+    ttl = current_app.config.get('USER_CACHE_TTL', 0)
+    if ttl:
+        user = _from_cache(user_id)
+        if user is not None:
+            return user
+        with _identity_lock:
+            generation = _identity_generation.get(user_id, 0)
+    user = db.session.execute(_load_user_stmt, {'user_id': user_id}).scalar_one_or_none()
+    if ttl and user is not None:
+        _remember(user, ttl, generation)
+    return user
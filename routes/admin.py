@@ -1,8 +1,14 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, abort
 from extensions import db
-from models.user import User
-from models.blog import Post, Comment, Like
+from models.user import User, forget_user
 from flask_login import login_required, current_user
+from services.counters import release_user_engagement
+from services.feed import post_feed_query
+from services.stats import dashboard_stats, invalidate_stats
+from services.page_cache import invalidate_pages
+from services.search import remove_user_documents
+from services.orders import release_user_orders
+from services.passwords import PasswordHashBusy
 
 admin_bp = Blueprint('admin', __name__, template_folder='../templates/admin', url_prefix='/admin')
 
@@ -17,40 +23,13 @@ def admin_required():
 def index():
     admin_required()
     
-    # Get statistics
-    total_users = User.query.count()
-    admin_users = User.query.filter_by(role='admin').count()
-    consultant_users = User.query.filter_by(role='consultant').count()
-    farmer_users = User.query.filter_by(role='farmer').count()
-    vendor_users = User.query.filter_by(role='vendor').count()
-    customer_users = User.query.filter_by(role='customer').count()
-    
-    total_posts = Post.query.count()
-    total_comments = Comment.query.count()
-    total_likes = Like.query.count()
+    stats = dashboard_stats()
     
     # Get recent users
     recent_users = User.query.order_by(User.id.desc()).limit(5).all()
     
     # Get recent posts
-    recent_posts = Post.query.order_by(Post.created_at.desc()).limit(5).all()
-    
-    # Prepare role distribution for chart
-    role_stats = {
-        'admin': admin_users,
-        'consultant': consultant_users,
-        'farmer': farmer_users,
-        'vendor': vendor_users,
-        'customer': customer_users
-    }
-    
-    stats = {
-        'total_users': total_users,
-        'total_posts': total_posts,
-        'total_comments': total_comments,
-        'total_likes': total_likes,
-        'role_stats': role_stats
-    }
+    recent_posts = post_feed_query().limit(5).all()
     
     return render_template('admin/dashboard.html', stats=stats, recent_users=recent_users, recent_posts=recent_posts)
 
@@ -75,6 +54,8 @@ def change_role(user_id):
         return redirect(url_for('admin.users'))
     user.role = new_role
     db.session.commit()
+    forget_user(user.id)
+    invalidate_stats()
     flash(f"Updated role for {user.username} to {new_role}", 'success')
     return redirect(url_for('admin.users'))
 
@@ -87,8 +68,14 @@ def delete_user(user_id):
     if user.id == current_user.id:
         flash('You cannot delete yourself.', 'warning')
         return redirect(url_for('admin.users'))
+    release_user_engagement(user.id)
+    release_user_orders(user.id)
+    remove_user_documents(user.id)
     db.session.delete(user)
     db.session.commit()
+    forget_user(user_id)
+    invalidate_stats()
+    invalidate_pages('products', 'posts')
     flash('User deleted.', 'info')
     return redirect(url_for('admin.users'))
 
@@ -108,15 +95,24 @@ def edit_user(user_id):
             flash('Username and email are required.', 'warning')
             return redirect(url_for('admin.edit_user', user_id=user.id))
 
+        roles = ['admin', 'customer', 'consultant', 'farmer', 'vendor']
+        if password:
+            # hash first, so a busy pool leaves the user untouched
+            try:
+                user.set_password(password)
+            except PasswordHashBusy:
+                flash('The server is busy, please try again in a moment.', 'warning')
+                return render_template('admin/edit.html', user=user, roles=roles), 503
+
         user.username = username
         user.email = email
-        if role in ('admin', 'customer', 'consultant', 'farmer', 'vendor'):
+        if role in roles:
             user.role = role
 
-        if password:
-            user.set_password(password)
-
         db.session.commit()
+        forget_user(user.id)
+        invalidate_stats()
+        invalidate_pages('products', 'posts')
         flash('User updated.', 'success')
         return redirect(url_for('admin.users'))
 
@@ -0,0 +1,36 @@
+import mimetypes
+from flask import Blueprint, abort, current_app, send_from_directory
+from services.assets import file_fingerprint, normalize, resolve
+
+assets_bp = Blueprint('assets', __name__)
+
+
+@assets_bp.route('/assets/<fingerprint>/<path:filename>')
+def serve(fingerprint, filename):
+    """Serve a fingerprinted static file or upload (see services/assets.py)"""
+    directory, name = resolve(filename)
+    current = file_fingerprint(filename) if name else None
+    if current is None:
+        abort(404)
+
+    accel_prefix = current_app.config.get('ASSET_ACCEL_REDIRECT')
+    if accel_prefix:
+        # the front proxy (nginx internal location) sends the file itself
+        response = current_app.response_class(mimetype=mimetypes.guess_type(name)[0])
+        response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + normalize(filename)
+        response.set_etag(current)
+    else:
+        # handles If-None-Match / If-Modified-Since / Range, and X-Sendfile
+        # when USE_X_SENDFILE is on
+        response = send_from_directory(directory, name, etag=current)
+
+    if fingerprint == current:
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = current_app.config.get('ASSET_MAX_AGE', 31536000)
+        response.cache_control.immutable = True
+    else:
+        # a page rendered before the file changed: serve it, but don't pin it
+        response.cache_control.no_cache = True
+        response.cache_control.max_age = None
+    return response
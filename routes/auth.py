@@ -1,17 +1,30 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request
+import zipfile
+from flask import Blueprint, render_template, redirect, url_for, flash, request, Response, stream_with_context, current_app
 from extensions import db
-from models.user import User
+from models.user import User, forget_user
 from models.blog import Post
 from models.product import Product
 from forms.auth import RegistrationForm, LoginForm, ProfileForm
-from forms.product import ProductForm
+from forms.product import ProductForm, ProductImportForm
 from flask_login import login_user, logout_user, login_required, current_user
+from sqlalchemy.orm import joinedload
 from utils import save_picture, delete_picture
+from services.feed import paginate_feed
+from services.stats import invalidate_stats
+from services.page_cache import cache_page, invalidate_pages
+from services.pagination import paginate_newest
+from services.facets import DEFAULT_RADIUS_KM, RADII_KM, ProductFilters, facet_counts
+from services.geo import geocode, nearest
+from services.search import search as run_search, index_document, INDEXES
+from services.passwords import PasswordHashBusy
+from services import rate_limit
+from services.catalog import ImageArchive, ImportFormatError, export_products, format_for, import_products, read_rows
 
 auth_bp = Blueprint('auth', __name__, template_folder='../templates')
 
 
 @auth_bp.route('/')
+@cache_page()
 def index():
     return render_template('home.html')
 
@@ -22,6 +35,12 @@ def register():
         return redirect(url_for('auth.dashboard'))
     form = RegistrationForm()
     if form.validate_on_submit():
+        wait = rate_limit.blocked(('register-ip', request.remote_addr))
+        if wait:
+            flash('Too many registrations from your network. Please try again later.', 'danger')
+            return render_template('register.html', form=form), 429, {'Retry-After': str(wait)}
+        rate_limit.hit('register-ip', request.remote_addr)
+
         # check existing username/email
         if User.query.filter((User.username == form.username.data) | (User.email == form.email.data)).first():
             flash('Username or email already taken.', 'warning')
@@ -31,9 +50,14 @@ def register():
         user_count = User.query.count()
         role = 'admin' if user_count == 0 else form.role.data
         user = User(username=form.username.data, email=form.email.data, role=role)
-        user.set_password(form.password.data)
+        try:
+            user.set_password(form.password.data)
+        except PasswordHashBusy:
+            flash('The server is busy, please try again in a moment.', 'warning')
+            return render_template('register.html', form=form), 503
         db.session.add(user)
         db.session.commit()
+        invalidate_stats()
         if user_count == 0:
             flash('✓ You are the first user - admin rights granted!', 'success')
         else:
@@ -48,9 +72,25 @@ def login():
         return redirect(url_for('auth.dashboard'))
     form = LoginForm()
     if form.validate_on_submit():
+        # refuse before doing any password hashing
+        account = form.username.data.strip().lower()
+        wait = rate_limit.blocked(('login-ip', request.remote_addr), ('login-account', account))
+        if wait:
+            flash(f'Too many sign-in attempts. Please try again in {wait} seconds.', 'danger')
+            return render_template('login.html', form=form), 429, {'Retry-After': str(wait)}
+        rate_limit.hit('login-ip', request.remote_addr)
+
         # allow login by username or email
         user = User.query.filter((User.username == form.username.data) | (User.email == form.username.data)).first()
-        if user and user.check_password(form.password.data):
+        try:
+            valid = user is not None and user.check_password(form.password.data)
+        except PasswordHashBusy:
+            flash('Too many sign-ins right now, please try again in a moment.', 'warning')
+            return render_template('login.html', form=form), 503
+        if valid:
+            rate_limit.reset('login-account', account)
+            if user.upgrade_password_hash(form.password.data):
+                db.session.commit()
             login_user(user)
             flash('Logged in successfully.', 'success')
             # Redirect to profile completion if not complete
@@ -58,6 +98,7 @@ def login():
                 return redirect(url_for('auth.complete_profile'))
             next_page = request.args.get('next')
             return redirect(next_page or url_for('auth.dashboard'))
+        rate_limit.hit('login-account', account)
         flash('Invalid username/email or password.', 'danger')
     return render_template('login.html', form=form)
 
@@ -90,6 +131,7 @@ def complete_profile():
         
         current_user.profile_complete = True
         db.session.commit()
+        forget_user(current_user.id)
         flash('Profile completed!', 'success')
         return redirect(url_for('auth.dashboard'))
     return render_template('complete_profile.html', form=form)
@@ -100,6 +142,7 @@ def complete_profile():
 def skip_profile():
     current_user.profile_complete = True
     db.session.commit()
+    forget_user(current_user.id)
     flash('Profile skipped for now. You can complete it later.', 'info')
     return redirect(url_for('auth.dashboard'))
 
@@ -112,54 +155,79 @@ def dashboard():
 
 
 @auth_bp.route('/about')
+@cache_page()
 def about():
     return render_template('about.html')
 
 
 @auth_bp.route('/marketplace')
+@cache_page()
 def marketplace():
     return render_template('marketplace.html')
 
 
 @auth_bp.route('/forum')
+@cache_page()
 def forum():
     return render_template('forum.html')
 
 
 @auth_bp.route('/consultant')
+@cache_page()
 def consultant():
     return render_template('consultant.html')
 
 
 @auth_bp.route('/consultants')
 def consultants_list():
-    """List all registered consultants"""
-    consultants = User.query.filter_by(role='consultant').all()
-    return render_template('consultants_list.html', consultants=consultants)
+    """List all registered consultants, or the ones nearest ?near= (a place or "lat,lon")"""
+    near = request.args.get('near', '').strip()
+    place = geocode(near)
+    if place:
+        consultants = nearest(User, place, 50, User.role == 'consultant')
+    else:
+        consultants = User.query.filter_by(role='consultant').all()
+    return render_template('consultants_list.html', consultants=consultants, near=near, place=place)
 
 
 @auth_bp.route('/products')
+@cache_page('products', first_page_only=True)
 def products_list():
-    """List all products"""
+    """List products, narrowed by category, location, price, stock and distance filters"""
     page = request.args.get('page', 1, type=int)
-    category = request.args.get('category', None)
-    
-    query = Product.query
-    if category:
-        query = query.filter_by(category=category)
+    cursor = request.args.get('cursor')
+    filters = ProductFilters.from_args(request.args)
     
-    products = query.order_by(Product.created_at.desc()).paginate(page=page, per_page=12)
-    return render_template('products_list.html', products=products, selected_category=category)
+    query = Product.query.options(joinedload(Product.user)).filter(*filters.conditions())
+    products = paginate_newest(query, Product, page=page, cursor=cursor, per_page=12)
+    return render_template('products_list.html', products=products, filters=filters,
+                           facets=facet_counts(filters), selected_category=filters.category,
+                           radii=RADII_KM, default_radius=DEFAULT_RADIUS_KM)
 
 
 @auth_bp.route('/discussions')
+@cache_page('posts', first_page_only=True)
 def discussions_list():
     """List all forum discussions"""
     page = request.args.get('page', 1, type=int)
-    posts = Post.query.order_by(Post.created_at.desc()).paginate(page=page, per_page=10)
+    cursor = request.args.get('cursor')
+    posts = paginate_feed(page, per_page=current_app.config['POSTS_PER_PAGE'], cursor=cursor)
     return render_template('discussions_list.html', posts=posts)
 
 
+@auth_bp.route('/search')
+def search():
+    """Search products and forum discussions"""
+    query = request.args.get('q', '').strip()
+    kind = request.args.get('type', 'products')
+    if kind not in INDEXES:
+        kind = 'products'
+    page = request.args.get('page', 1, type=int)
+    
+    results = run_search(kind, query, page=page, per_page=12) if query else None
+    return render_template('search.html', results=results, query=query, kind=kind)
+
+
 @auth_bp.route('/profile')
 @login_required
 def profile():
@@ -194,8 +262,54 @@ def list_product():
             product.product_image = picture_file
         
         db.session.add(product)
+        db.session.flush()
+        index_document('products', product)
         db.session.commit()
+        invalidate_pages('products')
         flash('✓ Product listed successfully!', 'success')
         return redirect(url_for('auth.products_list'))
     
     return render_template('list_product.html', form=form)
+
+
+@auth_bp.route('/products/import', methods=['GET', 'POST'])
+@login_required
+def import_products_view():
+    """Bulk-list products from a CSV or JSON Lines file (farmers and vendors only)"""
+    if current_user.role not in ['farmer', 'vendor']:
+        flash('Only farmers and vendors can list products.', 'warning')
+        return redirect(url_for('auth.marketplace'))
+
+    form = ProductImportForm()
+    report = None
+    if form.validate_on_submit():
+        try:
+            fmt = format_for(form.products_file.data.filename)
+            archive = ImageArchive(form.images.data.stream) if form.images.data else None
+            report = import_products(read_rows(form.products_file.data.stream, fmt), current_user.id, archive=archive)
+        except ImportFormatError as exc:
+            form.products_file.errors.append(str(exc))
+        except zipfile.BadZipFile:
+            flash('The image archive could not be read. Upload a valid ZIP archive.', 'danger')
+        else:
+            if report.imported:
+                flash(f'✓ {report.imported} product(s) listed successfully!', 'success')
+            if report.aborted:
+                flash(f'The import stopped early. {report.aborted}', 'danger')
+            if report.failed:
+                flash(f'{report.failed} row(s) were skipped, see below.', 'warning')
+
+    return render_template('products_import.html', form=form, report=report)
+
+
+@auth_bp.route('/products/export')
+@login_required
+def export_products_view():
+    """Download your product listings as CSV or JSON Lines"""
+    fmt = request.args.get('format', 'csv')
+    if fmt not in ('csv', 'jsonl'):
+        fmt = 'csv'
+    query = Product.query.filter_by(user_id=current_user.id)
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    return Response(stream_with_context(export_products(query, fmt)), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename=products.{fmt}'})
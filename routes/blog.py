@@ -1,11 +1,16 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, abort
+from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, jsonify, current_app
 from extensions import db
 from models.user import User
-from models.blog import Post, Comment, Like
+from models.blog import Post, Comment, forget_liked
 from forms.blog import PostForm, CommentForm
 from flask_login import login_required, current_user
 from datetime import datetime
 from utils import save_picture, delete_picture
+from services.feed import paginate_comments, paginate_feed
+from services.counters import adjust_post_counters, set_post_like
+from services.stats import invalidate_stats
+from services.page_cache import invalidate_pages
+from services.search import index_document, remove_documents
 
 blog_bp = Blueprint('blog', __name__, template_folder='../templates/blog', url_prefix='/blog')
 
@@ -14,7 +19,8 @@ blog_bp = Blueprint('blog', __name__, template_folder='../templates/blog', url_p
 def list_posts():
     """List all blog posts (public, anyone can view)"""
     page = request.args.get('page', 1, type=int)
-    posts = Post.query.order_by(Post.created_at.desc()).paginate(page=page, per_page=10)
+    cursor = request.args.get('cursor')
+    posts = paginate_feed(page, per_page=current_app.config['POSTS_PER_PAGE'], cursor=cursor)
     return render_template('blog/posts.html', posts=posts)
 
 
@@ -36,7 +42,11 @@ def create_post():
             post.post_image = picture_file
         
         db.session.add(post)
+        db.session.flush()
+        index_document('posts', post)
         db.session.commit()
+        invalidate_stats()
+        invalidate_pages('posts')
         flash('✓ Post created successfully!', 'success')
         return redirect(url_for('blog.view_post', post_id=post.id))
     return render_template('blog/create.html', form=form)
@@ -55,38 +65,81 @@ def view_post(post_id):
             post_id=post.id
         )
         db.session.add(comment)
+        adjust_post_counters(post.id, comments=1)
         db.session.commit()
+        invalidate_stats()
+        invalidate_pages('posts')
         flash('✓ Comment posted!', 'success')
         return redirect(url_for('blog.view_post', post_id=post.id))
     
-    comments = Comment.query.filter_by(post_id=post.id).order_by(Comment.created_at.desc()).all()
+    comments = paginate_comments(post.id, cursor=request.args.get('cursor'), per_page=20)
     return render_template('blog/post_detail.html', post=post, comments=comments, form=form)
 
 
-@blog_bp.route('/<int:post_id>/like', methods=['POST'])
-@login_required
-def like_post(post_id):
-    """Like/Unlike a blog post"""
+@blog_bp.route('/<int:post_id>/comments')
+def post_comments(post_id):
+    """
+    Next page of a post's comments for infinite scroll
+    Returns:
+        JSON: ``comments`` (id, author, content, created_at), ``html`` (the
+        same comments rendered like on the post page) and ``next_cursor``
+    """
     post = Post.query.get_or_404(post_id)
-    
-    # Check if user already liked this post
-    existing_like = Like.query.filter_by(post_id=post_id, user_id=current_user.id).first()
-    
-    if existing_like:
-        # Unlike
-        db.session.delete(existing_like)
-        db.session.commit()
-        flash('✓ Post unliked.', 'info')
-    else:
-        # Like
-        like = Like(post_id=post_id, user_id=current_user.id)
-        db.session.add(like)
-        db.session.commit()
+    comments = paginate_comments(post.id, cursor=request.args.get('cursor'), per_page=20)
+    return jsonify(
+        comments=[{
+            'id': comment.id,
+            'author': comment.user.username,
+            'content': comment.content,
+            'created_at': comment.created_at.isoformat(),
+        } for comment in comments.items],
+        html=render_template('blog/comments.html', post=post, comments=comments.items),
+        next_cursor=comments.next_cursor,
+    )
+
+
+def _set_like(post_id, liked):
+    """
+    Apply a like/unlike and answer with JSON (for fetch()) or a redirect
+    Args:
+        post_id: id of the post
+        liked: the state the user asked for; repeating a request changes nothing
+    Returns:
+        Response: {"post_id", "liked", "like_count"} or a redirect to the post
+    """
+    changed, like_count = set_post_like(post_id, current_user.id, liked)
+    if like_count is None:
+        db.session.rollback()
+        abort(404)
+    db.session.commit()
+    if changed:
+        forget_liked(current_user, post_id)
+        invalidate_stats()
+        invalidate_pages('posts')
+
+    if request.accept_mimetypes.best_match(['text/html', 'application/json']) == 'application/json':
+        return jsonify(post_id=post_id, liked=liked, like_count=like_count)
+    if liked:
         flash('✓ Post liked!', 'success')
-    
+    else:
+        flash('✓ Post unliked.', 'info')
     return redirect(url_for('blog.view_post', post_id=post_id))
 
 
+@blog_bp.route('/<int:post_id>/like', methods=['POST'])
+@login_required
+def like_post(post_id):
+    """Like a blog post (no-op if already liked)"""
+    return _set_like(post_id, True)
+
+
+@blog_bp.route('/<int:post_id>/unlike', methods=['POST'])
+@login_required
+def unlike_post(post_id):
+    """Unlike a blog post (no-op if not liked)"""
+    return _set_like(post_id, False)
+
+
 @blog_bp.route('/<int:post_id>/edit', methods=['GET', 'POST'])
 @login_required
 def edit_post(post_id):
@@ -112,7 +165,9 @@ def edit_post(post_id):
             post.post_image = picture_file
         
         post.updated_at = datetime.utcnow()
+        index_document('posts', post)
         db.session.commit()
+        invalidate_pages('posts')
         flash('✓ Post updated successfully!', 'success')
         return redirect(url_for('blog.view_post', post_id=post.id))
     elif request.method == 'GET':
@@ -132,8 +187,11 @@ def delete_post(post_id):
     if current_user.id != post.user_id and current_user.role != 'admin':
         abort(403)
     
+    remove_documents('posts', [post.id])
     db.session.delete(post)
     db.session.commit()
+    invalidate_stats()
+    invalidate_pages('posts')
     flash('✓ Post deleted.', 'info')
     return redirect(url_for('blog.list_posts'))
 
@@ -152,6 +210,9 @@ def delete_comment(comment_id):
         abort(403)
     
     db.session.delete(comment)
+    adjust_post_counters(post_id, comments=-1)
     db.session.commit()
+    invalidate_stats()
+    invalidate_pages('posts')
     flash('✓ Comment deleted.', 'info')
     return redirect(url_for('blog.view_post', post_id=post_id))
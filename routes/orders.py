@@ -0,0 +1,84 @@
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from flask_login import login_required, current_user
+from sqlalchemy.orm import selectinload
+from models.order import Order
+from services.orders import OutOfStock, cancel, confirm, reserve
+from services.pagination import paginate_newest
+
+orders_bp = Blueprint('orders', __name__, template_folder='../templates/orders', url_prefix='/orders')
+
+
+def _wants_json():
+    return request.accept_mimetypes.best_match(['text/html', 'application/json']) == 'application/json'
+
+
+def _requested_quantities():
+    """
+    {product_id: quantity} from parallel ``product_id`` / ``quantity`` fields
+    (one pair per product, so a cart can check out several at once)
+    Returns:
+        dict, or None if the fields don't parse
+    """
+    product_ids = request.form.getlist('product_id', type=int)
+    amounts = request.form.getlist('quantity', type=int)
+    if not product_ids or len(product_ids) != len(amounts):
+        return None
+    quantities = {}
+    for product_id, quantity in zip(product_ids, amounts):
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+    return quantities
+
+
+@orders_bp.route('/')
+@login_required
+def list_orders():
+    """The current user's orders, newest first"""
+    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
+    query = Order.query.filter_by(user_id=current_user.id).options(selectinload(Order.items))
+    orders = paginate_newest(query, Order, page=page, cursor=cursor, per_page=10)
+    return render_template('orders.html', orders=orders)
+
+
+@orders_bp.route('/checkout', methods=['POST'])
+@login_required
+def checkout():
+    """Reserve stock of one or more products in a pending order"""
+    quantities = _requested_quantities()
+    try:
+        if quantities is None:
+            raise ValueError('Choose a product and a quantity')
+        order = reserve(current_user.id, quantities)
+    except (OutOfStock, ValueError) as exc:
+        message = 'Not enough stock left for that quantity.' if isinstance(exc, OutOfStock) else str(exc)
+        if _wants_json():
+            return jsonify(error=message), 409 if isinstance(exc, OutOfStock) else 400
+        flash(message, 'warning')
+        return redirect(request.referrer or url_for('auth.products_list'))
+
+    if _wants_json():
+        return jsonify(order_id=order.id, status=order.status, expires_at=order.expires_at.isoformat()), 201
+    flash(f'✓ Reserved! Confirm your order within {int((order.expires_at - order.created_at).total_seconds() // 60)} minutes.', 'success')
+    return redirect(url_for('orders.list_orders'))
+
+
+@orders_bp.route('/<int:order_id>/confirm', methods=['POST'])
+@login_required
+def confirm_order(order_id):
+    """Confirm a pending order before its reservation expires"""
+    if confirm(order_id, current_user.id):
+        flash('✓ Order confirmed. The seller will contact you.', 'success')
+    else:
+        flash('This order can no longer be confirmed; its reservation may have expired.', 'warning')
+    return redirect(url_for('orders.list_orders'))
+
+
+@orders_bp.route('/<int:order_id>/cancel', methods=['POST'])
+@login_required
+def cancel_order(order_id):
+    """Cancel a pending order, returning its stock"""
+    if cancel(order_id, current_user.id):
+        flash('Order cancelled.', 'info')
+    else:
+        flash('Only pending orders can be cancelled.', 'warning')
+    return redirect(url_for('orders.list_orders'))
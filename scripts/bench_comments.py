@@ -0,0 +1,93 @@
+"""Post page comment rendering cost as threads grow: all comments vs first page.
+
+"all + lazy authors" is the previous view_post (every comment, then one
+query per distinct author while rendering); "first page" is
+services/feed.paginate_comments (20 newest comments, authors joined).
+Both render the same blog/comments.html partial inside a request context.
+
+    py scripts\\bench_comments.py [--sizes 100,1000,10000] [--repeat 20]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BENCH_DB = os.path.join(tempfile.gettempdir(), 'agrifarma_comments_bench.db')
+os.environ['DATABASE_URL'] = 'sqlite:///' + BENCH_DB
+
+from datetime import datetime, timedelta
+from flask import render_template
+from sqlalchemy import event
+from app import create_app
+from extensions import db
+from models.blog import Comment, Post
+from models.user import User
+from services.feed import paginate_comments
+
+AUTHORS = 500
+
+
+def all_comments(post):
+    return Comment.query.filter_by(post_id=post.id).order_by(Comment.created_at.desc()).all()
+
+
+def first_page(post):
+    return paginate_comments(post.id, per_page=20).items
+
+
+def measure(app, post_id, load, repeat):
+    statements = []
+    listener = lambda *args: statements.append(1)
+    event.listen(db.engine, 'before_cursor_execute', listener)
+    try:
+        began = time.perf_counter()
+        for _ in range(repeat):
+            with app.test_request_context(f'/blog/{post_id}'):
+                post = db.session.get(Post, post_id)
+                render_template('blog/comments.html', post=post, comments=load(post))
+                db.session.remove()
+        elapsed = time.perf_counter() - began
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    return elapsed / repeat * 1000, len(statements) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='100,1000,10000')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    if os.path.exists(BENCH_DB):
+        os.remove(BENCH_DB)
+    app = create_app()
+    with app.app_context():
+        db.session.add_all(User(username=f'grower{n}', email=f'grower{n}@example.com', role='farmer',
+                                password_hash='x') for n in range(AUTHORS))
+        db.session.commit()
+
+        print(f'{"comments":>9} {"all + lazy authors":>24} {"first page":>20}')
+        for size in (int(s) for s in args.sizes.split(',')):
+            post = Post(title=f'Thread of {size}', content='...', user_id=1, comment_count=size)
+            db.session.add(post)
+            db.session.flush()
+            start = datetime.utcnow() - timedelta(minutes=size)
+            db.session.execute(Comment.__table__.insert(), [
+                {'content': f'Reply number {n} about irrigation schedules.', 'user_id': n % AUTHORS + 2,
+                 'post_id': post.id, 'created_at': start + timedelta(minutes=n)} for n in range(size)])
+            db.session.commit()
+            post_id = post.id
+
+            old_ms, old_queries = measure(app, post_id, all_comments, args.repeat)
+            new_ms, new_queries = measure(app, post_id, first_page, args.repeat)
+            print(f'{size:9d} {old_ms:9.1f} ms {old_queries:6.0f} queries {new_ms:7.1f} ms {new_queries:3.0f} queries')
+
+        db.session.remove()
+        db.engine.dispose()
+    os.remove(BENCH_DB)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Compare peak memory and latency of image processing: full decode vs draft.
+
+Each run happens in a fresh process so its peak RSS is its own. "full" is
+the previous pipeline (decode at full resolution, then resize); "draft" is
+services/images.resize_image, which decodes JPEGs at a reduced DCT scale
+and refuses images whose bitmap would exceed IMAGE_DECODE_BUDGET.
+
+    py scripts\\bench_decode.py [--runs 3]
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from PIL import Image, ImageFilter
+from config import Config
+
+SAMPLES = {
+    'photo 12MP jpeg': ('photo_12mp.jpg', (4000, 3000)),
+    'photo 48MP jpeg': ('photo_48mp.jpg', (8000, 6000)),
+    'screenshot png': ('screen.png', (2560, 1440)),
+    'bomb 13k x 13k png': ('bomb.png', (13000, 13000)),
+}
+
+
+def peak_rss_mb():
+    if os.path.exists('/proc/self/status'):
+        # VmHWM starts over at exec, unlike ru_maxrss which children inherit
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    import psutil  # Windows: peak working set
+    return psutil.Process().memory_info().peak_wset / 2 ** 20
+
+
+def make_samples(directory):
+    for name, size in SAMPLES.values():
+        path = os.path.join(directory, name)
+        if name.startswith('bomb'):
+            # ~170 KB on disk, yet under Pillow's own DecompressionBombError limit
+            Image.new('L', size).save(path, optimize=True)
+        elif name.endswith('.jpg'):
+            noise = Image.effect_noise((size[0] // 8, size[1] // 8), 60).resize(size)
+            Image.merge('RGB', (noise, noise.filter(ImageFilter.BLUR), noise.rotate(180))).save(path, quality=90)
+        else:
+            Image.linear_gradient('L').resize(size).convert('RGB').save(path)
+
+
+def full_decode(source, destination, widths, max_size=(800, 800)):
+    img = Image.open(source)
+    img.load()
+    current = img.convert('RGB')
+    for width in sorted((w for w in widths if w < img.width), reverse=True):
+        current = current.resize((width, max(1, round(current.height * width / current.width))),
+                                 Image.Resampling.LANCZOS)
+        current.save(os.path.join(os.path.dirname(destination), f'full-{width}.webp'), 'WEBP')
+    img.thumbnail(max_size, Image.Resampling.LANCZOS)
+    img.save(destination, quality=85)
+
+
+def run_once(mode, source, out_dir):
+    from services.images import ImageRejected, resize_image
+    app = Flask('bench_decode')
+    app.config.from_object(Config)
+    app.config['IMAGE_FORMATS'] = ('webp',)
+    destination = os.path.join(out_dir, f'{mode}-{os.path.basename(source)}')
+    began = time.perf_counter()
+    outcome = 'ok'
+    with app.app_context():
+        try:
+            if mode == 'full':
+                full_decode(source, destination, app.config['IMAGE_WIDTHS'])
+            else:
+                resize_image(source, destination)
+        except ImageRejected:
+            outcome = 'rejected'
+        except (MemoryError, Image.DecompressionBombError) as exc:
+            outcome = type(exc).__name__
+    return (time.perf_counter() - began) * 1000, peak_rss_mb(), outcome
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        make_samples(directory)
+        spawn = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+            baseline = pool.submit(peak_rss_mb).result()
+        print(f'fresh interpreter: {baseline:.0f} MB peak RSS\n')
+        print(f'{"image":<20} {"mode":<6} {"latency":>10} {"peak RSS":>10}  result')
+        for label, (name, _) in SAMPLES.items():
+            for mode in ('full', 'draft'):
+                results = []
+                for _ in range(args.runs):
+                    with ProcessPoolExecutor(max_workers=1, mp_context=spawn) as pool:
+                        results.append(pool.submit(run_once, mode, os.path.join(directory, name), directory).result())
+                latency = statistics.median(r[0] for r in results)
+                rss = max(r[1] for r in results)
+                print(f'{label:<20} {mode:<6} {latency:8.0f} ms {rss:7.0f} MB  {results[0][2]}')
+
+
+if __name__ == '__main__':
+    main()
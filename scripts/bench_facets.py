@@ -0,0 +1,123 @@
+"""Products list facet counts and filtered pages on a large catalogue.
+
+Seeds synthetic listings (500k by default) and, for a few filter
+combinations, reports median latency of:
+- "COUNT per option": one COUNT(*) per category, location and price bucket
+  shown, plus the in-stock count and the total
+- "grouped": services/facets.py computing all facets in four statements
+- "cached": facet_counts() served from its cache
+- first filtered page (12 newest) and page 5
+
+    py scripts\\bench_facets.py [--rows 500000] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BENCH_DB = os.path.join(tempfile.gettempdir(), 'agrifarma_facets_bench.db')
+os.environ['DATABASE_URL'] = 'sqlite:///' + BENCH_DB
+
+from sqlalchemy import func, select
+from app import create_app
+from extensions import db
+from models.product import Product
+from models.user import User
+from services.facets import PRICE_BUCKETS, ProductFilters, _bucket_condition, _compute_facets, facet_counts
+from services.pagination import paginate_newest
+
+CATEGORIES = ['vegetables', 'fruits', 'grains', 'dairy', 'specialty', 'inputs']
+CITIES = ['Lahore', 'Multan', 'Faisalabad', 'Karachi', 'Peshawar', 'Quetta', 'Sialkot', 'Hyderabad',
+          'Bahawalpur', 'Sargodha', 'Okara', 'Sahiwal', 'Gujranwala', 'Kasur', 'Sukkur', 'Larkana',
+          'Mardan', 'Abbottabad', 'Jhang', 'Sheikhupura', 'Rahim Yar Khan', 'Mirpur', 'Chiniot', 'Kohat']
+COMBINATIONS = [
+    ('no filters', {}),
+    ('category', {'category': 'fruits'}),
+    ('category + location', {'category': 'grains', 'location': 'Multan'}),
+    ('location + price + stock', {'location': 'Okara', 'price': '500-2000', 'in_stock': '1'}),
+    ('all four', {'category': 'dairy', 'location': 'Lahore', 'price': '100-500', 'in_stock': '1'}),
+]
+
+
+def seed(rows):
+    db.session.add(User(username='seller', email='seller@example.com', password_hash='x', role='vendor'))
+    db.session.commit()
+    now = datetime.utcnow()
+    for start in range(0, rows, 50000):
+        db.session.execute(Product.__table__.insert(), [{
+            'name': f'Listing {n}', 'category': random.choice(CATEGORIES),
+            'description': 'Harvested this season, packed in clean bags.',
+            'price': round(random.lognormvariate(6.5, 1.2), 2),
+            'quantity': 0 if random.random() < 0.05 else random.randint(1, 500),
+            'location': random.choice(CITIES[:8] * 4 + CITIES),  # a few big markets
+            'contact': '03001234567', 'user_id': 2,
+            'created_at': now - timedelta(seconds=rows - n), 'updated_at': now,
+        } for n in range(start, min(start + 50000, rows))])
+        db.session.commit()
+
+
+def count_per_option(filters):
+    """The naive way: a COUNT(*) for every option on the page"""
+    def count(*clauses):
+        return db.session.scalar(select(func.count()).select_from(Product).where(*clauses))
+    counts = [count(*filters.conditions('category'), Product.category == value) for value in CATEGORIES]
+    counts += [count(*filters.conditions('location'), Product.location == value) for value in CITIES]
+    counts += [count(*filters.conditions('price'), _bucket_condition(low, high)) for _, _, low, high in PRICE_BUCKETS]
+    counts.append(count(*filters.conditions('in_stock'), Product.quantity > 0))
+    counts.append(count(*filters.conditions()))
+    return counts
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - began) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=500000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed(24)
+    if os.path.exists(BENCH_DB):
+        os.remove(BENCH_DB)
+    app = create_app()
+    with app.app_context():
+        began = time.perf_counter()
+        seed(args.rows)
+        db.session.execute(db.text('ANALYZE'))
+        print(f'Seeded {args.rows} products in {time.perf_counter() - began:.1f} s')
+        print(f'{"filters":<26} {"COUNT per option":>17} {"grouped":>9} {"cached":>8} '
+              f'{"page 1":>8} {"page 5":>8} {"matches":>8}')
+        for label, query_args in COMBINATIONS:
+            filters = ProductFilters.from_args(query_args)
+            query = Product.query.filter(*filters.conditions())
+            naive = timed(lambda: count_per_option(filters), args.repeat)
+            grouped = timed(lambda: _compute_facets(filters), args.repeat)
+            facet_counts(filters)
+            cached = timed(lambda: facet_counts(filters), args.repeat)
+            first = timed(lambda: paginate_newest(query, Product, page=1, per_page=12).items, args.repeat)
+            fifth = timed(lambda: paginate_newest(query, Product, page=5, per_page=12).items, args.repeat)
+            total = facet_counts(filters)['total']
+            print(f'{label:<26} {naive:14.1f} ms {grouped:6.1f} ms {cached:5.3f} ms '
+                  f'{first:5.1f} ms {fifth:5.1f} ms {total:8d}')
+
+        db.session.remove()
+        db.engine.dispose()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(BENCH_DB + suffix):
+            os.remove(BENCH_DB + suffix)
+
+
+if __name__ == '__main__':
+    main()
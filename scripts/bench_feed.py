@@ -0,0 +1,75 @@
+"""Check that the post listing pages issue a constant number of SQL statements.
+
+Seeds a throwaway in-memory database with posts of varying engagement and
+renders ``/blog/`` and ``/discussions`` at several page sizes
+(POSTS_PER_PAGE), with the page cache off so every request really renders.
+The statement count must not depend on the page size or on how many posts,
+comments or likes are involved; the script exits non-zero when the counts
+differ.
+
+    py scripts\\bench_feed.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['DATABASE_URL'] = 'sqlite://'
+
+from sqlalchemy import event
+from app import create_app
+from extensions import db
+from models.user import User
+from models.blog import Post, Comment, Like
+
+
+def seed(users=50, posts=60, max_comments=40):
+    people = [User(username=f'user{i}', email=f'user{i}@example.com', role='farmer', password_hash='x')
+              for i in range(users)]
+    db.session.add_all(people)
+    db.session.flush()
+    for i in range(posts):
+        post = Post(title=f'Post number {i}', content='Seeded content for benchmarking.', user_id=people[i % users].id)
+        db.session.add(post)
+        db.session.flush()
+        engagement = (i * 7) % max_comments
+        db.session.add_all(Comment(content='seed', user_id=people[j % users].id, post_id=post.id)
+                           for j in range(engagement))
+        db.session.add_all(Like(user_id=people[j].id, post_id=post.id) for j in range(min(engagement, users)))
+    db.session.commit()
+
+
+def count_statements(client, url):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(url)
+        assert response.status_code == 200, response.status_code
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return len(statements)
+
+
+def main():
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['PAGE_CACHE_TTL'] = 0  # a cached page would issue no statements at all
+    counts = {}
+    with app.app_context():
+        seed()
+        client = app.test_client()
+        for per_page in (5, 10, 25, 50):
+            app.config['POSTS_PER_PAGE'] = per_page
+            for url in ('/blog/', '/discussions', '/blog/?page=2'):
+                counts[url, per_page] = count_statements(client, url)
+                print(f'{url:<16} per_page={per_page:<3} statements={counts[url, per_page]}')
+    if len(set(counts.values())) != 1:
+        sys.exit(f'Statement counts differ: {sorted(set(counts.values()))}')
+    print(f'OK: {next(iter(counts.values()))} statements for every page and page size')
+
+
+if __name__ == '__main__':
+    main()
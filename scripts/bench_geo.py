@@ -0,0 +1,133 @@
+"""Radius and nearest-neighbour queries over a large catalogue.
+
+Seeds synthetic listings (1M by default) scattered around the gazetteer's
+places. For a few radii around a busy market town it reports the median
+latency of each lookup strategy:
+- "scan": the exact distance test alone, so every row is read
+- "B-tree box": services/geo.py's within_radius(), a range scan of the
+  (latitude, longitude) index, then the distance test on its entries
+- "R*Tree": an SQLite R*Tree of the same points (built here only) finds
+  the box, then the distance test on each candidate row
+Each strategy is timed on the match count, on the first page (12 newest)
+and on the 20 nearest listings.
+
+The R*Tree wins only for the smallest circles: each of its candidates
+costs a read of the products row, where the covering B-tree index already
+holds the coordinates.
+
+    py scripts\\bench_geo.py [--rows 1000000] [--repeat 5] [--near Okara]
+"""
+import argparse
+import csv
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BENCH_DB = os.path.join(tempfile.gettempdir(), 'agrifarma_geo_bench.db')
+os.environ['DATABASE_URL'] = 'sqlite:///' + BENCH_DB
+
+from sqlalchemy import column, func, select, table
+from app import create_app
+from extensions import db
+from models.product import Product
+from models.user import User
+from services.geo import KM_PER_DEGREE, bounding_box, geocode, nearest, squared_offset, within_radius
+from services.pagination import paginate_newest
+
+CATEGORIES = ['vegetables', 'fruits', 'grains', 'dairy', 'specialty', 'inputs']
+RADII = [10, 25, 50, 100]
+RTREE = table('bench_products_rtree', column('id'), column('min_lat'), column('max_lat'),
+              column('min_lon'), column('max_lon'))
+
+
+def seed(rows, gazetteer):
+    with open(gazetteer, newline='', encoding='utf-8') as source:
+        places = [(row['name'], float(row['latitude']), float(row['longitude'])) for row in csv.DictReader(source)]
+    weights = [8 if n < 12 else 1 for n in range(len(places))]  # the big markets come first
+    db.session.add(User(username='seller', email='seller@example.com', password_hash='x', role='vendor'))
+    db.session.commit()
+    now = datetime.utcnow()
+    for start in range(0, rows, 50000):
+        batch = []
+        for n in range(start, min(start + 50000, rows)):
+            name, latitude, longitude = random.choices(places, weights)[0]
+            batch.append({
+                'name': f'Listing {n}', 'category': random.choice(CATEGORIES),
+                'description': 'Harvested this season, packed in clean bags.',
+                'price': round(random.lognormvariate(6.5, 1.2), 2), 'quantity': random.randint(1, 500),
+                # farms spread over the district around the town they list
+                'location': name, 'latitude': random.gauss(latitude, 0.25), 'longitude': random.gauss(longitude, 0.25),
+                'contact': '03001234567', 'user_id': 2,
+                'created_at': now - timedelta(seconds=rows - n), 'updated_at': now,
+            })
+        db.session.execute(Product.__table__.insert(), batch)
+        db.session.commit()
+    db.session.execute(db.text(f'CREATE VIRTUAL TABLE {RTREE.name} USING rtree(id, min_lat, max_lat, min_lon, max_lon)'))
+    db.session.execute(db.text(f'INSERT INTO {RTREE.name} SELECT id, latitude, latitude, longitude, longitude '
+                               'FROM products WHERE latitude IS NOT NULL'))
+    db.session.commit()
+
+
+def strategies(place, radius):
+    exact = squared_offset(Product, place) <= (radius / KM_PER_DEGREE) ** 2
+    min_lat, max_lat, min_lon, max_lon = bounding_box(place, radius)
+    rtree = RTREE.c
+    in_rtree = Product.id.in_(select(rtree.id).where(rtree.max_lat >= min_lat, rtree.min_lat <= max_lat,
+                                                      rtree.max_lon >= min_lon, rtree.min_lon <= max_lon))
+    return [('scan', [exact]), ('B-tree box', within_radius(Product, place, radius)), ('R*Tree', [in_rtree, exact])]
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        began = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - began) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--near', default='Okara')
+    args = parser.parse_args()
+
+    random.seed(25)
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(BENCH_DB + suffix):
+            os.remove(BENCH_DB + suffix)
+    app = create_app()
+    with app.app_context():
+        began = time.perf_counter()
+        seed(args.rows, app.config['GAZETTEER_PATH'])
+        db.session.execute(db.text('ANALYZE'))
+        print(f'Seeded {args.rows} products in {time.perf_counter() - began:.1f} s')
+        place = geocode(args.near)
+        print(f'Around {place.name} ({place.latitude}, {place.longitude})')
+        print(f'{"radius":>7} {"strategy":<11} {"count":>9} {"page 1":>9} {"nearest 20":>11} {"matches":>8}')
+        for radius in RADII:
+            for label, clauses in strategies(place, radius):
+                query = Product.query.filter(*clauses)
+                count = timed(lambda: db.session.scalar(select(func.count()).select_from(Product).where(*clauses)), args.repeat)
+                first = timed(lambda: paginate_newest(query, Product, page=1, per_page=12).items, args.repeat)
+                closest = timed(lambda: query.order_by(squared_offset(Product, place)).limit(20).all(), args.repeat)
+                matches = db.session.scalar(select(func.count()).select_from(Product).where(*clauses))
+                print(f'{radius:4d} km {label:<11} {count:6.1f} ms {first:6.1f} ms {closest:8.1f} ms {matches:8d}')
+        widening = timed(lambda: nearest(Product, place, 20), args.repeat)
+        print(f'nearest(20) widening from 25 km: {widening:.1f} ms')
+
+        db.session.remove()
+        db.engine.dispose()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(BENCH_DB + suffix):
+            os.remove(BENCH_DB + suffix)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+"""Show that the hot listing queries use the indexes from the migrations.
+
+Seeds a scratch SQLite database (1M rows per table by default), then prints
+the query plan and median latency of each listing query shape with the
+indexes in place and again with them dropped.
+
+    py scripts\\bench_indexes.py [--rows 1000000] [--db bench.db]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from extensions import db
+from models.user import User
+from models.blog import Post, Comment, Like
+from models.product import Product
+from migrations import upgrade
+
+CATEGORIES = ['vegetables', 'fruits', 'grains', 'dairy', 'specialty', 'inputs']
+ROLES = ['customer', 'consultant', 'farmer', 'vendor']
+BATCH = 50000
+
+
+def _batches(total, make_row):
+    for start in range(0, total, BATCH):
+        yield [make_row(i) for i in range(start, min(start + BATCH, total))]
+
+
+def seed(engine, rows):
+    users = max(rows // 5, 1)
+    start = datetime(2020, 1, 1)
+    stamp = lambda i: start + timedelta(seconds=i * 37 + random.randint(0, 30))
+    tables = [
+        (User.__table__, users, lambda i: {
+            'username': f'user{i}', 'email': f'user{i}@example.com', 'password_hash': 'x',
+            'role': ROLES[i % len(ROLES)], 'profile_complete': True}),
+        (Post.__table__, rows, lambda i: {
+            'title': f'Post {i}', 'content': 'Seeded post body', 'user_id': i % users + 1,
+            'created_at': stamp(i), 'updated_at': stamp(i)}),
+        (Comment.__table__, rows, lambda i: {
+            'content': 'Seeded comment', 'user_id': i % users + 1,
+            'post_id': random.randint(1, rows), 'created_at': stamp(i)}),
+        (Like.__table__, rows, lambda i: {
+            'user_id': i % users + 1, 'post_id': i // users + 1, 'created_at': stamp(i)}),
+        (Product.__table__, rows, lambda i: {
+            'name': f'Product {i}', 'category': CATEGORIES[i % len(CATEGORIES)],
+            'description': 'Seeded product listing', 'price': 10 + i % 500, 'quantity': 1 + i % 40,
+            'location': 'Lahore', 'contact': '03001234567', 'user_id': i % users + 1,
+            'created_at': stamp(i), 'updated_at': stamp(i)}),
+    ]
+    for table, total, make_row in tables:
+        began = time.perf_counter()
+        for batch in _batches(total, make_row):
+            with engine.begin() as conn:
+                conn.execute(table.insert(), batch)
+        print(f'seeded {table.name:<9} {total:>9,} rows in {time.perf_counter() - began:.1f}s')
+    with engine.begin() as conn:
+        conn.execute(text('ANALYZE'))
+
+
+def query_shapes(rows):
+    post_id = rows // 2
+    return {
+        'products_list': db.select(Product).order_by(Product.created_at.desc()).limit(12),
+        'products_list?category': db.select(Product).where(Product.category == 'fruits')
+                                    .order_by(Product.created_at.desc()).limit(12),
+        'discussions_list': db.select(Post).order_by(Post.created_at.desc()).limit(10),
+        'consultants_list': db.select(User).where(User.role == 'consultant').limit(50),
+        'view_post comments': db.select(Comment).where(Comment.post_id == post_id)
+                                .order_by(Comment.created_at.desc()),
+        'likes by post': db.select(db.func.count(Like.id)).where(Like.post_id == post_id),
+    }
+
+
+def report(engine, rows, label):
+    print(f'\n== {label} ==')
+    with engine.connect() as conn:
+        for name, stmt in query_shapes(rows).items():
+            sql = str(stmt.compile(engine, compile_kwargs={'literal_binds': True}))
+            plan = '; '.join(row[-1] for row in conn.execute(text('EXPLAIN QUERY PLAN ' + sql)))
+            timings = []
+            for _ in range(5):
+                began = time.perf_counter()
+                conn.execute(text(sql)).fetchall()
+                timings.append((time.perf_counter() - began) * 1000)
+            print(f'{name:<24} {statistics.median(timings):9.2f} ms  {plan}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--db', default=os.path.join(tempfile.gettempdir(), 'agrifarma_bench.db'))
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        os.remove(args.db)
+    engine = create_engine('sqlite:///' + args.db)
+    upgrade(engine)
+    seed(engine, args.rows)
+    report(engine, args.rows, 'with indexes')
+
+    with engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.drop(conn)
+    # fresh connections, so no statement prepared against the old schema is reused
+    engine.dispose()
+    report(engine, args.rows, 'without indexes')
+    engine.dispose()
+    os.remove(args.db)
+
+
+if __name__ == '__main__':
+    main()
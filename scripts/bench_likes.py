@@ -0,0 +1,118 @@
+"""Double-click and concurrent like storms: check-then-insert vs ON CONFLICT.
+
+Every user double-clicks "like" on the same posts: two threads send the same
+like at once, then the same unlike at once. "check-then-write" is the
+previous like_post (look the like up, then insert or delete it);
+"idempotent" is services/counters.set_post_like. Reports requests that
+failed and how far the stored like_count drifted from the likes table.
+
+    py scripts\\bench_likes.py [--users 40] [--posts 5] [--rounds 5]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BENCH_DB = os.path.join(tempfile.gettempdir(), 'agrifarma_likes_bench.db')
+os.environ['DATABASE_URL'] = 'sqlite:///' + BENCH_DB
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from app import create_app
+from extensions import db
+from models.blog import Like, Post
+from models.user import User
+from services.counters import adjust_post_counters, set_post_like
+
+
+def check_then_write(post_id, user_id, liked):
+    warnings.filterwarnings('ignore', 'DELETE statement on table')  # the lost race, counted as drift
+    existing = Like.query.filter_by(post_id=post_id, user_id=user_id).first()
+    if liked and not existing:
+        db.session.add(Like(post_id=post_id, user_id=user_id))
+        adjust_post_counters(post_id, likes=1)
+    elif not liked and existing:
+        db.session.delete(existing)
+        adjust_post_counters(post_id, likes=-1)
+
+
+def idempotent(post_id, user_id, liked):
+    set_post_like(post_id, user_id, liked)
+
+
+def storm(app, action, users, post_ids, rounds):
+    failures = []
+    barrier = threading.Barrier(2)
+
+    def click(user_id):
+        with app.app_context():
+            for _ in range(rounds):
+                for liked in (True, False):
+                    for post_id in post_ids:
+                        barrier.wait()  # both clicks of the pair start together
+                        try:
+                            action(post_id, user_id, liked)
+                            db.session.commit()
+                        except IntegrityError:
+                            db.session.rollback()
+                            failures.append(1)
+            db.session.remove()
+
+    began = time.perf_counter()
+    for user_id in users:
+        pair = [threading.Thread(target=click, args=(user_id,)) for _ in range(2)]
+        for thread in pair:
+            thread.start()
+        for thread in pair:
+            thread.join()
+    elapsed = time.perf_counter() - began
+
+    with app.app_context():
+        actual = dict(db.session.execute(select(Like.post_id, func.count()).group_by(Like.post_id)).all())
+        stored = dict(db.session.execute(select(Post.id, Post.like_count).where(Post.id.in_(post_ids))).all())
+        drift = sum(abs(stored[post_id] - actual.get(post_id, 0)) for post_id in post_ids)
+    requests = len(users) * rounds * 2 * len(post_ids) * 2
+    return requests, len(failures), drift, requests / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=40)
+    parser.add_argument('--posts', type=int, default=5)
+    parser.add_argument('--rounds', type=int, default=5)
+    args = parser.parse_args()
+
+    if os.path.exists(BENCH_DB):
+        os.remove(BENCH_DB)
+    app = create_app()
+    with app.app_context():
+        users = [User(username=f'clicker{n}', email=f'clicker{n}@example.com', role='farmer', password_hash='x')
+                 for n in range(args.users)]
+        db.session.add_all(users)
+        db.session.flush()
+        posts = [Post(title=f'Post {n}', content='...', user_id=users[0].id) for n in range(args.posts)]
+        db.session.add_all(posts)
+        db.session.commit()
+        user_ids, post_ids = [u.id for u in users], [p.id for p in posts]
+
+    print(f'{"variant":<17} {"requests":>9} {"failed":>7} {"count drift":>12} {"requests/s":>11}')
+    for label, action in (('check-then-write', check_then_write), ('idempotent', idempotent)):
+        with app.app_context():
+            db.session.execute(Like.__table__.delete())
+            db.session.execute(Post.__table__.update().values(like_count=0))
+            db.session.commit()
+        requests, failed, drift, rate = storm(app, action, user_ids, post_ids, args.rounds)
+        print(f'{label:<17} {requests:9d} {failed:7d} {drift:12d} {rate:11.0f}')
+
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    os.remove(BENCH_DB)
+
+
+if __name__ == '__main__':
+    main()
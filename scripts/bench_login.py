@@ -0,0 +1,85 @@
+"""Logins per second per core for candidate password hash settings.
+
+For each PASSWORD_HASH_METHOD candidate, times password verification on
+one thread (= logins/second one core can serve) and full POST /login
+requests through the app with the hashing pool, so the cost of a setting
+can be weighed before changing it. The last column shows how many more
+logins the available cores could serve in parallel.
+
+    py scripts\\bench_login.py [--seconds 3]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BENCH_DB = os.path.join(tempfile.gettempdir(), 'agrifarma_login_bench.db')
+os.environ['DATABASE_URL'] = 'sqlite:///' + BENCH_DB
+
+from werkzeug.security import check_password_hash, generate_password_hash
+from app import create_app
+from extensions import db
+from models.user import User
+
+METHODS = ['pbkdf2:sha256:600000', 'scrypt:16384:8:1', 'scrypt:32768:8:1', 'scrypt:65536:8:1']
+
+
+def rate(fn, seconds):
+    count, began = 0, time.perf_counter()
+    while time.perf_counter() - began < seconds:
+        fn()
+        count += 1
+    return count / (time.perf_counter() - began)
+
+
+def parallel_rate(fn, seconds, threads):
+    with ThreadPoolExecutor(threads) as pool:
+        return sum(pool.map(lambda _: rate(fn, seconds), range(threads)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=3.0)
+    args = parser.parse_args()
+    cores = os.cpu_count() or 1
+
+    if os.path.exists(BENCH_DB):
+        os.remove(BENCH_DB)
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+    app.config['RATE_LIMITS'] = dict.fromkeys(app.config['RATE_LIMITS'], (10 ** 9, 60))
+    client = app.test_client()
+
+    print(f'{cores} core(s)\n')
+    print(f'{"method":<22} {"verify/s/core":>14} {"POST /login/s":>14} {"all cores":>10}')
+    for method in METHODS:
+        stored = generate_password_hash('secret1', method)
+        per_core = rate(lambda: check_password_hash(stored, 'secret1'), args.seconds)
+        all_cores = parallel_rate(lambda: check_password_hash(stored, 'secret1'), args.seconds, cores)
+
+        app.config['PASSWORD_HASH_METHOD'] = method
+        with app.app_context():
+            User.query.filter_by(username='bench').delete()
+            user = User(username='bench', email='bench@example.com', role='farmer', profile_complete=True)
+            user.set_password('secret1')
+            db.session.add(user)
+            db.session.commit()
+
+        def login():
+            response = client.post('/login', data={'username': 'bench', 'password': 'secret1'})
+            assert response.status_code == 302, response.status_code
+            client.get('/logout')
+        logins = rate(login, args.seconds)
+        print(f'{method:<22} {per_core:14.1f} {logins:14.1f} {all_cores:10.1f}')
+
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    os.remove(BENCH_DB)
+
+
+if __name__ == '__main__':
+    main()
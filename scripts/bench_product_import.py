@@ -0,0 +1,143 @@
+"""Bulk product import and export throughput at 100k rows.
+
+Writes a synthetic catalogue (1% invalid rows) as CSV and JSON Lines, then
+times:
+- "row by row": what listing each product through /list-product costs
+  (form validation, ORM add, flush, index, commit per product), on
+  --baseline-rows rows
+- services/catalog.import_products on the whole file, per format
+- services/catalog.export_products back to disk
+Peak memory is the process high-water mark. Rows are streamed, so it does
+not grow with the file; what growth there is comes from SQLite mapping the
+growing database file (mmap_size in SQLITE_PRAGMAS, 128 MB).
+
+    py scripts\\bench_product_import.py [--rows 100000] [--baseline-rows 2000] [--batch-size 500]
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BENCH_DIR = tempfile.mkdtemp(prefix='agrifarma_import_bench_')
+BENCH_DB = os.path.join(BENCH_DIR, 'bench.db')
+os.environ['DATABASE_URL'] = 'sqlite:///' + BENCH_DB
+
+from werkzeug.datastructures import MultiDict
+from app import create_app
+from extensions import db
+from forms.product import ProductRowForm
+from models.product import Product
+from models.user import User
+from services.catalog import FIELDS, REQUIRED, export_products, import_products, read_rows
+from services.search import index_document
+
+CATEGORIES = ['vegetables', 'fruits', 'grains', 'dairy', 'specialty', 'inputs']
+PRODUCE = ['tomatoes', 'potatoes', 'onions', 'mangoes', 'wheat', 'rice', 'honey', 'seeds', 'okra']
+CITIES = ['Lahore', 'Multan', 'Faisalabad', 'Karachi', 'Peshawar', 'Quetta', 'Sialkot']
+
+
+def synthetic_rows(count):
+    for n in range(count):
+        row = {
+            'name': f'Fresh {random.choice(PRODUCE)} lot {n}',
+            'category': random.choice(CATEGORIES),
+            'description': 'Harvested this season, packed in clean bags, available for wholesale buyers.',
+            'price': round(random.uniform(50, 5000), 2),
+            'quantity': random.randint(1, 1000),
+            'location': random.choice(CITIES),
+            'contact': '0300-1234567',
+            'image': '',
+        }
+        if n % 100 == 99:
+            row['price'] = -1  # rejected by NumberRange
+        yield row
+
+
+def write_files(count):
+    csv_path, jsonl_path = os.path.join(BENCH_DIR, 'products.csv'), os.path.join(BENCH_DIR, 'products.jsonl')
+    with open(csv_path, 'w', newline='', encoding='utf-8') as csv_file, \
+            open(jsonl_path, 'w', encoding='utf-8') as jsonl_file:
+        writer = csv.DictWriter(csv_file, fieldnames=FIELDS)
+        writer.writeheader()
+        for row in synthetic_rows(count):
+            writer.writerow(row)
+            jsonl_file.write(json.dumps(row) + '\n')
+    return csv_path, jsonl_path
+
+
+def peak_memory_mb():
+    try:
+        import resource
+    except ImportError:
+        return float('nan')  # Windows
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 1024
+
+
+def row_by_row(rows, user_id):
+    for _, record in rows:
+        form = ProductRowForm(formdata=MultiDict(record))
+        if not form.validate():
+            continue
+        product = Product(user_id=user_id, **{name: getattr(form, name).data for name in REQUIRED})
+        db.session.add(product)
+        db.session.flush()
+        index_document('products', product)
+        db.session.commit()
+
+
+def report(label, rows, seconds):
+    print(f'{label:<24} {rows:8d} rows {seconds:8.2f} s {rows / seconds:10.0f} rows/s '
+          f'peak RSS {peak_memory_mb():6.1f} MB')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--baseline-rows', type=int, default=2000)
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    random.seed(22)
+    csv_path, jsonl_path = write_files(args.rows)
+    app = create_app()
+    with app.app_context():
+        seller = User(username='seller', email='seller@example.com', password_hash='x', role='vendor')
+        db.session.add(seller)
+        db.session.commit()
+
+        with open(csv_path, 'rb') as data:
+            baseline = [row for _, row in zip(range(args.baseline_rows), read_rows(data, 'csv'))]
+        began = time.perf_counter()
+        row_by_row(baseline, seller.id)
+        report('row by row', len(baseline), time.perf_counter() - began)
+
+        for fmt, path in (('csv', csv_path), ('jsonl', jsonl_path)):
+            with open(path, 'rb') as data:
+                began = time.perf_counter()
+                result = import_products(read_rows(data, fmt), seller.id, batch_size=args.batch_size)
+                elapsed = time.perf_counter() - began
+            report(f'import {fmt}', result.imported + result.failed, elapsed)
+            print(f'{"":<24} {result.imported} imported, {result.failed} rejected')
+
+        total = Product.query.count()
+        for fmt in ('csv', 'jsonl'):
+            began = time.perf_counter()
+            with open(os.path.join(BENCH_DIR, f'export.{fmt}'), 'w', encoding='utf-8', newline='') as out:
+                out.writelines(export_products(Product.query, fmt))
+            report(f'export {fmt}', total, time.perf_counter() - began)
+
+        db.session.remove()
+        db.engine.dispose()
+    for name in os.listdir(BENCH_DIR):
+        os.remove(os.path.join(BENCH_DIR, name))
+    os.rmdir(BENCH_DIR)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+"""Load test: legitimate sign-ins during a credential-stuffing burst.
+
+Attacker threads post wrong passwords for existing accounts from a handful
+of IP addresses at a fixed aggregate rate (the attack clients share this
+machine's CPU, so an unpaced flood would mostly measure the test client), while one real user signs in every
+half second from their own address. Runs without an attack as a baseline,
+then under attack with limits disabled and with the configured
+RATE_LIMITS, and reports the real user's
+sign-in latency and how many attacker attempts reached password hashing.
+
+    py scripts\\bench_rate_limit.py [--seconds 30] [--rate 50] [--attackers 8] [--attacker-ips 4]
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BENCH_DB = os.path.join(tempfile.gettempdir(), 'agrifarma_rate_limit_bench.db')
+os.environ['DATABASE_URL'] = 'sqlite:///' + BENCH_DB
+
+import services.passwords
+from app import create_app
+from extensions import db
+from models.user import User
+
+VICTIMS = 500
+
+UNLIMITED = {'login-ip': (10 ** 9, 60), 'login-account': (10 ** 9, 300), 'register-ip': (10 ** 9, 3600)}
+
+
+def run(app, seconds, attackers, attacker_ips, rate):
+    app.extensions.pop('rate_limit_store', None)
+    stop = time.perf_counter() + seconds
+    statuses, latencies, hashed, lock = [], [], [], threading.Lock()
+
+    check = services.passwords.check_password_hash
+    def counting_check(*args):
+        hashed.append(1)
+        return check(*args)
+    services.passwords.check_password_hash = counting_check
+
+    def attack(n):
+        client = app.test_client()
+        ip = f'203.0.113.{n % attacker_ips + 1}'
+        i, interval = 0, attackers / rate
+        next_at = time.perf_counter() + n * interval / attackers
+        while next_at < stop and time.perf_counter() < stop:
+            time.sleep(max(0.0, next_at - time.perf_counter()))
+            next_at += interval
+            i += 1
+            response = client.post('/login', data={'username': f'victim{(n * 7919 + i) % VICTIMS}', 'password': 'hunter2'},
+                                   environ_base={'REMOTE_ADDR': ip})
+            with lock:
+                statuses.append(response.status_code)
+
+    def real_user():
+        client = app.test_client()
+        while time.perf_counter() < stop:
+            began = time.perf_counter()
+            response = client.post('/login', data={'username': 'farmer', 'password': 'secret1'},
+                                   environ_base={'REMOTE_ADDR': '198.51.100.7'})
+            if response.status_code == 302:
+                latencies.append((time.perf_counter() - began) * 1000)
+                client.get('/logout', environ_base={'REMOTE_ADDR': '198.51.100.7'})
+            time.sleep(0.5)
+
+    threads = [threading.Thread(target=attack, args=(n,)) for n in range(attackers)]
+    threads.append(threading.Thread(target=real_user))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    services.passwords.check_password_hash = check
+    return latencies, len(statuses), len(hashed) - len(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--rate', type=float, default=50, help='attacker attempts per second, all threads')
+    parser.add_argument('--attackers', type=int, default=8)
+    parser.add_argument('--attacker-ips', type=int, default=4)
+    args = parser.parse_args()
+
+    if os.path.exists(BENCH_DB):
+        os.remove(BENCH_DB)
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        user = User(username='farmer', email='farmer@example.com', role='farmer', profile_complete=True)
+        user.set_password('secret1')
+        db.session.add(user)
+        # victims share one real hash so seeding doesn't take minutes
+        victim_hash = services.passwords.hash_password('correct horse')
+        db.session.add_all(User(username=f'victim{n}', email=f'victim{n}@example.com', role='customer',
+                                password_hash=victim_hash) for n in range(VICTIMS))
+        db.session.commit()
+
+    print(f'{args.attackers} attacker threads from {args.attacker_ips} IPs at {args.rate:.0f} attempts/s, '
+          f'{args.seconds:.0f}s per run\n')
+    configured = app.config['RATE_LIMITS']
+    runs = (('no attack', configured, 0), ('no limits', UNLIMITED, args.attackers),
+            ('rate limited', configured, args.attackers))
+    for label, limits, attackers in runs:
+        app.config['RATE_LIMITS'] = limits
+        latencies, attempts, hashed = run(app, args.seconds, attackers, args.attacker_ips, args.rate)
+        latencies.sort()
+        p95 = latencies[int(len(latencies) * 0.95)] if latencies else float('nan')
+        median = statistics.median(latencies) if latencies else float('nan')
+        print(f'{label:<13} real user: {len(latencies):3d} sign-ins, median {median:7.0f} ms, p95 {p95:7.0f} ms | '
+              f'attacker: {attempts:6d} attempts, {hashed:5d} hashed')
+
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    os.remove(BENCH_DB)
+
+
+if __name__ == '__main__':
+    main()
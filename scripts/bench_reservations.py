@@ -0,0 +1,166 @@
+"""Many buyers checking out the same popular product at once: overselling and throughput.
+
+Threads check out for --seconds. Most checkouts take 1-3 units of one
+popular listing; every fifth also takes a second product in the same
+transaction. Some orders are cancelled, and some are given a 1 second hold
+that a sweeper thread expires, so stock flows back while buyers compete.
+
+Two strategies are compared:
+- "read then write": SELECT the quantity, then UPDATE it to the value
+  computed in Python, the way a naive order view would
+- "conditional UPDATE": services/orders.reserve()
+
+At the end, the stock left plus the stock held by pending and confirmed
+orders must equal the stock listed. More than that is overselling.
+Requests handled (checkouts and refusals) are counted per second of the
+run, so stalls would show up.
+
+    py scripts\\bench_reservations.py [--threads 16] [--seconds 10] [--stock 5000]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BENCH_DB = os.path.join(tempfile.gettempdir(), 'agrifarma_reservations_bench.db')
+os.environ['DATABASE_URL'] = 'sqlite:///' + BENCH_DB
+
+from datetime import datetime, timedelta
+from sqlalchemy import func, select, text
+from sqlalchemy.exc import OperationalError
+from app import create_app
+from extensions import db
+from models.order import Order, OrderItem
+from models.product import Product
+from models.user import User
+from services.orders import OutOfStock, cancel, confirm, expire_reservations, reserve
+
+PRODUCTS = 5  # product 1 is the popular one
+
+
+def naive_reserve(user_id, quantities, hold_seconds):
+    """Check stock with a SELECT, then write the difference computed in Python"""
+    for product_id, quantity in sorted(quantities.items()):
+        available = db.session.scalar(select(Product.quantity).where(Product.id == product_id))
+        if available < quantity:
+            db.session.rollback()
+            raise OutOfStock(product_id, quantity)
+        db.session.execute(text('UPDATE products SET quantity = :left WHERE id = :id'),
+                           {'left': available - quantity, 'id': product_id})
+    now = datetime.utcnow()
+    order = Order(user_id=user_id, status='pending', created_at=now, expires_at=now + timedelta(seconds=hold_seconds))
+    order.items = [OrderItem(product_id=product_id, name='x', price=1.0, quantity=quantity)
+                   for product_id, quantity in quantities.items()]
+    db.session.add(order)
+    db.session.commit()
+    return order
+
+
+def buyer(app, user_id, checkout, deadline, stats, seed):
+    rng = random.Random(seed)
+    with app.app_context():
+        while time.perf_counter() < deadline:
+            quantities = {1: rng.randint(1, 3)}
+            if rng.random() < 0.2:
+                quantities[rng.randint(2, PRODUCTS)] = 1
+            expires_soon = rng.random() < 0.3
+            try:
+                order = checkout(user_id, quantities, 1 if expires_soon else 600)
+            except OutOfStock:
+                stats['refused'].append(time.perf_counter())
+                continue
+            except OperationalError:
+                db.session.rollback()
+                stats['errors'] += 1
+                continue
+            stats['times'].append(time.perf_counter())
+            if not expires_soon:
+                if rng.random() < 0.2:
+                    cancel(order.id, user_id)
+                else:
+                    confirm(order.id, user_id)
+            db.session.remove()
+
+
+def sweeper(app, deadline):
+    with app.app_context():
+        while time.perf_counter() < deadline:
+            time.sleep(0.2)
+            try:
+                expire_reservations()
+            except OperationalError:
+                db.session.rollback()
+
+
+def run(app, label, checkout, args):
+    with app.app_context():
+        db.session.execute(text('DELETE FROM order_items'))
+        db.session.execute(text('DELETE FROM orders'))
+        db.session.execute(text('UPDATE products SET quantity = :stock'), {'stock': args.stock})
+        db.session.commit()
+        listed = args.stock * PRODUCTS
+
+    stats = {'times': [], 'refused': [], 'errors': 0}
+    began = time.perf_counter()
+    deadline = began + args.seconds
+    threads = [threading.Thread(target=buyer, args=(app, n + 2, checkout, deadline, stats, n))
+               for n in range(args.threads)]
+    threads.append(threading.Thread(target=sweeper, args=(app, deadline)))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with app.app_context():
+        left = db.session.scalar(select(func.sum(Product.quantity)))
+        held = db.session.scalar(
+            select(func.coalesce(func.sum(OrderItem.quantity), 0)).join(Order)
+            .where(Order.status.in_(['pending', 'confirmed']))) or 0
+        db.session.remove()
+    per_second = [0] * args.seconds
+    for moment in stats['times'] + stats['refused']:
+        per_second[min(int(moment - began), args.seconds - 1)] += 1
+    print(f'{label}: {len(stats["times"])} checkouts, {len(stats["refused"])} refused as out of stock, '
+          f'{stats["errors"]} database errors')
+    print(f'  requests/s: median {statistics.median(per_second):.0f}, '
+          f'min {min(per_second)}, max {max(per_second)}')
+    print(f'  stock listed {listed}, left {left} + held by orders {held} = {left + held} '
+          f'-> oversold by {max(0, left + held - listed)}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--seconds', type=int, default=10)
+    parser.add_argument('--stock', type=int, default=5000)
+    args = parser.parse_args()
+
+    if os.path.exists(BENCH_DB):
+        os.remove(BENCH_DB)
+    app = create_app()
+    with app.app_context():
+        db.session.add_all(User(username=f'buyer{n}', email=f'buyer{n}@example.com', role='farmer',
+                                password_hash='x') for n in range(args.threads))
+        db.session.add_all(Product(name=f'Product {n}', category='vegetables', description='Bench product',
+                                   price=100.0, quantity=args.stock, location='Lahore', contact='03001234567',
+                                   user_id=1) for n in range(PRODUCTS))
+        db.session.commit()
+
+    run(app, 'read then write', naive_reserve, args)
+    run(app, 'conditional UPDATE', lambda user_id, quantities, hold: reserve(user_id, quantities, hold), args)
+
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(BENCH_DB + suffix):
+            os.remove(BENCH_DB + suffix)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""Time full-text product searches over a large seeded catalog.
+
+Seeds a scratch SQLite database with synthetic listings (1M by default),
+builds the FTS5 index and reports median latency for typical searches:
+rare and common words, prefixes and multi-word queries.
+
+    py scripts\\bench_search.py [--rows 1000000]
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BENCH_DB = os.path.join(tempfile.gettempdir(), 'agrifarma_search_bench.db')
+os.environ['DATABASE_URL'] = 'sqlite:///' + BENCH_DB
+
+from app import create_app
+from extensions import db
+from models.user import User
+from models.product import Product
+from services.search import SQLiteFTSBackend, get_backend
+
+CATEGORIES = ['vegetables', 'fruits', 'grains', 'dairy', 'specialty', 'inputs']
+PRODUCE = ['tomatoes', 'potatoes', 'onions', 'mangoes', 'oranges', 'wheat', 'rice', 'maize',
+           'milk', 'butter', 'honey', 'fertilizer', 'seeds', 'okra', 'spinach', 'guava',
+           'dates', 'cotton', 'sugarcane', 'chillies', 'garlic', 'apricots', 'lentils', 'ghee']
+ADJECTIVES = ['fresh', 'organic', 'premium', 'local', 'sun dried', 'grade a', 'hybrid', 'desi']
+CITIES = ['Lahore', 'Multan', 'Faisalabad', 'Karachi', 'Peshawar', 'Quetta', 'Sialkot',
+          'Hyderabad', 'Bahawalpur', 'Sargodha', 'Okara', 'Sahiwal', 'Gujranwala', 'Kasur']
+FILLER = ('harvested this season delivered in bulk packed in clean bags quality checked '
+          'available for wholesale buyers direct from the farm').split()
+QUERIES = ['tomatoes', 'organic mangoes', 'organic mangoes multan', 'tom', 'fert',
+           'premium basmati', 'desi ghee lahore', 'apricots quetta', 'zzzz']
+
+
+def seed(rows):
+    db.session.add(User(username='seller', email='seller@example.com', password_hash='x', role='vendor'))
+    db.session.commit()
+    now = datetime.utcnow()
+    for start in range(0, rows, 50000):
+        batch = []
+        for i in range(start, min(start + 50000, rows)):
+            item = random.choice(PRODUCE)
+            batch.append({
+                'name': f'{random.choice(ADJECTIVES)} {item}'.title(),
+                'category': random.choice(CATEGORIES),
+                'description': ' '.join([item] + random.sample(FILLER, 8)),
+                'price': random.randint(50, 5000), 'quantity': random.randint(1, 500),
+                'location': random.choice(CITIES), 'contact': '03001234567', 'user_id': 1,
+                'created_at': now, 'updated_at': now,
+            })
+        db.session.execute(Product.__table__.insert(), batch)
+        db.session.commit()
+    began = time.perf_counter()
+    with db.engine.begin() as conn:
+        SQLiteFTSBackend.rebuild(conn)
+    print(f'seeded {rows:,} products, FTS index built in {time.perf_counter() - began:.1f}s')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    args = parser.parse_args()
+
+    if os.path.exists(BENCH_DB):
+        os.remove(BENCH_DB)
+    app = create_app()
+    with app.app_context():
+        seed(args.rows)
+        backend = get_backend()
+        for query in QUERIES:
+            for page in (1, 5):
+                timings = []
+                for _ in range(7):
+                    began = time.perf_counter()
+                    ids = backend.search('products', query, limit=13, offset=(page - 1) * 12)
+                    timings.append((time.perf_counter() - began) * 1000)
+                print(f'{query!r:<28} page {page}  {statistics.median(timings):8.2f} ms  ({len(ids)} ids)')
+        db.session.remove()
+        db.engine.dispose()
+    os.remove(BENCH_DB)
+
+
+if __name__ == '__main__':
+    main()
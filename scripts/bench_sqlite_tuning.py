@@ -0,0 +1,141 @@
+"""Concurrent write throughput on SQLite: default settings vs SQLITE_PRAGMAS.
+
+Writer processes do what the like and comment routes do (read the post,
+toggle a like or add a comment, bump the post's counters, commit) while
+reader processes page through the feed. Each profile gets a fresh database
+file, because journal_mode=wal is stored in the file itself. "default" is
+the previous setup: rollback journal, synchronous=full and only the
+driver's 5 s lock wait. The settings each profile actually ran with are
+read back from a connection and printed under its row.
+
+    py scripts\\bench_sqlite_tuning.py [--seconds 15] [--writers 8] [--readers 4]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BENCH_DB = os.path.join(tempfile.gettempdir(), 'agrifarma_sqlite_bench.db')
+USERS = 50
+POSTS = 200
+_tuned_pragmas = None
+
+
+def make_app(profile):
+    global _tuned_pragmas
+    os.environ['DATABASE_URL'] = 'sqlite:///' + BENCH_DB
+    from config import Config
+    if _tuned_pragmas is None:
+        _tuned_pragmas = Config.SQLITE_PRAGMAS
+    # set both ways: the parent process seeds one profile after the other
+    Config.SQLITE_PRAGMAS = {} if profile == 'default' else _tuned_pragmas
+    from app import create_app
+    return create_app()
+
+
+def seed(profile):
+    """Fresh database for a profile; returns the settings its connections get"""
+    from extensions import db
+    from services.database import sqlite_settings
+    from models.user import User
+    from models.blog import Post
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(BENCH_DB + suffix):
+            os.remove(BENCH_DB + suffix)
+    app = make_app(profile)
+    with app.app_context():
+        db.session.add_all(User(username=f'reader{n}', email=f'reader{n}@example.com', role='farmer',
+                                password_hash='x') for n in range(USERS))
+        db.session.flush()
+        db.session.add_all(Post(title=f'Post {n}', content='Crop rotation notes. ' * 40, user_id=n % USERS + 1)
+                           for n in range(POSTS))
+        db.session.commit()
+        settings = sqlite_settings(db.engine)
+        db.engine.dispose()
+    return settings
+
+
+def work(role, slot, writers, profile, seconds, start_at):
+    from sqlalchemy.exc import OperationalError
+    from extensions import db
+    from models.blog import Comment, Like, Post
+    from services.counters import adjust_post_counters
+    from services.feed import paginate_feed
+
+    app = make_app(profile)
+    rng = random.Random(os.getpid())
+    done, failed, latencies = 0, 0, []
+    with app.app_context():
+        time.sleep(max(0.0, start_at - time.time()))
+        stop = time.perf_counter() + seconds
+        while time.perf_counter() < stop:
+            began = time.perf_counter()
+            try:
+                if role == 'reader':
+                    [post.user.username for post in paginate_feed(rng.randint(1, 5)).items]
+                else:
+                    post = db.session.get(Post, rng.randint(1, POSTS))
+                    # each writer likes as its own users, so toggles never race each other
+                    user_id = rng.randrange(2 + slot, USERS + 2, writers)
+                    if rng.random() < 0.5:
+                        db.session.add(Comment(content='Same here, thanks!', user_id=user_id, post_id=post.id))
+                        adjust_post_counters(post.id, comments=1)
+                    else:
+                        like = Like.query.filter_by(post_id=post.id, user_id=user_id).first()
+                        if like:
+                            db.session.delete(like)
+                        else:
+                            db.session.add(Like(post_id=post.id, user_id=user_id))
+                        adjust_post_counters(post.id, likes=-1 if like else 1)
+                    db.session.commit()
+                done += 1
+                latencies.append((time.perf_counter() - began) * 1000)
+            except OperationalError:
+                db.session.rollback()
+                failed += 1
+            db.session.remove()
+    return role, done, failed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=15)
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=4)
+    args = parser.parse_args()
+
+    print(f'{args.writers} writer and {args.readers} reader processes, {args.seconds:.0f}s per profile, '
+          f'{os.cpu_count()} core(s)\n')
+    print(f'{"profile":<9} {"writes/s":>9} {"locked":>7} {"write p50":>10} {"write p99":>10} {"reads/s":>8}')
+    context = multiprocessing.get_context('spawn')
+    for profile in ('default', 'tuned'):
+        settings = seed(profile)
+        roles = ['writer'] * args.writers + ['reader'] * args.readers
+        with ProcessPoolExecutor(len(roles), mp_context=context) as pool:
+            start_at = time.time() + 3 + 0.3 * len(roles)  # after every worker has started its app
+            slots = list(range(args.writers)) + list(range(args.readers))
+            results = list(pool.map(work, roles, slots, [args.writers] * len(roles), [profile] * len(roles), [args.seconds] * len(roles),
+                                    [start_at] * len(roles)))
+        writes = [r for r in results if r[0] == 'writer']
+        reads = [r for r in results if r[0] == 'reader']
+        latencies = sorted(ms for r in writes for ms in r[3])
+        p50 = statistics.median(latencies) if latencies else float('nan')
+        p99 = latencies[int(len(latencies) * 0.99)] if latencies else float('nan')
+        print(f'{profile:<9} {sum(r[1] for r in writes) / args.seconds:9.0f} {sum(r[2] for r in writes):7d} '
+              f'{p50:8.1f}ms {p99:8.1f}ms {sum(r[1] for r in reads) / args.seconds:8.0f}')
+        print('          ' + ', '.join(f'{name}={value}' for name, value in settings.items()))
+
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(BENCH_DB + suffix):
+            os.remove(BENCH_DB + suffix)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Measure what loading the logged-in user costs per request.
+
+Compares the previous loader (``User.query.get``, every column), the
+current one (prebuilt primary-key SELECT with bio/password_hash deferred) and the
+current one with the per-process identity cache (USER_CACHE_TTL), each
+inside a fresh request context like a real authenticated request.
+
+    py scripts\\bench_user_loader.py [--requests 20000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+BENCH_DB = os.path.join(tempfile.gettempdir(), 'agrifarma_user_loader_bench.db')
+os.environ['DATABASE_URL'] = 'sqlite:///' + BENCH_DB
+
+from sqlalchemy import event
+from app import create_app
+from extensions import db
+from models.user import User, load_user
+
+
+def legacy_load_user(user_id):
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')  # Query.get is deprecated
+        return User.query.get(int(user_id))
+
+
+def measure(app, engine, loader, user_id, requests):
+    statements = []
+    listener = lambda *args: statements.append(1)
+    event.listen(engine, 'before_cursor_execute', listener)
+    try:
+        began = time.perf_counter()
+        for _ in range(requests):
+            with app.test_request_context('/dashboard'):
+                user = loader(str(user_id))
+                user.username, user.role, user.profile_image  # what templates read
+        elapsed = time.perf_counter() - began
+    finally:
+        event.remove(engine, 'before_cursor_execute', listener)
+    return elapsed / requests * 1e6, len(statements) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=20000)
+    args = parser.parse_args()
+
+    if os.path.exists(BENCH_DB):
+        os.remove(BENCH_DB)
+    app = create_app()
+    with app.app_context():
+        user = User(username='farmer', email='farmer@example.com', role='farmer', profile_complete=True,
+                    bio='Growing wheat and cotton near Multan. ' * 100, profile_image='profile/x.jpg')
+        user.set_password('secret1')
+        db.session.add(user)
+        db.session.commit()
+        user_id = user.id
+        engine = db.engine
+
+    # a request context with no work, to subtract from the others
+    began = time.perf_counter()
+    for _ in range(args.requests):
+        with app.test_request_context('/dashboard'):
+            pass
+    empty = (time.perf_counter() - began) / args.requests * 1e6
+
+    results = [('User.query.get (before)', *measure(app, engine, legacy_load_user, user_id, args.requests))]
+    app.config['USER_CACHE_TTL'] = 0
+    results.append(('deferred columns', *measure(app, engine, load_user, user_id, args.requests)))
+    app.config['USER_CACHE_TTL'] = 30
+    results.append(('identity cache (30 s)', *measure(app, engine, load_user, user_id, args.requests)))
+    engine.dispose()
+
+    print(f'empty request context: {empty:.1f} us\n')
+    for label, micros, queries in results:
+        print(f'{label:<26} {micros - empty:7.1f} us/request  {queries:.2f} queries/request')
+    os.remove(BENCH_DB)
+
+
+if __name__ == '__main__':
+    main()
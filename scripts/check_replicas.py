@@ -0,0 +1,100 @@
+"""Walk through read/write splitting with two local SQLite files.
+
+The primary and a "replica" are separate files; the replica is refreshed
+by copying the primary (standing in for replication) only when this script
+says so, so it lags like a real replica would. Each step prints which
+database answered the request's queries:
+
+1. an anonymous visitor reads a post: replica
+2. a user signs in and comments: primary
+3. the same user reloads the post: primary (sticky), comment visible
+4. after REPLICA_STICKY_SECONDS: replica again, comment missing until the
+   replica catches up
+5. after the replica is refreshed: replica, comment visible
+
+    py scripts\\check_replicas.py
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+PRIMARY_DB = os.path.join(tempfile.gettempdir(), 'agrifarma_primary.db')
+REPLICA_DB = os.path.join(tempfile.gettempdir(), 'agrifarma_replica.db')
+os.environ['DATABASE_URL'] = 'sqlite:///' + PRIMARY_DB
+os.environ['DATABASE_REPLICA_URLS'] = 'sqlite:///' + REPLICA_DB
+os.environ['REPLICA_STICKY_SECONDS'] = '2'
+os.environ['PAGE_CACHE_TTL'] = '0'
+
+from sqlalchemy import event
+from app import create_app
+from extensions import db
+from models.blog import Post
+from models.user import User
+
+COMMENT = 'Mulch keeps the soil moist.'
+
+
+def remove_files():
+    for path in (PRIMARY_DB, REPLICA_DB):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+
+def replicate():
+    """Copy the primary over the replica (a stand-in for replication)"""
+    source, target = sqlite3.connect(PRIMARY_DB), sqlite3.connect(REPLICA_DB)
+    source.backup(target)
+    source.close()
+    target.close()
+
+
+def main():
+    remove_files()
+    app = create_app()
+    app.config['WTF_CSRF_ENABLED'] = False
+    with app.app_context():
+        user = User(username='farmer', email='farmer@example.com', role='farmer', profile_complete=True)
+        user.set_password('secret1')
+        post = Post(title='Dry season tips', content='Water early in the morning.', user=user)
+        db.session.add(post)
+        db.session.commit()
+        post_id = post.id
+        engines = {'primary': db.engines[None], 'replica': db.engines['replica0']}
+    replicate()
+
+    counts = dict.fromkeys(engines, 0)
+    for name, engine in engines.items():
+        event.listen(engine, 'before_cursor_execute',
+                     lambda *args, name=name: counts.__setitem__(name, counts[name] + 1))
+
+    def step(label, method, url, **kwargs):
+        for name in counts:
+            counts[name] = 0
+        response = getattr(client, method)(url, **kwargs)
+        queries = ', '.join(f'{name} {count}' for name, count in counts.items())
+        shown = 'yes' if COMMENT.encode() in response.data else 'no'
+        print(f'{label:<34} {response.status_code}  queries: {queries:<22} comment shown: {shown}')
+
+    client = app.test_client()
+    step('anonymous reads the post', 'get', f'/blog/{post_id}')
+    step('user signs in', 'post', '/login', data={'username': 'farmer', 'password': 'secret1'})
+    step('user comments', 'post', f'/blog/{post_id}', data={'content': COMMENT})
+    step('user reloads the post', 'get', f'/blog/{post_id}')
+    time.sleep(app.config['REPLICA_STICKY_SECONDS'] + 1)
+    step('...after the sticky period', 'get', f'/blog/{post_id}')
+    replicate()
+    step('...after the replica catches up', 'get', f'/blog/{post_id}')
+
+    with app.app_context():
+        db.session.remove()
+        for engine in engines.values():
+            engine.dispose()
+    remove_files()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+"""Release pending orders whose reservation expired, returning their stock.
+
+Run every few minutes (cron, Task Scheduler). Checkouts also release a
+product's expired orders on their own when they find it short, so this
+only keeps listed stock accurate in between (see services/orders.py).
+
+    py scripts\\expire_reservations.py [--batch-size 500]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from services.orders import expire_reservations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--batch-size', type=int, default=500)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        expired = expire_reservations(batch_size=args.batch_size)
+    print(f'{expired} expired order(s) released.')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""Import products for a user from a CSV or JSON Lines file, or export them.
+
+Same rules and batching as the /products/import page (see
+services/catalog.py), without the upload size limit, for vendors moving a
+whole catalogue in at once.
+
+    py scripts\\import_products.py USERNAME products.csv [--images photos.zip] [--batch-size 500]
+    py scripts\\import_products.py USERNAME products.jsonl --export
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from models.product import Product
+from models.user import User
+from services.catalog import ImageArchive, export_products, format_for, import_products, read_rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('username')
+    parser.add_argument('path', help='.csv or .jsonl file')
+    parser.add_argument('--images', help='ZIP archive holding the files named in the image column')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--export', action='store_true', help="write the user's products to PATH instead")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        user = User.query.filter_by(username=args.username).first()
+        if user is None:
+            sys.exit(f'No user named {args.username}')
+        fmt = format_for(args.path)
+        if args.export:
+            with open(args.path, 'w', encoding='utf-8', newline='') as out:
+                out.writelines(export_products(Product.query.filter_by(user_id=user.id), fmt))
+            print(f'Exported to {args.path}')
+            return
+
+        with open(args.path, 'rb') as data:
+            archive = ImageArchive(open(args.images, 'rb')) if args.images else None
+            report = import_products(read_rows(data, fmt), user.id, archive=archive,
+                                     batch_size=args.batch_size)
+    for line, errors in report.errors:
+        print(f'line {line}: ' + '; '.join(f'{field}: {", ".join(messages)}' for field, messages in errors.items()))
+    if report.aborted:
+        print(f'Import stopped: {report.aborted}')
+    print(f'{report.imported} product(s) imported, {report.failed} row(s) skipped.')
+
+
+if __name__ == '__main__':
+    main()
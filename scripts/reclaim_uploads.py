@@ -0,0 +1,47 @@
+"""Delete uploaded images that no user, post or product references any more.
+
+Streams the upload storage in batches (see services/reclaim.py), so it
+can run against any number of files with bounded memory; interrupt it at
+any time and continue with --start-after <last key printed>. Files younger
+than --grace seconds are left alone, as they may belong to an upload still
+in flight.
+
+    py scripts\\reclaim_uploads.py [--dry-run] [--batch-size 1000] [--grace 3600] [--start-after KEY]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from services.reclaim import sweep_uploads
+
+
+def megabytes(size):
+    return f'{size / 2 ** 20:.1f} MB'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dry-run', action='store_true', help='report without deleting anything')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--grace', type=int, default=3600, help='seconds')
+    parser.add_argument('--start-after', help='resume after this key')
+    args = parser.parse_args()
+
+    def progress(report):
+        print(f'batch {report.batches}: {report.scanned} files scanned, {report.deleted} unreferenced '
+              f'({megabytes(report.reclaimed_bytes)}), last key {report.last_key}')
+
+    app = create_app()
+    with app.app_context():
+        report = sweep_uploads(batch_size=args.batch_size, grace=args.grace, dry_run=args.dry_run,
+                               start_after=args.start_after, progress=progress)
+    verb = 'Would reclaim' if args.dry_run else 'Reclaimed'
+    print(f'{verb} {megabytes(report.reclaimed_bytes)} from {report.deleted} of {report.scanned} file(s); '
+          f'{report.rows_deleted} unused image record(s) dropped, {report.refcounts_repaired} refcount(s) repaired.')
+
+
+if __name__ == '__main__':
+    main()
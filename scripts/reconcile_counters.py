@@ -0,0 +1,26 @@
+"""Repair the stored like/comment counters on posts.
+
+Recomputes the counters from the likes and comments tables. Safe to run at
+any time; only posts whose counters drifted are rewritten. (The columns are
+added and first backfilled by the 0002_post_counters migration.)
+
+    py scripts\\reconcile_counters.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from services.counters import reconcile_post_counters
+
+
+def main():
+    app = create_app()
+    with app.app_context():
+        repaired = reconcile_post_counters()
+        print(f'Reconciled counters: {repaired} post(s) repaired.')
+
+
+if __name__ == '__main__':
+    main()
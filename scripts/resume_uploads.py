@@ -0,0 +1,33 @@
+"""Process raw uploads that a crashed or restarted process left pending.
+
+Uploads wait under pending/ until a background job resizes them (see
+services/images.py). A job that never ran, or died halfway, leaves the
+upload there and its rows showing the placeholder. Run this once after a
+deploy or restart (not from every worker): it processes each pending
+upload older than --min-age seconds, including claims whose job died.
+
+    py scripts\\resume_uploads.py [--min-age 300]
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from services.images import resume_pending
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--min-age', type=int, default=300, help='seconds')
+    args = parser.parse_args()
+
+    app = create_app()
+    app.config['IMAGE_PROCESSING_SYNC'] = True  # process here and now, before exiting
+    count = resume_pending(app, min_age=args.min_age)
+    print(f'Processed {count} pending upload(s).')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Fingerprinted URLs for static files and uploads.
+
+``asset_url('static', filename=...)`` works like ``url_for`` but puts a hash
+of the file's content in the path (``/assets/3f2a9c01d4e5/images/slide1.jpeg``),
+so the response can be cached forever: a changed file gets a new URL.
+Content-addressed uploads (``<sha256>.jpg``, see services/images.py) are
+their own fingerprint and are never read to compute one.
+"""
+import hashlib
+import os
+import posixpath
+import string
+from stat import S_ISREG
+import threading
+from flask import current_app, url_for
+
+FINGERPRINT_LENGTH = 12
+UPLOADS_PREFIX = 'uploads/'
+
+_fingerprints = {}  # absolute path -> (mtime_ns, size, fingerprint)
+_fingerprints_lock = threading.Lock()
+
+
+def normalize(filename):
+    """
+    A requested static filename in canonical form, confined to its folder
+    Returns:
+        str: the path with ``.`` segments and duplicate slashes removed, or
+        None if it is absolute or climbs out with ``..``
+    """
+    if not filename or '\\' in filename or '\0' in filename or filename.startswith('/'):
+        return None
+    name = posixpath.normpath(filename)
+    if name == '.' or name == '..' or name.startswith('../') or os.path.isabs(name):
+        return None
+    return name
+
+
+def resolve(filename):
+    """
+    Map a static filename to the directory it is served from
+    ``uploads/...`` lives in UPLOAD_FOLDER (which need not be under static/);
+    raw, not yet processed uploads are never served.
+    Returns:
+        tuple: (directory, normalized path within it), or (None, None) if
+        not servable
+    """
+    filename = normalize(filename)
+    if filename is None:
+        return None, None
+    if filename.startswith(UPLOADS_PREFIX):
+        name = filename[len(UPLOADS_PREFIX):]
+        if name == 'pending' or name.startswith('pending/'):
+            return None, None
+        return current_app.config['UPLOAD_FOLDER'], name
+    return current_app.static_folder, filename
+
+
+def _named_by_content(name):
+    stem = os.path.basename(name)[:64]
+    return len(stem) == 64 and all(c in string.hexdigits for c in stem)
+
+
+def file_fingerprint(filename):
+    """Short content hash of a static file, or None if it does not exist"""
+    directory, name = resolve(filename)
+    if name is None:
+        return None
+    if _named_by_content(name):
+        return os.path.basename(name)[:FINGERPRINT_LENGTH]
+    path = os.path.join(directory, name)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    if not S_ISREG(stat.st_mode):
+        return None
+    with _fingerprints_lock:
+        cached = _fingerprints.get(path)
+    if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+    fingerprint = digest.hexdigest()[:FINGERPRINT_LENGTH]
+    with _fingerprints_lock:
+        _fingerprints[path] = (stat.st_mtime_ns, stat.st_size, fingerprint)
+    return fingerprint
+
+
+def asset_url(endpoint, **values):
+    """
+    ``url_for`` replacement that fingerprints static files
+    Args:
+        endpoint: any endpoint; only 'static' is rewritten
+        **values: url_for arguments (``filename`` for static)
+    Returns:
+        str: ``/assets/<fingerprint>/<filename>`` for existing static files,
+        otherwise exactly what ``url_for`` returns
+    """
+    if endpoint != 'static' or 'filename' not in values:
+        return url_for(endpoint, **values)
+    fingerprint = file_fingerprint(values['filename'])
+    if fingerprint is None:
+        return url_for(endpoint, **values)
+    return url_for('assets.serve', fingerprint=fingerprint, **values)
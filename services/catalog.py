@@ -0,0 +1,247 @@
+"""Bulk import and export of product listings.
+
+Imports read CSV or JSON Lines one record at a time. Each row is checked
+by ``ProductRowForm``, which applies ProductForm's rules. Valid rows are
+inserted ``batch_size`` at a time with one executemany per batch, and each
+batch is its own transaction. Invalid rows are skipped and reported with
+their line number. The file is never loaded into memory whole, so its size
+is bounded only by the upload limit (or not at all from
+scripts/import_products.py).
+
+An ``image`` column may name a file in a ZIP archive uploaded alongside.
+Each named image is validated like a form upload and stored through
+services/images.py, so identical pictures are stored once and resized by
+the background pool once their batch commits.
+
+Exports stream the same columns back out, so an export can be edited and
+re-imported.
+"""
+import codecs
+import csv
+import io
+import json
+import os
+import zipfile
+from flask import current_app
+from sqlalchemy import insert
+from sqlalchemy.exc import SQLAlchemyError
+from werkzeug.datastructures import FileStorage, MultiDict
+from extensions import db
+from forms.product import ProductRowForm
+from models.product import Product
+from services.geo import coordinates
+from services.images import ImageRejected, inspect_upload, upload_url
+from services.page_cache import invalidate_pages
+from services.search import index_new_rows
+from utils import allowed_file, save_picture
+
+FIELDS = ('name', 'category', 'description', 'price', 'quantity', 'location', 'contact', 'image')
+REQUIRED = FIELDS[:-1]
+FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+
+
+class ImportFormatError(ValueError):
+    """The file as a whole can't be imported (unknown format, missing columns)"""
+
+
+class ImportReport:
+    """Outcome of an import: counts plus the first ``max_errors`` row errors"""
+
+    def __init__(self, max_errors):
+        self.imported = 0
+        self.failed = 0
+        self.errors = []  # (line number, {field: [messages]})
+        self.max_errors = max_errors
+        self.aborted = None  # why the import stopped early (a batch could not be saved)
+
+    def reject(self, line, errors):
+        self.failed += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((line, errors))
+
+
+def format_for(filename):
+    """'csv' or 'jsonl' from a file name; ImportFormatError otherwise"""
+    fmt = FORMATS.get(os.path.splitext(filename or '')[1].lower())
+    if fmt is None:
+        raise ImportFormatError('Upload a .csv or .jsonl file')
+    return fmt
+
+
+def read_rows(stream, fmt):
+    """
+    Stream records from a binary file object
+    Args:
+        stream: binary file (an upload's stream, an open file)
+        fmt: 'csv' (with a header row) or 'jsonl' (one JSON object per line)
+    Yields:
+        tuple: (line number, dict of column -> value)
+    """
+    lines = codecs.iterdecode(stream, 'utf-8-sig')
+    if fmt == 'csv':
+        reader = csv.DictReader(lines)
+        missing = [name for name in REQUIRED if name not in (reader.fieldnames or ())]
+        if missing:
+            raise ImportFormatError(f'Missing column(s): {", ".join(missing)}')
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield number, {'_error': f'Not valid JSON: {exc}'}
+            continue
+        yield number, record if isinstance(record, dict) else {'_error': 'Each line must be a JSON object'}
+
+
+class ImageArchive:
+    """Images looked up by name (full path or bare file name) in a ZIP"""
+
+    def __init__(self, stream):
+        self.zip = zipfile.ZipFile(stream)
+        self.members = {}
+        for info in self.zip.infolist():
+            if not info.is_dir():
+                self.members.setdefault(info.filename, info)
+                self.members.setdefault(os.path.basename(info.filename), info)
+
+    def store(self, name):
+        """
+        Validate and store one image for a product row (call before commit)
+        Returns:
+            str: the image key for the row
+        Raises:
+            ImageRejected: missing, not an allowed image, or too large
+        """
+        info = self.members.get(name)
+        if info is None:
+            raise ImageRejected(f'{name} is not in the image archive')
+        if not allowed_file(info.filename):
+            raise ImageRejected(f'{name}: images only')
+        if info.file_size > current_app.config['MAX_CONTENT_LENGTH']:
+            raise ImageRejected(f'{name} is larger than the upload limit')
+        upload = FileStorage(stream=self.zip.open(info), filename=os.path.basename(info.filename))
+        inspect_upload(upload)
+        return save_picture(upload, folder='product')
+
+
+def _validate(record, archive):
+    """
+    Check one record with ProductForm's rules
+    Returns:
+        tuple: (column values for the insert, None) or (None, {field: [messages]})
+    """
+    if '_error' in record:
+        return None, {'row': [record['_error']]}
+    form = ProductRowForm(formdata=MultiDict(
+        {name: str(record[name]) for name in FIELDS if record.get(name) is not None}))
+    if not form.validate():
+        return None, form.errors
+    values = {name: getattr(form, name).data for name in REQUIRED}
+    values.update(coordinates(values['location']))  # the insert bypasses the ORM's geocoding
+    if form.image.data:
+        if archive is None:
+            return None, {'image': ['Upload the image archive along with the file']}
+        try:
+            values['product_image'] = archive.store(form.image.data)
+        except ImageRejected as exc:
+            return None, {'image': [str(exc)]}
+    return values, None
+
+
+def _insert_batch(batch, user_id):
+    for values in batch:
+        values.setdefault('product_image', None)
+    # ids in parameter order, so each search entry goes to its own row
+    ids = db.session.scalars(insert(Product).returning(Product.id, sort_by_parameter_order=True),
+                             [dict(values, user_id=user_id) for values in batch]).all()
+    index_new_rows('products', [dict(values, id=row_id) for values, row_id in zip(batch, ids)])
+    db.session.commit()
+
+
+def import_products(rows, user_id, archive=None, batch_size=500, max_errors=100):
+    """
+    Validate and insert product rows in batched transactions
+    Args:
+        rows: (line number, record) pairs, e.g. from read_rows()
+        user_id: owner of the imported products
+        archive: ImageArchive for rows naming an ``image``, or None
+        batch_size: rows per INSERT executemany and transaction
+        max_errors: row errors kept for the report (all are counted)
+    Returns:
+        ImportReport. A batch the database rejects, or a file that can't be
+        read past some line (malformed CSV, not UTF-8), stops the import:
+        the unsaved rows count as failed and ``aborted`` says why. Earlier
+        batches stay imported.
+    """
+    report = ImportReport(max_errors)
+    batch, first_line, line = [], None, 0
+    try:
+        for line, record in rows:
+            values, errors = _validate(record, archive)
+            if errors:
+                report.reject(line, errors)
+                continue
+            if not batch:
+                first_line = line
+            batch.append(values)
+            if len(batch) >= batch_size:
+                _insert_batch(batch, user_id)
+                report.imported += len(batch)
+                batch = []
+        if batch:
+            _insert_batch(batch, user_id)
+            report.imported += len(batch)
+    except SQLAlchemyError as exc:
+        db.session.rollback()
+        report.failed += len(batch)
+        report.aborted = f'Rows from line {first_line} on could not be saved: {getattr(exc, "orig", None) or exc}'
+    except (csv.Error, UnicodeDecodeError) as exc:
+        db.session.rollback()
+        report.failed += len(batch)
+        unsaved = f' Rows from line {first_line} on were not saved.' if batch else ''
+        report.aborted = f'The file could not be read after line {line}: {exc}.{unsaved}'
+    finally:
+        # raw images stored for rows of an unfinished batch go with the rollback
+        db.session.rollback()
+        if report.imported:
+            invalidate_pages('products')
+    return report
+
+
+class _Line:
+    """File-like target for csv.writer that hands each row back as a string"""
+
+    def write(self, value):
+        return value
+
+
+def export_products(query, fmt, batch_size=1000):
+    """
+    Stream products as CSV or JSON Lines, ``batch_size`` rows per fetch
+    Args:
+        query: Product query to export (e.g. one vendor's listings)
+        fmt: 'csv' or 'jsonl'
+    Yields:
+        str: chunks of the file
+    """
+    columns = ('id',) + REQUIRED + ('image_url', 'created_at')
+    writer = csv.writer(_Line())
+    if fmt == 'csv':
+        yield writer.writerow(columns)
+    chunk = io.StringIO()
+    for count, product in enumerate(query.order_by(Product.id).yield_per(batch_size), 1):
+        row = {name: getattr(product, name) for name in ('id',) + REQUIRED}
+        row['image_url'] = upload_url(product.product_image) if product.product_image else ''
+        row['created_at'] = product.created_at.isoformat() if product.created_at else ''
+        if fmt == 'csv':
+            chunk.write(writer.writerow([row[name] for name in columns]))
+        else:
+            chunk.write(json.dumps(row, ensure_ascii=False) + '\n')
+        if count % batch_size == 0:
+            yield chunk.getvalue()
+            chunk = io.StringIO()
+    yield chunk.getvalue()
@@ -0,0 +1,99 @@
+from datetime import datetime
+from sqlalchemy import delete, func, insert, literal, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from extensions import db
+from models.blog import Post, Comment, Like
+
+
+def adjust_post_counters(post_id, likes=0, comments=0):
+    """
+    Atomically shift a post's stored like/comment counters
+    Args:
+        post_id: id of the post to update
+        likes: amount to add to ``like_count`` (may be negative)
+        comments: amount to add to ``comment_count`` (may be negative)
+    """
+    values = {}
+    if likes:
+        values['like_count'] = Post.like_count + likes
+    if comments:
+        values['comment_count'] = Post.comment_count + comments
+    if not values:
+        return
+    # keep updated_at untouched: engagement is not an edit of the post
+    values['updated_at'] = Post.updated_at
+    db.session.execute(update(Post).where(Post.id == post_id).values(**values))
+
+
+def _insert_ignoring_duplicates(table, dialect):
+    """INSERT that skips rows violating a unique constraint, in the dialect's syntax"""
+    if dialect.name == 'sqlite':
+        return sqlite.insert(table).on_conflict_do_nothing()
+    if dialect.name == 'postgresql':
+        return postgresql.insert(table).on_conflict_do_nothing()
+    if dialect.name in ('mysql', 'mariadb'):
+        return insert(table).prefix_with('IGNORE')
+    raise NotImplementedError(f'No INSERT ... ON CONFLICT DO NOTHING for {dialect.name}')
+
+
+def set_post_like(post_id, user_id, liked):
+    """
+    Like or unlike a post. Idempotent and race-free: the row is inserted with
+    ON CONFLICT DO NOTHING (or deleted) without reading it first, and the
+    counter only moves if a row actually changed, so double clicks and
+    concurrent requests neither fail on the unique constraint nor double count.
+    Args:
+        post_id: id of the post
+        user_id: id of the user (un)liking it
+        liked: True to like, False to unlike
+    Returns:
+        tuple: (changed, like_count), like_count is None if there is no such post
+    """
+    likes = Like.__table__
+    if liked:
+        statement = _insert_ignoring_duplicates(likes, db.session.get_bind().dialect).from_select(
+            ['user_id', 'post_id', 'created_at'],
+            select(literal(user_id), Post.id, literal(datetime.utcnow())).where(Post.id == post_id)
+        )
+    else:
+        statement = delete(likes).where(likes.c.post_id == post_id, likes.c.user_id == user_id)
+    changed = db.session.execute(statement).rowcount > 0
+    if changed:
+        adjust_post_counters(post_id, likes=1 if liked else -1)
+    return changed, db.session.scalar(select(Post.like_count).where(Post.id == post_id))
+
+
+def release_user_engagement(user_id):
+    """
+    Take a user's likes and comments off the counters of the posts they touched.
+    Call before deleting the user, whose likes/comments are removed by cascade.
+    """
+    for model, column in ((Like, Post.like_count), (Comment, Post.comment_count)):
+        own = (select(func.count(model.id))
+               .where(model.post_id == Post.id, model.user_id == user_id)
+               .scalar_subquery())
+        touched = select(model.post_id).where(model.user_id == user_id)
+        db.session.execute(
+            update(Post)
+            .where(Post.id.in_(touched), Post.user_id != user_id)
+            .values({column: column - own, Post.updated_at: Post.updated_at}),
+            execution_options={'synchronize_session': False}
+        )
+
+
+def reconcile_post_counters():
+    """
+    Recompute the stored counters from the likes/comments tables
+    Returns:
+        int: number of posts whose counters had drifted and were repaired
+    """
+    likes = select(func.count(Like.id)).where(Like.post_id == Post.id).scalar_subquery()
+    comments = select(func.count(Comment.id)).where(Comment.post_id == Post.id).scalar_subquery()
+    result = db.session.execute(
+        update(Post)
+        .where((Post.like_count != likes) | (Post.comment_count != comments))
+        .values(like_count=likes, comment_count=comments, updated_at=Post.updated_at),
+        execution_options={'synchronize_session': False}
+    )
+    db.session.commit()
+    return result.rowcount
@@ -0,0 +1,107 @@
+"""Connection tuning for the database engines.
+
+SQLite: each new connection runs the SQLITE_PRAGMAS from the config.
+- ``journal_mode=wal`` lets readers keep reading while one writer commits,
+  where the default rollback journal makes every write wait for all readers.
+- ``synchronous=normal`` syncs at checkpoints instead of on every commit. In
+  WAL mode that is still safe if the application crashes. Only an OS crash
+  or a power cut can lose the last few commits.
+- ``busy_timeout`` makes a writer wait for the write lock instead of failing
+  at once with "database is locked".
+- ``cache_size`` and ``mmap_size`` keep hot pages in memory.
+
+Keep the database on a local disk: WAL needs shared memory, so it does not
+work over network filesystems.
+
+Server databases (PostgreSQL, MySQL) use the pool settings in
+SQLALCHEMY_ENGINE_OPTIONS instead; see DB_POOL_* in config.py.
+
+Read replicas: with DATABASE_REPLICA_URLS set, ``RoutingSession`` (the
+class behind ``db.session``) sends the SELECTs of GET/HEAD requests to one
+replica bind, picked once per request. Everything else stays on the
+primary: writes, SELECT ... FOR UPDATE, POST handlers (whose reads decide
+what to write), background jobs and scripts. Once a request commits a
+write, the visitor's later requests read from the primary for
+REPLICA_STICKY_SECONDS, so they see their own post or comment even while the
+replicas lag behind.
+"""
+import random
+import time
+from flask import current_app, has_request_context, request, session as flask_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select, event
+
+STICKY_KEY = '_read_primary_until'
+
+
+class RoutingSession(Session):
+    """Session that reads from a replica bind when it is safe to"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        if bind is not None or engine is not self._db.engines.get(None):
+            return engine
+        if (isinstance(clause, Select) and clause._for_update_arg is None
+                and not self._flushing and not self.info.get('wrote_primary')):
+            replica = self._replica()
+            if replica is not None:
+                return replica
+        elif not isinstance(clause, Select):
+            # inserts/updates/deletes, flushes, raw SQL: this session now
+            # reads its own writes from the primary too
+            self.info['wrote_primary'] = True
+        return engine
+
+    def _replica(self):
+        if 'replica' not in self.info:
+            self.info['replica'] = None
+            names = current_app.config.get('REPLICA_BINDS') or ()
+            if (names and has_request_context() and request.method in ('GET', 'HEAD')
+                    and flask_session.get(STICKY_KEY, 0) <= time.time()):
+                self.info['replica'] = self._db.engines[random.choice(names)]
+        return self.info['replica']
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _stick_to_primary(session):
+    if not session.info.pop('wrote_primary', False):
+        return
+    session.info['replica'] = None
+    seconds = current_app.config.get('REPLICA_STICKY_SECONDS', 0)
+    if has_request_context() and seconds and current_app.config.get('REPLICA_BINDS'):
+        flask_session[STICKY_KEY] = int(time.time() + seconds) + 1
+
+
+def _apply_pragmas(pragmas, dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+    finally:
+        cursor.close()
+
+
+def init_app(app):
+    """
+    Install the connection tuning on every SQLite engine of the app (the main
+    database and any binds). Call after ``db.init_app(app)``.
+    """
+    pragmas = app.config.get('SQLITE_PRAGMAS') or {}
+    if not pragmas:
+        return
+    with app.app_context():
+        for engine in app.extensions['sqlalchemy'].engines.values():
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect',
+                             lambda conn, record: _apply_pragmas(pragmas, conn, record))
+
+
+def sqlite_settings(engine):
+    """
+    Read back the effective settings of a connection (for scripts and checks)
+    Returns:
+        dict: pragma name -> current value
+    """
+    with engine.connect() as conn:
+        return {name: conn.exec_driver_sql(f'PRAGMA {name}').scalar()
+                for name in ('journal_mode', 'synchronous', 'busy_timeout', 'cache_size', 'mmap_size')}
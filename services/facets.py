@@ -0,0 +1,152 @@
+"""Faceted filtering of the products list.
+
+Shoppers narrow the list by category, location, price bucket and in-stock,
+and to a radius around a place (?near=, see services/geo.py).
+Next to each option the list shows how many products it would leave,
+given the other filters. Each facet therefore counts with every filter
+but its own. There is no COUNT(*) round trip per option:
+- categories and locations are counted with one GROUP BY each, so new
+  locations need no option list
+- the price buckets are counted in a single UNION ALL statement
+- the in-stock products take one COUNT
+The total comes from the category counts.
+
+The counts are cached in-process for FACET_CACHE_TTL seconds. The cache
+key includes the page cache's 'products' version, so every
+``invalidate_pages('products')`` makes the old counts unreachable at once:
+listing, importing, reserving, deleting. With a shared PAGE_CACHE_URL this
+works across workers.
+
+The covering index ix_products_facets (category, location, price,
+quantity) answers all four queries without touching the table rows.
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from flask import current_app
+from sqlalchemy import and_, func, literal, select, union_all
+from extensions import db
+from models.product import Product
+from services.geo import geocode, within_radius
+from services.page_cache import get_page_cache
+
+# (key used in ?price=, label, lowest price included, price the bucket stops below)
+PRICE_BUCKETS = (
+    ('under-100', 'Under Rs 100', None, 100),
+    ('100-500', 'Rs 100 - 500', 100, 500),
+    ('500-2000', 'Rs 500 - 2,000', 500, 2000),
+    ('2000-10000', 'Rs 2,000 - 10,000', 2000, 10000),
+    ('10000-up', 'Rs 10,000+', 10000, None),
+)
+_BUCKETS = {key: (low, high) for key, _, low, high in PRICE_BUCKETS}
+RADII_KM = (10, 25, 50, 100, 250)  # ?radius= choices around ?near=
+DEFAULT_RADIUS_KM = 50
+
+_lock = threading.Lock()
+_cache = OrderedDict()  # (filters, products version) -> (expires, facets)
+
+
+class ProductFilters(namedtuple('ProductFilters', 'category location price in_stock near radius')):
+    """The products list filters; hashable, so it doubles as a cache key"""
+
+    @classmethod
+    def from_args(cls, args):
+        """Filters from the query string, ignoring unknown price buckets and radii"""
+        price = args.get('price')
+        near = (args.get('near') or '').strip() or None
+        radius = args.get('radius', '')
+        radius = int(radius) if radius.isdigit() and int(radius) in RADII_KM else DEFAULT_RADIUS_KM
+        return cls(category=args.get('category') or None,
+                   location=(args.get('location') or '').strip() or None,
+                   price=price if price in _BUCKETS else None,
+                   in_stock=args.get('in_stock') == '1',
+                   near=near,
+                   radius=radius if near else None)
+
+    @property
+    def place(self):
+        """Where ?near= points (services/geo.py), or None"""
+        return geocode(self.near)
+
+    def url_args(self, **changes):
+        """url_for arguments for these filters with ``changes`` applied (None clears one)"""
+        values = self._replace(**changes)._asdict()
+        values['in_stock'] = '1' if values['in_stock'] else None
+        if not values['near']:
+            values['radius'] = None
+        return {name: value for name, value in values.items() if value}
+
+    def conditions(self, skip=None):
+        """WHERE clauses for the active filters, except the facet named ``skip``"""
+        clauses = []
+        if self.category and skip != 'category':
+            clauses.append(Product.category == self.category)
+        if self.location and skip != 'location':
+            clauses.append(Product.location == self.location)
+        if self.price and skip != 'price':
+            clauses.append(_bucket_condition(*_BUCKETS[self.price]))
+        if self.in_stock and skip != 'in_stock':
+            clauses.append(Product.quantity > 0)
+        place = self.place
+        if place:
+            clauses.extend(within_radius(Product, place, self.radius))
+        return clauses
+
+
+def _bucket_condition(low, high):
+    return and_(*([Product.price >= low] if low is not None else []),
+                *([Product.price < high] if high is not None else []))
+
+
+def _compute_facets(filters):
+    def grouped(column, skip):
+        return db.session.execute(
+            select(column, func.count()).where(*filters.conditions(skip)).group_by(column)).all()
+
+    categories = dict(grouped(Product.category, 'category'))
+    locations = sorted(grouped(Product.location, 'location'), key=lambda row: (-row[1], row[0]))
+    # price buckets are ranges of one indexed column: a range count each, in one
+    # statement, walks the index (grouping on a CASE would sort every row)
+    buckets = dict(db.session.execute(union_all(*(
+        select(literal(key), func.count()).where(*filters.conditions('price'), _bucket_condition(low, high))
+        for key, _, low, high in PRICE_BUCKETS))).all())
+    in_stock = db.session.scalar(
+        select(func.count()).where(*filters.conditions('in_stock'), Product.quantity > 0))
+
+    shown = locations[:current_app.config.get('FACET_LOCATIONS', 12)]
+    if filters.location and filters.location not in dict(shown):
+        shown.append((filters.location, dict(locations).get(filters.location, 0)))
+    return {
+        'total': categories.get(filters.category, 0) if filters.category else sum(categories.values()),
+        'category': categories,
+        'location': shown,
+        'price': [(key, label, buckets.get(key, 0)) for key, label, _, _ in PRICE_BUCKETS],
+        'in_stock': in_stock,
+    }
+
+
+def facet_counts(filters):
+    """
+    Counts for every facet option under the other active filters
+    Args:
+        filters: ProductFilters
+    Returns:
+        dict: total (products matching all filters), category (value -> count),
+        location ((value, count) pairs, most common first), price
+        ((key, label, count) per bucket) and in_stock (count)
+    """
+    key = (filters, get_page_cache().versions(['products'])[0])
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0] > now:
+            _cache.move_to_end(key)
+            return entry[1]
+    facets = _compute_facets(filters)
+    with _lock:
+        # if products changed meanwhile, the version moved on and this entry is never read
+        _cache[key] = (now + current_app.config.get('FACET_CACHE_TTL', 300), facets)
+        _cache.move_to_end(key)
+        while len(_cache) > current_app.config.get('FACET_CACHE_SIZE', 512):
+            _cache.popitem(last=False)
+    return facets
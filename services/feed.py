@@ -0,0 +1,44 @@
+from sqlalchemy.orm import joinedload
+from models.blog import Post, Comment
+from services.pagination import paginate_newest
+
+
+def post_feed_query():
+    """
+    Query for posts with author and engagement totals resolved up front
+    Returns:
+        query: newest-first Post query with ``user`` joined; engagement
+        totals come from the stored ``comment_count`` / ``like_count``
+    """
+    return (Post.query
+            .options(joinedload(Post.user))
+            .order_by(Post.created_at.desc()))
+
+
+def paginate_feed(page, per_page=10, cursor=None):
+    """
+    Paginate the post feed without per-row lazy loads
+    Args:
+        page: 1-based page number (shallow pages)
+        per_page: posts per page
+        cursor: keyset cursor from a previous page, overrides ``page``
+    Returns:
+        KeysetPagination over ``post_feed_query()``
+    """
+    return paginate_newest(post_feed_query(), Post, page=page, cursor=cursor,
+                           per_page=per_page, with_total=True)
+
+
+def paginate_comments(post_id, cursor=None, per_page=20):
+    """
+    One page of a post's comments, newest first, with their authors
+    Args:
+        post_id: id of the post
+        cursor: keyset cursor from the previous page (None for the first page)
+        per_page: comments per page
+    Returns:
+        KeysetPagination; seeks on ix_comments_post_id_created_at, so any
+        page costs the same however long the thread is
+    """
+    query = Comment.query.options(joinedload(Comment.user)).filter(Comment.post_id == post_id)
+    return paginate_newest(query, Comment, page=1, cursor=cursor, per_page=per_page)
@@ -0,0 +1,188 @@
+"""Where products and consultants are, and what is near a place.
+
+Locations are free text ("Okara", "Chak 5, Multan"). ``geocode()`` looks
+their place names up in an offline gazetteer, GAZETTEER_PATH (a CSV of
+names, aliases and coordinates), with no network calls. "lat,lon" text,
+such as a browser's geolocation, is accepted as-is. Coordinates are kept
+in ``latitude``/``longitude`` next to the text:
+- attribute listeners set them whenever ``Product.location`` or
+  ``User.address`` is assigned
+- bulk inserts call ``coordinates()`` themselves
+Text naming no known place gets None, and those rows never match a
+proximity query.
+
+Spatial index: ``within_radius()`` narrows to the box around a circle
+with a range scan of the (latitude, longitude) index, then applies the
+exact distance test to the index entries, so only matching rows are read.
+scripts/bench_geo.py measures this against an R*Tree: the R*Tree has to
+read each candidate row for its coordinates and is slower beyond ~10 km.
+``nearest()`` widens the circle until it holds enough rows.
+
+Distances inside queries use the equirectangular approximation (plain
+arithmetic, so any database can evaluate it). Within a few hundred km it
+differs from the great-circle distance by well under 1%.
+"""
+import csv
+import math
+import re
+import threading
+from collections import namedtuple
+from flask import current_app, has_app_context
+from sqlalchemy import event, select, text
+from extensions import db
+from models.product import Product
+from models.user import User
+
+KM_PER_DEGREE = 111.195  # along a meridian (and the equator)
+EARTH_RADIUS_KM = 6371.0
+COORDINATES = re.compile(r'^\s*(-?\d{1,2}(?:\.\d+)?)\s*,\s*(-?\d{1,3}(?:\.\d+)?)\s*$')
+
+Place = namedtuple('Place', 'name latitude longitude')
+
+
+# located models and the text column their coordinates come from
+LOCATED = ((Product, 'location'), (User, 'address'))
+
+_lock = threading.Lock()
+_gazetteers = {}  # path -> {normalized name: Place}
+
+
+def _normalize(name):
+    return ' '.join(re.sub(r'[^0-9a-z]+', ' ', name.lower()).split())
+
+
+def _gazetteer():
+    path = current_app.config['GAZETTEER_PATH']
+    with _lock:
+        places = _gazetteers.get(path)
+        if places is None:
+            places = {}
+            with open(path, newline='', encoding='utf-8') as source:
+                for row in csv.DictReader(source):
+                    place = Place(row['name'], float(row['latitude']), float(row['longitude']))
+                    for name in [row['name']] + (row.get('aliases') or '').split('|'):
+                        if name.strip():
+                            places.setdefault(_normalize(name), place)
+            _gazetteers[path] = places
+    return places
+
+
+def geocode(location):
+    """
+    Coordinates of a free-text location
+    Args:
+        location: "lat,lon", or text naming a place ("Okara", "Near Multan bypass, Punjab")
+    Returns:
+        Place, or None if no place is recognised
+    """
+    if not location:
+        return None
+    match = COORDINATES.match(location)
+    if match:
+        latitude, longitude = float(match.group(1)), float(match.group(2))
+        if -90 <= latitude <= 90 and -180 <= longitude <= 180:
+            return Place(None, latitude, longitude)
+        return None
+    places = _gazetteer()
+    # comma-separated parts from the most specific; within a part the
+    # longest run of words naming a place ("Mirpur Khas" before "Mirpur")
+    for part in location.split(','):
+        words = _normalize(part).split()
+        for size in range(min(len(words), 4), 0, -1):
+            for start in range(len(words) - size + 1):
+                place = places.get(' '.join(words[start:start + size]))
+                if place:
+                    return place
+    return None
+
+
+def coordinates(location):
+    """{'latitude', 'longitude'} for a row with this location text (None for unknown places)"""
+    place = geocode(location)
+    return {'latitude': place.latitude if place else None, 'longitude': place.longitude if place else None}
+
+
+def _locate(target, value, oldvalue, initiator):
+    if has_app_context():
+        for name, coordinate in coordinates(value).items():
+            setattr(target, name, coordinate)
+    return value
+
+
+for _model, _source in LOCATED:
+    event.listen(getattr(_model, _source), 'set', _locate, retval=True)
+
+
+def distance_km(place, obj):
+    """Great-circle distance from a Place to a located row, or None"""
+    if place is None or obj is None or obj.latitude is None or obj.longitude is None:
+        return None
+    lat1, lat2 = math.radians(place.latitude), math.radians(obj.latitude)
+    dlat, dlon = lat2 - lat1, math.radians(obj.longitude - place.longitude)
+    a = math.sin(dlat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def _scale(place):
+    """km per degree of longitude at the place, relative to a degree of latitude"""
+    return max(math.cos(math.radians(place.latitude)), 0.01)
+
+
+def bounding_box(place, radius_km):
+    """(min_lat, max_lat, min_lon, max_lon) around the circle"""
+    dlat = radius_km / KM_PER_DEGREE
+    dlon = dlat / _scale(place)
+    return place.latitude - dlat, place.latitude + dlat, place.longitude - dlon, place.longitude + dlon
+
+
+def squared_offset(model, place):
+    """SQL expression ordering rows by distance from the place (squared degrees)"""
+    dlat = model.latitude - place.latitude
+    dlon = (model.longitude - place.longitude) * _scale(place)
+    return dlat * dlat + dlon * dlon
+
+
+def within_radius(model, place, radius_km):
+    """
+    WHERE clauses keeping rows within ``radius_km`` of a place
+    Args:
+        model: Product or User
+        place: Place from geocode()
+        radius_km: circle radius
+    Returns:
+        list: the bounding box (an index range), then the exact distance test
+    """
+    min_lat, max_lat, min_lon, max_lon = bounding_box(place, radius_km)
+    return [model.latitude.between(min_lat, max_lat), model.longitude.between(min_lon, max_lon),
+            squared_offset(model, place) <= (radius_km / KM_PER_DEGREE) ** 2]
+
+
+def nearest(model, place, limit, *criteria, max_km=2000):
+    """
+    The ``limit`` rows nearest a place (nearest first), optionally filtered
+    The search circle starts at 25 km and quadruples until it holds
+    ``limit`` matching rows or reaches ``max_km``, so dense areas never
+    sort rows far away.
+    Returns:
+        list: model instances
+    """
+    radius = 25
+    while True:
+        clauses = within_radius(model, place, radius)
+        found = len(db.session.scalars(select(model.id).where(*clauses, *criteria).limit(limit)).all())
+        if found >= limit or radius >= max_km:
+            break
+        radius = min(radius * 4, max_km)
+    return model.query.filter(*clauses, *criteria).order_by(squared_offset(model, place), model.id).limit(limit).all()
+
+
+def backfill(conn):
+    """Geocode every distinct location/address already stored (one UPDATE per distinct text)"""
+    for model, name in LOCATED:
+        source = getattr(model, name)
+        values = conn.execute(select(source).where(source.isnot(None)).distinct()).scalars().all()
+        rows = [dict(coordinates(value), value=value) for value in values]
+        rows = [row for row in rows if row['latitude'] is not None]
+        if rows:
+            conn.execute(text(f'UPDATE {model.__tablename__} SET latitude = :latitude, longitude = :longitude '
+                              f'WHERE {name} = :value'), rows)
@@ -0,0 +1,493 @@
+"""Background processing for uploaded images.
+
+Uploads are written to disk untouched and the model row gets a ``pending/``
+key. Once the request's transaction commits, a worker pool resizes the raw
+file into its final location and rewrites the row to the final key; until
+then templates show a placeholder (see ``image_ready`` / ``upload_url``).
+A job first claims its raw file by renaming it under ``pending/claimed/``,
+so however often a key is submitted only one job processes it.
+
+Uploads are content-addressed: the raw bytes are hashed while they stream to
+disk, and each distinct image is stored once per folder under
+``product/ab/cd/<sha256>.jpg`` (see ``services/storage.py``). A
+``stored_images`` row counts the model rows referencing it; uploading the
+same file again only bumps the count, and ``release()`` deletes the files
+after commit once the count drops to zero. Deleting a user, post or product
+row, directly or through a cascade, releases its image the same way.
+
+A processed key looks like ``product/ab/cd/<sha256>.jpg#160,400,800;avif,webp``:
+the part before ``#`` is the fallback image (at most 800px, original format),
+followed by the widths and modern formats of the responsive variants stored
+next to it as ``product/ab/cd/<sha256>-400.webp`` etc. Keys without a ``#``
+(uploads from before variants existed) are a lone fallback image, and keys
+whose name is not a sha256 predate deduplication and are not reference
+counted.
+"""
+import hashlib
+import os
+import shutil
+import string
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from markupsafe import Markup, escape
+from PIL import Image, UnidentifiedImageError, features
+from sqlalchemy import delete, event, inspect, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from extensions import db
+from models.image import StoredImage
+from services.assets import asset_url
+from services.page_cache import invalidate_pages
+from services.storage import content_key, get_storage
+
+PENDING_PREFIX = 'pending/'
+CLAIMED_PREFIX = PENDING_PREFIX + 'claimed/'  # raw uploads a job is processing
+PLACEHOLDER = 'images/processing.svg'
+MIME_TYPES = {'avif': 'image/avif', 'webp': 'image/webp'}
+ENCODER_OPTIONS = {'avif': {'quality': 50, 'speed': 8}, 'webp': {'quality': 80, 'method': 4}}
+CHUNK_SIZE = 64 * 1024
+PAGE_TAGS = {'product': 'products', 'blog': 'posts'}  # cached pages showing each folder
+DECODABLE_FORMATS = {'JPEG', 'MPO', 'PNG', 'GIF', 'WEBP'}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _columns():
+    """Upload folder -> model column whose rows reference images in it"""
+    from models.user import User
+    from models.blog import Post
+    from models.product import Product
+    return {'profile': User.profile_image, 'blog': Post.post_image, 'product': Product.product_image}
+
+
+def _executor_for(app):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=app.config.get('IMAGE_WORKERS', 2),
+                                           thread_name_prefix='image-worker')
+        return _executor
+
+
+def image_ready(key):
+    """True once an uploaded image has been processed and can be served"""
+    return bool(key) and not key.startswith(PENDING_PREFIX)
+
+
+def parse_key(key):
+    """
+    Split a stored image key into its parts
+    Returns:
+        tuple: (fallback key, list of variant widths, list of variant formats)
+    """
+    fallback, _, manifest = key.partition('#')
+    if not manifest:
+        return fallback, [], []
+    widths, _, formats = manifest.partition(';')
+    return fallback, [int(w) for w in widths.split(',') if w], [f for f in formats.split(',') if f]
+
+
+def variant_key(fallback, width, fmt):
+    stem, _ = os.path.splitext(fallback)
+    return f'{stem}-{width}.{fmt}'
+
+
+def stored_files(key):
+    """Every file key an image occupies: the fallback plus all its variants"""
+    fallback, widths, formats = parse_key(key)
+    return [fallback] + [variant_key(fallback, width, fmt) for fmt in formats for width in widths]
+
+
+def content_id(key):
+    """
+    Identify a deduplicated image from any of its keys
+    Returns:
+        tuple: (folder, sha256 digest), or None for keys predating deduplication
+    """
+    path = parse_key(key)[0]
+    if path.startswith(PENDING_PREFIX):
+        path = path[len(PENDING_PREFIX):]
+    digest = os.path.splitext(os.path.basename(path))[0]
+    if len(digest) != 64 or not all(c in string.hexdigits for c in digest):
+        return None
+    return path.split('/', 1)[0], digest
+
+
+def upload_url(key):
+    """URL for an uploaded image, or the processing placeholder while pending"""
+    if not image_ready(key):
+        return asset_url('static', filename=PLACEHOLDER)
+    return get_storage().url(parse_key(key)[0])
+
+
+def upload_srcset(key, fmt):
+    """``srcset`` value listing every stored width of an image in one format"""
+    fallback, widths, formats = parse_key(key)
+    if fmt not in formats:
+        return ''
+    storage = get_storage()
+    return ', '.join(f'{storage.url(variant_key(fallback, width, fmt))} {width}w' for width in widths)
+
+
+def responsive_image(key, alt='', sizes='100vw', **attrs):
+    """
+    ``<picture>`` markup serving the smallest adequate variant of an upload
+    Args:
+        key: stored image key
+        alt: alt text
+        sizes: the ``sizes`` attribute, i.e. how wide the image is displayed
+        **attrs: extra attributes for the ``<img>`` (class, style, ...)
+    """
+    img_attrs = ''.join(f' {name}="{escape(value)}"' for name, value in attrs.items())
+    img = Markup(f'<img src="{escape(upload_url(key))}" alt="{escape(alt)}" loading="lazy"{img_attrs}>')
+    if not image_ready(key):
+        return img
+    _, _, formats = parse_key(key)
+    sources = ''.join(
+        f'<source type="{MIME_TYPES[fmt]}" srcset="{escape(upload_srcset(key, fmt))}" sizes="{escape(sizes)}">'
+        for fmt in formats if fmt in MIME_TYPES
+    )
+    return Markup(f'<picture>{sources}{img}</picture>')
+
+
+def upload_path(key):
+    """Local path of a key under UPLOAD_FOLDER (raw pending uploads live here)"""
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], key)
+
+
+def _target_widths(source_width, widths):
+    largest = max(widths)
+    targets = {width for width in widths if width < source_width}
+    targets.add(min(source_width, largest))
+    return sorted(targets)
+
+
+class ImageRejected(ValueError):
+    """An upload that is not an image we accept, or would decode too large"""
+
+
+def _decode_width():
+    """Widest pixel row any output needs (the largest responsive variant)"""
+    return max(current_app.config.get('IMAGE_WIDTHS', (160, 400, 800, 1600)))
+
+
+def open_image(source, max_width=None):
+    """
+    Open an image without decoding it and check it against the decode budget
+    Only the header is read. JPEGs are set up to decode at a reduced DCT
+    scale (1/2, 1/4 or 1/8) that still covers ``max_width``, so the full
+    resolution bitmap is never built; other formats decode at full size.
+    Args:
+        source: path or binary file
+        max_width: widest output needed; None decodes at full size
+    Returns:
+        Image: lazily loaded image, ``size`` already reflecting any reduction
+    Raises:
+        ImageRejected: unreadable, unsupported format, or over IMAGE_DECODE_BUDGET
+    """
+    try:
+        img = Image.open(source)
+    except (UnidentifiedImageError, Image.DecompressionBombError) as exc:
+        raise ImageRejected('Not a readable image.') from exc
+    if img.format not in DECODABLE_FORMATS:
+        raise ImageRejected(f'{img.format} images are not supported.')
+    if max_width and img.width > max_width:
+        img.draft(None, (max_width, -(-img.height * max_width // img.width)))
+    bytes_per_pixel = 1 if img.mode in ('1', 'L', 'P') else 4
+    budget = current_app.config.get('IMAGE_DECODE_BUDGET', 128 * 1024 * 1024)
+    if img.width * img.height * bytes_per_pixel > budget:
+        raise ImageRejected(f'Image is too large ({img.width}x{img.height} pixels).')
+    return img
+
+
+def inspect_upload(file_storage):
+    """Validate an upload from its header alone, leaving the stream rewound"""
+    stream = file_storage.stream
+    position = stream.tell()
+    try:
+        open_image(stream, _decode_width())
+    finally:
+        stream.seek(position)
+
+
+def resize_image(source, destination, max_size=(800, 800)):
+    """
+    Write the fallback image and its responsive variants
+    Args:
+        source: path or file of the original upload
+        destination: path of the fallback image; variants go alongside it
+        max_size: bounding box of the fallback image
+    Returns:
+        tuple: (widths, formats) of the variants written
+    """
+    img = open_image(source, _decode_width())
+    img.load()
+    widths = _target_widths(img.width, current_app.config.get('IMAGE_WIDTHS', (160, 400, 800, 1600)))
+    formats = [fmt for fmt in current_app.config.get('IMAGE_FORMATS', ('avif', 'webp'))
+               if features.check(fmt)]
+
+    # variants from largest to smallest, each downscaled from the previous one
+    current = img if img.mode in ('RGB', 'RGBA') else img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+    for width in reversed(widths):
+        height = max(1, round(current.height * width / current.width))
+        if width != current.width:
+            current = current.resize((width, height), Image.Resampling.LANCZOS, reducing_gap=3.0)
+        for fmt in formats:
+            current.save(variant_key(destination, width, fmt), fmt.upper(), **ENCODER_OPTIONS[fmt])
+
+    img.thumbnail(max_size, Image.Resampling.LANCZOS)
+    img.save(destination, quality=85)
+    return widths, formats
+
+
+def _acquire(folder, digest):
+    """Add a reference to an already stored image; returns its key, or None if unknown"""
+    where = (StoredImage.folder == folder, StoredImage.digest == digest)
+    # The UPDATE locks the row before its key is read, so a worker finishing
+    # concurrently either already rewrote the key or waits for our commit.
+    updated = db.session.execute(
+        update(StoredImage).where(*where).values(refcount=StoredImage.refcount + 1),
+        execution_options={'synchronize_session': False}
+    )
+    if updated.rowcount:
+        return db.session.scalar(db.select(StoredImage.key).where(*where))
+    return None
+
+
+def store_raw(file_storage, folder, ext):
+    """
+    Hash and write an upload to disk unprocessed, deduplicating by content
+    Args:
+        file_storage: FileStorage from the form
+        folder: upload subfolder ('profile', 'blog', 'product')
+        ext: lowercase file extension including the dot
+    Returns:
+        key: the key to store on the model row; pending for a new image, the
+        existing key when the same bytes were uploaded before
+    """
+    pending_root = upload_path(PENDING_PREFIX)
+    os.makedirs(pending_root, exist_ok=True)
+    sha256, size = hashlib.sha256(), 0
+    fd, part_path = tempfile.mkstemp(dir=pending_root, suffix='.part')
+    with os.fdopen(fd, 'wb') as part:
+        for chunk in iter(lambda: file_storage.stream.read(CHUNK_SIZE), b''):
+            sha256.update(chunk)
+            part.write(chunk)
+            size += len(chunk)
+    digest = sha256.hexdigest()
+
+    key = _acquire(folder, digest)
+    if key is None:
+        key = f'{PENDING_PREFIX}{folder}/{digest}{ext}'
+        try:
+            with db.session.begin_nested():
+                db.session.add(StoredImage(folder=folder, digest=digest, key=key, size=size))
+        except IntegrityError:
+            # a concurrent request stored the same bytes first
+            key = _acquire(folder, digest)
+        else:
+            os.makedirs(os.path.dirname(upload_path(key)), exist_ok=True)
+            os.replace(part_path, upload_path(key))
+            db.session.info.setdefault('image_jobs', []).append(key)
+    if os.path.exists(part_path):
+        os.remove(part_path)
+    return key
+
+
+def release(key):
+    """
+    Drop one model row's reference to an image (call before commit)
+    The files are deleted after the commit once nothing references them.
+    """
+    if not key:
+        return
+    ident = content_id(key)
+    if ident:
+        where = (StoredImage.folder == ident[0], StoredImage.digest == ident[1])
+        db.session.execute(
+            update(StoredImage).where(*where).values(refcount=StoredImage.refcount - 1),
+            execution_options={'synchronize_session': False}
+        )
+        unused = db.session.execute(
+            delete(StoredImage).where(*where, StoredImage.refcount <= 0),
+            execution_options={'synchronize_session': False}
+        )
+        if not unused.rowcount:
+            return
+    if image_ready(key):
+        # still-pending images are cleaned up by their worker
+        db.session.info.setdefault('image_deletes', []).append(key)
+
+
+def delete_files(key):
+    """Remove an image and all of its variants from storage"""
+    storage = get_storage()
+    for stored in stored_files(key):
+        storage.delete(stored)
+
+
+def _claim(key):
+    """
+    Take a pending upload's raw file for processing
+    The rename is atomic, so of several jobs for one key only the first
+    finds the file; the others see it gone.
+    Returns:
+        str: path of the claimed file, or None if another job has it (or finished it)
+    """
+    claimed_path = upload_path(CLAIMED_PREFIX + key[len(PENDING_PREFIX):])
+    os.makedirs(os.path.dirname(claimed_path), exist_ok=True)
+    try:
+        os.replace(upload_path(key), claimed_path)
+    except FileNotFoundError:
+        return None
+    os.utime(claimed_path)  # claim time, so resume_pending can tell stale claims
+    return claimed_path
+
+
+def _process(app, key):
+    name = key[len(PENDING_PREFIX):]
+    folder = name.split('/', 1)[0]
+    ident = content_id(key)
+    final_key = content_key(folder, ident[1], os.path.splitext(name)[1]) if ident else name
+    with app.app_context():
+        raw_path = _claim(key)
+        if raw_path is None:
+            return
+        work_dir = tempfile.mkdtemp(dir=upload_path(PENDING_PREFIX))
+        try:
+            widths, formats = resize_image(raw_path, os.path.join(work_dir, os.path.basename(final_key)))
+            result = f"{final_key}#{','.join(map(str, widths))};{','.join(formats)}" if formats else final_key
+            storage = get_storage()
+            for stored in stored_files(result):
+                storage.put(stored, os.path.join(work_dir, os.path.basename(stored)))
+        except ImageRejected as exc:
+            app.logger.warning('Image rejected for %s: %s', key, exc)
+            result = None
+        except Exception:
+            app.logger.exception('Image processing failed for %s', key)
+            result = None
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        if ident:
+            stored_image = update(StoredImage).where(StoredImage.key == key)
+            if result is None:
+                db.session.execute(delete(StoredImage).where(StoredImage.key == key))
+            elif not db.session.execute(stored_image.values(key=result),
+                                        execution_options={'synchronize_session': False}).rowcount:
+                current = db.session.scalar(select(StoredImage.key).where(
+                    StoredImage.folder == ident[0], StoredImage.digest == ident[1]))
+                if current is None:
+                    # every reference was released while this image was processing
+                    delete_files(result)
+                result = current  # else an earlier job already finished it; its files are live
+        column = _columns()[folder]
+        if folder == 'profile':
+            from models.user import User, forget_user
+            for user_id in db.session.scalars(db.select(User.id).where(User.profile_image == key)):
+                forget_user(user_id)
+        db.session.execute(
+            update(column.class_).where(column == key).values({column: result}),
+            execution_options={'synchronize_session': False}
+        )
+        db.session.commit()
+        db.session.remove()
+        if folder in PAGE_TAGS:
+            invalidate_pages(PAGE_TAGS[folder])
+        if os.path.exists(raw_path):
+            os.remove(raw_path)
+
+
+def submit(key, app=None):
+    """Queue a pending upload for processing (runs inline if IMAGE_PROCESSING_SYNC)"""
+    app = app or current_app._get_current_object()
+    if app.config.get('IMAGE_PROCESSING_SYNC'):
+        _process(app, key)
+    else:
+        _executor_for(app).submit(_process, app, key)
+
+
+@event.listens_for(db.Model, 'before_delete', propagate=True)
+def _note_deleted_images(mapper, connection, target):
+    # rows deleted directly or by a cascade (a user's posts and products)
+    for column in _columns().values():
+        if isinstance(target, column.class_):
+            state = inspect(target)
+            if column.key in state.unloaded:
+                key = connection.scalar(select(column).where(column.class_.id == target.id))
+            else:
+                key = state.dict.get(column.key)
+            if key:
+                state.session.info.setdefault('deleted_images', []).append(key)
+
+
+@event.listens_for(Session, 'after_flush')
+def _release_deleted_images(session, flush_context):
+    for key in session.info.pop('deleted_images', None) or ():
+        release(key)
+
+
+@event.listens_for(Session, 'after_commit')
+def _submit_committed_jobs(session):
+    if session.in_nested_transaction():
+        return  # a savepoint was released; wait for the real commit
+    for key in session.info.pop('image_deletes', None) or ():
+        delete_files(key)
+    jobs = session.info.pop('image_jobs', None)
+    if jobs:
+        app = current_app._get_current_object()
+        for key in jobs:
+            submit(key, app)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _discard_rolled_back_jobs(session, previous_transaction):
+    if previous_transaction.parent is not None:
+        return  # a savepoint; the outer transaction may still commit
+    session.info.pop('deleted_images', None)
+    session.info.pop('image_deletes', None)
+    for key in session.info.pop('image_jobs', None) or ():
+        raw_path = upload_path(key)
+        if os.path.exists(raw_path):
+            os.remove(raw_path)
+
+
+def resume_pending(app, min_age=300):
+    """
+    Requeue raw uploads a previous process accepted but never finished
+    Run it from one place (scripts/resume_uploads.py, the development
+    server), not from every worker.
+    Args:
+        min_age: seconds; younger files are left alone, as a pending file may
+            belong to a request that has not committed yet and a claimed one
+            to a job still processing it
+    Returns:
+        int: uploads queued
+    """
+    cutoff = time.time() - min_age
+    root = app.config['UPLOAD_FOLDER']
+    queued = 0
+    for folder in ('profile', 'blog', 'product'):
+        # stale claims (their job died) go back to pending/ first
+        claimed = os.path.join(root, CLAIMED_PREFIX, folder)
+        for name in sorted(os.listdir(claimed)) if os.path.isdir(claimed) else ():
+            path = os.path.join(claimed, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.replace(path, os.path.join(root, PENDING_PREFIX, folder, name))
+            except FileNotFoundError:
+                pass  # finished meanwhile
+        pending = os.path.join(root, PENDING_PREFIX, folder)
+        for name in sorted(os.listdir(pending)) if os.path.isdir(pending) else ():
+            try:
+                if os.path.getmtime(os.path.join(pending, name)) >= cutoff:
+                    continue
+            except FileNotFoundError:
+                continue
+            submit(f'{PENDING_PREFIX}{folder}/{name}', app)
+            queued += 1
+    return queued
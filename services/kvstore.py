@@ -0,0 +1,71 @@
+"""Connections to a shared key-value store (Redis) for caches and limiters.
+
+``connect('redis://host:6379/0')`` returns a redis-py client;
+``connect('memory://')`` returns ``MemoryStore``, an in-process stand-in
+implementing the handful of commands this app uses, so code written for
+the shared store can run and be tested without a Redis server.
+"""
+import threading
+import time
+
+
+class MemoryStore:
+    """Stand-in for a redis client: get, set(ex=), mget, incr, expire, delete"""
+
+    def __init__(self):
+        self._data = {}  # name -> (value, expires or None)
+        self._lock = threading.Lock()
+
+    def _live(self, name):
+        value, expires = self._data.get(name, (None, None))
+        if expires is not None and expires <= time.monotonic():
+            del self._data[name]
+            return None, None
+        return value, expires
+
+    def get(self, name):
+        with self._lock:
+            return self._live(name)[0]
+
+    def set(self, name, value, ex=None):
+        with self._lock:
+            self._data[name] = (value, time.monotonic() + ex if ex else None)
+
+    def mget(self, names):
+        with self._lock:
+            return [self._live(name)[0] for name in names]
+
+    def incr(self, name):
+        with self._lock:
+            value, expires = self._live(name)
+            value = int(value or 0) + 1
+            self._data[name] = (str(value).encode(), expires)
+            return value
+
+    def expire(self, name, seconds):
+        with self._lock:
+            value, _ = self._live(name)
+            if value is None:
+                return False
+            self._data[name] = (value, time.monotonic() + seconds)
+            return True
+
+    def delete(self, *names):
+        with self._lock:
+            return sum(self._data.pop(name, None) is not None for name in names)
+
+
+def connect(url, setting):
+    """
+    Client for a shared store URL
+    Args:
+        url: 'memory://' or a redis URL
+        setting: name of the config setting, for the error message
+    """
+    if url.startswith('memory://'):
+        return MemoryStore()
+    try:
+        import redis
+    except ImportError:
+        raise RuntimeError(f'{setting} = "{url}" needs redis installed (pip install redis)')
+    return redis.Redis.from_url(url)
@@ -0,0 +1,188 @@
+"""Stock reservations for marketplace orders.
+
+``Product.quantity`` is the stock still available. A checkout takes stock
+with one conditional UPDATE per product:
+
+    UPDATE products SET quantity = quantity - :n WHERE id = :id AND quantity >= :n
+
+The database checks and decrements in one step, so concurrent buyers can
+never take the same unit twice. No SELECT ... FOR UPDATE or retry loop is
+needed. Every checkout locks its products in id order, so two checkouts
+sharing products cannot deadlock. The checkout holds the stock in a
+pending order for RESERVATION_SECONDS. Confirming the order keeps it.
+Cancelling or expiring the order puts it back.
+
+Expired orders are released in batches by ``expire_reservations()``. Run
+it from scripts/expire_reservations.py on a schedule. A checkout that
+finds a product short also releases that product's expired orders first,
+so stock is never stuck behind a stale order.
+
+These functions commit their own transaction and, when stock moved,
+invalidate the cached product listings that show it.
+"""
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import func, select, update
+from extensions import db
+from models.order import Order, OrderItem
+from models.product import Product
+from services.page_cache import invalidate_pages
+
+
+class OutOfStock(Exception):
+    """Not enough stock for one of the products of a checkout"""
+
+    def __init__(self, product_id, requested):
+        super().__init__(f'Fewer than {requested} left of product {product_id}')
+        self.product_id = product_id
+        self.requested = requested
+
+
+def _take_stock(product_id, quantity):
+    """Decrement stock if enough is left; returns whether it was taken"""
+    return db.session.execute(
+        update(Product)
+        .where(Product.id == product_id, Product.quantity >= quantity)
+        # keep updated_at untouched: a sale is not an edit of the listing
+        .values(quantity=Product.quantity - quantity, updated_at=Product.updated_at),
+        execution_options={'synchronize_session': False}
+    ).rowcount > 0
+
+
+def _restore_stock(order_ids):
+    """Give back the stock held by the items of ``order_ids`` (one UPDATE)"""
+    held = (select(func.sum(OrderItem.quantity))
+            .where(OrderItem.order_id.in_(order_ids), OrderItem.product_id == Product.id)
+            .scalar_subquery())
+    db.session.execute(
+        update(Product)
+        .where(Product.id.in_(select(OrderItem.product_id).where(OrderItem.order_id.in_(order_ids))))
+        .values(quantity=Product.quantity + held, updated_at=Product.updated_at),
+        execution_options={'synchronize_session': False}
+    )
+
+
+def _claim(order_ids, status):
+    """
+    Move pending orders to ``status``, skipping any a concurrent request
+    already confirmed or released
+    Returns:
+        list: ids of the orders this call moved
+    """
+    claimed = []
+    for order_id in order_ids:
+        if db.session.execute(
+                update(Order).where(Order.id == order_id, Order.status == 'pending').values(status=status),
+                execution_options={'synchronize_session': False}).rowcount:
+            claimed.append(order_id)
+    return claimed
+
+
+def _release(order_ids, status):
+    """Cancel or expire pending orders and return their stock (call before commit)"""
+    claimed = _claim(order_ids, status)
+    if claimed:
+        _restore_stock(claimed)
+    return claimed
+
+
+def reserve(user_id, quantities, hold_seconds=None):
+    """
+    Check out one or more products in a single transaction
+    Args:
+        user_id: buyer
+        quantities: {product_id: quantity}
+        hold_seconds: how long the order stays pending (default RESERVATION_SECONDS)
+    Returns:
+        Order: the committed pending order
+    Raises:
+        OutOfStock: a product is missing or short; nothing was reserved
+        ValueError: empty checkout or a quantity below 1
+    """
+    if not quantities or any(quantity < 1 for quantity in quantities.values()):
+        raise ValueError('Order at least one unit of each product')
+    hold = hold_seconds or current_app.config.get('RESERVATION_SECONDS', 900)
+    retried = False
+    while True:
+        short = next((product_id for product_id in sorted(quantities)
+                      if not _take_stock(product_id, quantities[product_id])), None)
+        if short is None:
+            break
+        db.session.rollback()
+        # stock may only be held by orders nobody swept yet; free them and try once more
+        if retried or not expire_reservations(product_id=short):
+            raise OutOfStock(short, quantities[short])
+        retried = True
+
+    now = datetime.utcnow()
+    order = Order(user_id=user_id, status='pending', created_at=now, expires_at=now + timedelta(seconds=hold))
+    products = db.session.execute(
+        select(Product.id, Product.name, Product.price).where(Product.id.in_(quantities))).all()
+    order.items = [OrderItem(product_id=product_id, name=name, price=price, quantity=quantities[product_id])
+                   for product_id, name, price in products]
+    db.session.add(order)
+    db.session.commit()
+    invalidate_pages('products')
+    return order
+
+
+def confirm(order_id, user_id):
+    """
+    Turn a buyer's pending order into a sale (before it expires)
+    Returns:
+        bool: False if the order is not the user's, not pending or expired
+    """
+    confirmed = db.session.execute(
+        update(Order)
+        .where(Order.id == order_id, Order.user_id == user_id, Order.status == 'pending',
+               Order.expires_at > datetime.utcnow())
+        .values(status='confirmed', confirmed_at=datetime.utcnow()),
+        execution_options={'synchronize_session': False}
+    ).rowcount > 0
+    db.session.commit()
+    return confirmed
+
+
+def cancel(order_id, user_id):
+    """
+    Cancel a buyer's pending order and return its stock
+    Returns:
+        bool: False if the order is not the user's or no longer pending
+    """
+    owned = db.session.scalar(select(Order.id).where(Order.id == order_id, Order.user_id == user_id))
+    cancelled = bool(owned and _release([order_id], 'cancelled'))
+    db.session.commit()
+    if cancelled:
+        invalidate_pages('products')
+    return cancelled
+
+
+def release_user_orders(user_id):
+    """Return the stock of a user's pending orders. Call before deleting the user."""
+    _release(db.session.scalars(select(Order.id).where(Order.user_id == user_id, Order.status == 'pending')).all(),
+             'cancelled')
+
+
+def expire_reservations(product_id=None, batch_size=500, now=None):
+    """
+    Release pending orders past their deadline, ``batch_size`` per transaction
+    Args:
+        product_id: only orders holding this product
+        now: deadline to compare against (default: utcnow)
+    Returns:
+        int: number of orders expired
+    """
+    now = now or datetime.utcnow()
+    expired = 0
+    while True:
+        query = select(Order.id).where(Order.status == 'pending', Order.expires_at <= now)
+        if product_id is not None:
+            query = query.where(Order.id.in_(select(OrderItem.order_id).where(OrderItem.product_id == product_id)))
+        order_ids = db.session.scalars(query.order_by(Order.expires_at).limit(batch_size)).all()
+        expired += len(_release(order_ids, 'expired'))
+        db.session.commit()
+        if len(order_ids) < batch_size:
+            break
+    if expired:
+        invalidate_pages('products')
+    return expired
@@ -0,0 +1,151 @@
+"""Whole-page cache for anonymous visitors.
+
+Logged-out visitors all get the same HTML for public pages, so
+``@cache_page(...)`` stores the rendered response and replays it for
+PAGE_CACHE_TTL seconds. Logged-in users, pages with pending flash messages
+and anything but a plain 200 GET bypass the cache.
+
+Entries are keyed on the path, the sorted query string, the auth state and
+the current version of each *tag* the page depends on ('products',
+'posts'). ``invalidate_pages('posts')`` bumps that tag's version, so every
+page built from the old data stops matching at once; the orphaned entries
+simply age out of the LRU.
+
+PAGE_CACHE_URL picks the store: unset for an in-process LRU,
+``redis://...`` for a cache shared by all workers, or ``memory://`` for an
+in-process stand-in that goes through the same shared-store code path
+(see services/kvstore.py).
+"""
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, make_response, request, session
+from flask_login import current_user
+from services.kvstore import connect
+
+
+class LocalPageCache:
+    """In-process LRU with per-entry expiry"""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def versions(self, tags):
+        with self._lock:
+            return [self._versions.get(tag, 0) for tag in tags]
+
+    def bump(self, tags):
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+
+
+class SharedPageCache:
+    """Cache kept in a redis-py compatible store (get, set(ex=), mget, incr)"""
+
+    def __init__(self, client, prefix='agrifarma:page:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        status, mimetype, body = raw.split(b'\n', 2)
+        return int(status), mimetype.decode(), body
+
+    def set(self, key, value, ttl):
+        status, mimetype, body = value
+        self.client.set(self.prefix + key, f'{status}\n{mimetype}\n'.encode() + body, ex=ttl)
+
+    def versions(self, tags):
+        if not tags:
+            return []
+        return [int(v or 0) for v in self.client.mget([f'{self.prefix}v:{tag}' for tag in tags])]
+
+    def bump(self, tags):
+        for tag in tags:
+            self.client.incr(f'{self.prefix}v:{tag}')
+
+
+def get_page_cache():
+    """The configured page cache store"""
+    cache = current_app.extensions.get('page_cache')
+    if cache is None:
+        url = current_app.config.get('PAGE_CACHE_URL')
+        if not url:
+            cache = LocalPageCache(current_app.config.get('PAGE_CACHE_SIZE', 256))
+        else:
+            cache = SharedPageCache(connect(url, 'PAGE_CACHE_URL'))
+        current_app.extensions['page_cache'] = cache
+    return cache
+
+
+def _cacheable():
+    return (request.method == 'GET'
+            and current_app.config.get('PAGE_CACHE_TTL', 60) > 0
+            and not current_user.is_authenticated
+            and '_flashes' not in session)
+
+
+def cache_page(*tags, first_page_only=False):
+    """
+    Cache a public view's response for anonymous visitors
+    Args:
+        *tags: data the page shows ('products', 'posts'); invalidate_pages()
+            with any of them discards the cached copy
+        first_page_only: only cache requests without ?page=N (N > 1) or ?cursor=
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not _cacheable() or (first_page_only and (
+                    request.args.get('page', 1, type=int) != 1 or 'cursor' in request.args)):
+                return view(*args, **kwargs)
+
+            cache = get_page_cache()
+            versions = ','.join(f'{tag}={version}' for tag, version in zip(tags, cache.versions(tags)))
+            key = f"{request.path}?{'&'.join(sorted(request.query_string.decode().split('&')))}|anon|{versions}"
+            hit = cache.get(key)
+            if hit is not None:
+                status, mimetype, body = hit
+                response = current_app.response_class(body, status=status, mimetype=mimetype)
+                response.headers['X-Page-Cache'] = 'hit'
+                return response
+
+            response = make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.direct_passthrough and not session.modified:
+                cache.set(key, (response.status_code, response.mimetype, response.get_data()),
+                          current_app.config.get('PAGE_CACHE_TTL', 60))
+                response.headers['X-Page-Cache'] = 'miss'
+            return response
+        return wrapper
+    return decorator
+
+
+def invalidate_pages(*tags):
+    """Discard cached pages that show any of ``tags`` (call after commit)"""
+    get_page_cache().bump(tags)
@@ -0,0 +1,142 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from flask import abort, current_app
+from sqlalchemy import and_, or_, func, select, text
+from extensions import db
+
+
+class KeysetPagination:
+    """
+    One page of a newest-first listing, ordered by (created_at, id)
+
+    Shallow pages are addressed by page number (``?page=2``); past
+    KEYSET_SHALLOW_PAGES, and whenever a ``?cursor=`` is given, pages are
+    fetched by seeking from the opaque cursor instead of OFFSET scanning.
+    Neither mode runs a COUNT(*); ``total`` is an optional cheap estimate.
+    """
+
+    def __init__(self, items, per_page, page=None, next_cursor=None, prev_cursor=None, total=None):
+        self.items = items
+        self.per_page = per_page
+        self.page = page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None or (self.page or 1) > 1
+
+    @property
+    def next_args(self):
+        """url_for arguments for the next page"""
+        if self.page and self.page < current_app.config.get('KEYSET_SHALLOW_PAGES', 5):
+            return {'page': self.page + 1}
+        return {'cursor': self.next_cursor}
+
+    @property
+    def prev_args(self):
+        """url_for arguments for the previous page"""
+        if self.page:
+            return {'page': self.page - 1}
+        return {'cursor': self.prev_cursor}
+
+    @property
+    def page_numbers(self):
+        """Page numbers worth linking to around the current shallow page"""
+        if not self.page:
+            return []
+        numbers = list(range(max(1, self.page - 2), self.page + 1))
+        if self.has_next and 'page' in self.next_args:
+            numbers.append(self.page + 1)
+        return numbers
+
+
+def encode_cursor(item, direction):
+    raw = json.dumps([direction, item.created_at.isoformat(), item.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor into (direction, created_at, id); 400 if it is malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        direction, created_at, item_id = json.loads(base64.urlsafe_b64decode(padded))
+        if direction not in ('next', 'prev'):
+            raise ValueError(direction)
+        return direction, datetime.fromisoformat(created_at), int(item_id)
+    except (ValueError, TypeError, binascii.Error):
+        abort(400)
+
+
+def approximate_total(model):
+    """
+    Cheap row-count estimate for a whole table, or None if unavailable
+    Uses the highest id on SQLite (an index lookup) and the planner's
+    estimate on PostgreSQL, so it drifts from the exact count after deletes.
+    """
+    dialect = db.engine.dialect.name
+    if dialect == 'sqlite':
+        return db.session.scalar(select(func.max(model.id))) or 0
+    if dialect == 'postgresql':
+        estimate = db.session.scalar(
+            text('SELECT reltuples::bigint FROM pg_class WHERE relname = :name'),
+            {'name': model.__tablename__}
+        )
+        return max(estimate or 0, 0)
+    return None
+
+
+def paginate_newest(query, model, page=1, cursor=None, per_page=10, with_total=False):
+    """
+    Paginate a query newest first without COUNT(*) or deep OFFSET scans
+    Args:
+        query: query over ``model`` (any existing ordering is replaced)
+        model: mapped class with ``created_at`` and ``id`` columns
+        page: 1-based page number, used when no cursor is given
+        cursor: opaque token from a previous page's next/prev links
+        per_page: items per page
+        with_total: attach ``approximate_total(model)`` as ``total``
+    Returns:
+        KeysetPagination
+    """
+    newest_first = (model.created_at.desc(), model.id.desc())
+    total = approximate_total(model) if with_total else None
+
+    if not cursor:
+        page = max(page or 1, 1)
+        rows = (query.order_by(None).order_by(*newest_first)
+                .offset((page - 1) * per_page).limit(per_page + 1).all())
+        items = rows[:per_page]
+        if page > 1 and not items:
+            abort(404)
+        next_cursor = encode_cursor(items[-1], 'next') if len(rows) > per_page else None
+        return KeysetPagination(items, per_page, page=page, next_cursor=next_cursor, total=total)
+
+    direction, created_at, item_id = decode_cursor(cursor)
+    if direction == 'next':
+        seek = or_(model.created_at < created_at,
+                   and_(model.created_at == created_at, model.id < item_id))
+        rows = query.order_by(None).filter(seek).order_by(*newest_first).limit(per_page + 1).all()
+        items = rows[:per_page]
+        has_more_after, has_more_before = len(rows) > per_page, True
+    else:
+        seek = or_(model.created_at > created_at,
+                   and_(model.created_at == created_at, model.id > item_id))
+        rows = (query.order_by(None).filter(seek)
+                .order_by(model.created_at.asc(), model.id.asc()).limit(per_page + 1).all())
+        items = list(reversed(rows[:per_page]))
+        has_more_after, has_more_before = True, len(rows) > per_page
+
+    return KeysetPagination(
+        items, per_page,
+        next_cursor=encode_cursor(items[-1], 'next') if items and has_more_after else None,
+        prev_cursor=encode_cursor(items[0], 'prev') if items and has_more_before else None,
+        total=total
+    )
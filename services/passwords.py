@@ -0,0 +1,73 @@
+"""Password hashing with configurable cost, run on a bounded thread pool.
+
+PASSWORD_HASH_METHOD is any Werkzeug method string ('scrypt',
+'scrypt:32768:8:1', 'pbkdf2:sha256:600000', ...). Stored hashes made with
+other parameters keep working; ``needs_rehash()`` spots them so the login
+route can upgrade them while it has the plain password.
+
+Hashing is deliberately slow, so it runs on PASSWORD_HASH_WORKERS threads
+(hashlib releases the GIL): a burst of logins occupies at most that many
+cores, and once PASSWORD_HASH_QUEUE more are waiting, further attempts get
+``PasswordHashBusy`` at once instead of piling up.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+_executor = None
+_slots = None
+_pool_lock = threading.Lock()
+_method_prefixes = {}  # (method, salt length) -> stored prefix, e.g. 'scrypt:32768:8:1'
+
+
+class PasswordHashBusy(RuntimeError):
+    """Too many hash computations already running or queued"""
+
+
+def _config():
+    config = current_app.config
+    return (config.get('PASSWORD_HASH_METHOD', 'scrypt'), config.get('PASSWORD_SALT_LENGTH', 16))
+
+
+def _run(fn, *args):
+    global _executor, _slots
+    with _pool_lock:
+        if _executor is None:
+            workers = current_app.config.get('PASSWORD_HASH_WORKERS') or os.cpu_count() or 1
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+            _slots = threading.BoundedSemaphore(workers + current_app.config.get('PASSWORD_HASH_QUEUE', 32))
+    if not _slots.acquire(blocking=False):
+        raise PasswordHashBusy('Password hashing is saturated')
+    try:
+        return _executor.submit(fn, *args).result()
+    finally:
+        _slots.release()
+
+
+def hash_password(password):
+    """Hash a password with the configured method and salt length"""
+    method, salt_length = _config()
+    return _run(generate_password_hash, password, method, salt_length)
+
+
+def verify_password(password_hash, password):
+    """
+    Check a password against a stored hash
+    Raises:
+        PasswordHashBusy: when the hashing pool and its queue are full
+    """
+    return _run(check_password_hash, password_hash, password)
+
+
+def needs_rehash(password_hash):
+    """True if a stored hash was made with other parameters than configured now"""
+    method, salt_length = _config()
+    prefix = _method_prefixes.get((method, salt_length))
+    if prefix is None:
+        # let Werkzeug fill in the defaults ('scrypt' -> 'scrypt:32768:8:1')
+        prefix = generate_password_hash('', method, salt_length).split('$', 1)[0]
+        _method_prefixes[(method, salt_length)] = prefix
+    stored_method, _, rest = password_hash.partition('$')
+    return stored_method != prefix or len(rest.partition('$')[0]) != salt_length
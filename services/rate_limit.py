@@ -0,0 +1,132 @@
+"""Sliding-window rate limits for sign-in and registration.
+
+Each limit allows ``limit`` events per ``window`` seconds for one
+identifier (an IP address, an account name). Counts use the sliding window
+counter approximation: the current fixed window's count plus the previous
+window's count weighted by how much of it still overlaps the sliding
+window. That needs two integers per identifier instead of a timestamp log,
+yet never lets a burst straddling a window boundary through at twice the
+rate.
+
+RATE_LIMIT_URL picks the store: unset for in-process counters, or a shared
+store (``redis://...``, or ``memory://`` as a local stand-in, see
+services/kvstore.py) so all workers enforce one budget.
+"""
+import math
+import threading
+import time
+from flask import current_app
+from services.kvstore import connect
+
+
+class LocalRateStore:
+    """Per-process counters: key -> [window index, current count, previous count]"""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def _roll(self, key, index):
+        counter = self._counters.get(key)
+        if counter is None or counter[0] < index - 1:
+            return [index, 0, 0]
+        if counter[0] == index - 1:
+            return [index, 0, counter[1]]
+        return counter
+
+    def counts(self, key, index):
+        with self._lock:
+            _, current, previous = self._roll(key, index)
+        return current, previous
+
+    def incr(self, key, index, window):
+        with self._lock:
+            counter = self._counters[key] = self._roll(key, index)
+            counter[1] += 1
+            if len(self._counters) > self.max_keys:
+                # forget identifiers idle for more than a window
+                self._counters = {k: c for k, c in self._counters.items() if c[0] >= index - 1}
+
+    def reset(self, key, index):
+        with self._lock:
+            self._counters.pop(key, None)
+
+
+class SharedRateStore:
+    """Counters in a redis-py compatible store, one key per identifier and window"""
+
+    def __init__(self, client, prefix='agrifarma:rate:'):
+        self.client = client
+        self.prefix = prefix
+
+    def counts(self, key, index):
+        current, previous = self.client.mget([f'{self.prefix}{key}:{index}', f'{self.prefix}{key}:{index - 1}'])
+        return int(current or 0), int(previous or 0)
+
+    def incr(self, key, index, window):
+        name = f'{self.prefix}{key}:{index}'
+        self.client.incr(name)
+        self.client.expire(name, 2 * window)
+
+    def reset(self, key, index):
+        self.client.delete(f'{self.prefix}{key}:{index}', f'{self.prefix}{key}:{index - 1}')
+
+
+def get_store():
+    """The configured counter store"""
+    store = current_app.extensions.get('rate_limit_store')
+    if store is None:
+        url = current_app.config.get('RATE_LIMIT_URL')
+        store = SharedRateStore(connect(url, 'RATE_LIMIT_URL')) if url else LocalRateStore()
+        current_app.extensions['rate_limit_store'] = store
+    return store
+
+
+def _limit(name):
+    """(limit, window) for a configured limit, e.g. RATE_LIMITS['login-ip']"""
+    return current_app.config['RATE_LIMITS'][name]
+
+
+def retry_after(name, identifier):
+    """
+    Check a limit without counting an event
+    Returns:
+        int: seconds until another event would be allowed, or 0 if allowed now
+    """
+    limit, window = _limit(name)
+    now = time.time()
+    index, elapsed = divmod(now, window)
+    current, previous = get_store().counts(f'{name}:{identifier}', int(index))
+    weight = 1 - elapsed / window
+    if current + previous * weight < limit:
+        return 0
+    if current >= limit or previous == 0:
+        # blocked until this window ends (and its count becomes the weighted one)
+        return max(1, math.ceil(window - elapsed))
+    # the previous window's share decays linearly; find when it falls enough
+    needed = (limit - current) / previous  # weight at which we drop below the limit
+    return max(1, math.ceil((1 - needed) * window - elapsed))
+
+
+def hit(name, identifier):
+    """Count one event against a limit"""
+    _, window = _limit(name)
+    get_store().incr(f'{name}:{identifier}', int(time.time() // window), window)
+
+
+def reset(name, identifier):
+    """Forget the events counted for an identifier (e.g. failures after a successful login)"""
+    _, window = _limit(name)
+    get_store().reset(f'{name}:{identifier}', int(time.time() // window))
+
+
+def blocked(*checks):
+    """
+    Seconds to wait before any of several limits allows another event
+    Args:
+        *checks: (limit name, identifier) pairs
+    Returns:
+        int: the longest wait, 0 if every limit allows an event now
+    """
+    return max((retry_after(name, identifier) for name, identifier in checks), default=0)
@@ -0,0 +1,218 @@
+"""Reclaim storage held by uploads that nothing references any more.
+
+Deleting a row releases its image at once (see services/images.py). Files
+can still end up orphaned:
+- rows deleted before that hook existed, or with bulk SQL
+- a crash between a commit and the file deletion
+- pending uploads whose request never committed
+
+``sweep_uploads()`` finds them with an incremental mark-and-sweep. It
+streams the storage listing, plus the local ``pending/`` folder, in key
+order, and handles it ``batch_size`` files at a time:
+- mark: look up which of the batch's images are still referenced. For
+  deduplicated images that means their stored_images row, with its
+  refcount checked against the model columns. For older file names it
+  means the model columns directly.
+- sweep: delete unreferenced files older than ``grace`` seconds, drop
+  stored_images rows nothing uses, and repair refcounts that drifted.
+
+Memory is bounded by the batch size however large the tree is.
+``start_after`` resumes an interrupted sweep from the last key it reported.
+"""
+import os
+import re
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import func, or_, select, tuple_
+from extensions import db
+from models.image import StoredImage
+from services.images import CLAIMED_PREFIX, PENDING_PREFIX, _columns, upload_path
+from services.storage import LocalStorage, get_storage, walk_files
+
+VARIANT_SUFFIX = re.compile(r'-\d+$')
+DIGEST = re.compile(r'^[0-9a-f]{64}$')
+
+
+class SweepReport:
+    """Running totals of a sweep"""
+
+    def __init__(self):
+        self.scanned = 0
+        self.deleted = 0
+        self.reclaimed_bytes = 0
+        self.rows_deleted = 0
+        self.refcounts_repaired = 0
+        self.batches = 0
+        self.last_key = None
+
+
+def _identify(key):
+    """
+    Which image a stored file belongs to
+    Returns:
+        tuple: ('digest', folder, sha256) for deduplicated images,
+        ('legacy', folder, path without extension) for older names, or
+        None for files the sweeper does not own (pending temp files and
+        anything outside the upload folders)
+    """
+    path = key
+    for prefix in (CLAIMED_PREFIX, PENDING_PREFIX):
+        if path.startswith(prefix):
+            path = path[len(prefix):]
+            break
+    folder = path.split('/', 1)[0]
+    if folder not in _columns() or '/' not in path:
+        return None
+    stem = os.path.splitext(path)[0]
+    base = VARIANT_SUFFIX.sub('', os.path.basename(stem))  # '<name>-400' is a variant of '<name>'
+    if DIGEST.match(base):
+        return 'digest', folder, base
+    return 'legacy', folder, stem
+
+
+def _image_of(ident):
+    if ident and ident[0] == 'legacy':
+        return ident[:2] + (VARIANT_SUFFIX.sub('', ident[2]),)
+    return ident
+
+
+def _legacy_stem(value):
+    """Path without extension that a legacy column value refers to"""
+    return os.path.splitext(value.partition('#')[0].replace('\\', '/'))[0]
+
+
+def _mark(batch, grace):
+    """
+    Decide which files of a batch are garbage, fixing stored_images on the way
+    Returns:
+        tuple: (files to delete, stored_images rows deleted, refcounts repaired)
+    """
+    columns = _columns()
+    row_cutoff = datetime.utcnow() - timedelta(seconds=grace)
+    digests = {(ident[1], ident[2]) for _, ident, _, _ in batch if ident and ident[0] == 'digest'}
+    live_digests, rows_deleted, repaired = set(), 0, 0
+    if digests:
+        rows = StoredImage.query.filter(tuple_(StoredImage.folder, StoredImage.digest).in_(digests)).all()
+        for folder in {row.folder for row in rows}:
+            keys = [row.key for row in rows if row.folder == folder]
+            column = columns[folder]
+            references = dict(db.session.execute(
+                select(column, func.count()).where(column.in_(keys)).group_by(column)).all())
+            for row in (row for row in rows if row.folder == folder):
+                count = references.get(row.key, 0)
+                if count == 0 and row.created_at and row.created_at < row_cutoff:
+                    db.session.delete(row)
+                    rows_deleted += 1
+                    continue
+                live_digests.add((row.folder, row.digest))
+                if count and count != row.refcount:
+                    row.refcount = count
+                    repaired += 1
+
+    legacy = {}
+    for _, ident, _, _ in batch:
+        if ident and ident[0] == 'legacy':
+            legacy.setdefault(ident[1], set()).add(ident[2])
+    live_legacy = set()
+    for folder, stems in legacy.items():
+        normalized = func.replace(columns[folder], '\\', '/')
+        patterns = {f'{stem}.%' for stem in stems} | {f'{VARIANT_SUFFIX.sub("", stem)}.%' for stem in stems}
+        values = db.session.scalars(select(columns[folder]).where(or_(*(normalized.like(p) for p in patterns))))
+        live_legacy.update((folder, _legacy_stem(value)) for value in values)
+
+    garbage = []
+    file_cutoff = time.time() - grace
+    for key, ident, size, mtime in batch:
+        if mtime >= file_cutoff:
+            continue  # may belong to an upload still in flight
+        if ident is None:
+            if key.startswith(PENDING_PREFIX):
+                garbage.append((key, size))  # abandoned temp file of an upload
+            continue
+        if ident[0] == 'digest':
+            live = (ident[1], ident[2]) in live_digests
+        else:
+            live = ((ident[1], ident[2]) in live_legacy
+                    or (ident[1], VARIANT_SUFFIX.sub('', ident[2])) in live_legacy)
+        if not live:
+            garbage.append((key, size))
+    return garbage, rows_deleted, repaired
+
+
+def _remove(storage, key):
+    if key.startswith(PENDING_PREFIX):
+        root, path = upload_path(''), upload_path(key)
+        if os.path.exists(path):
+            os.remove(path)
+    elif isinstance(storage, LocalStorage):
+        root, path = storage.root, storage.path(key)
+        storage.delete(key)
+    else:
+        storage.delete(key)
+        return
+    # drop the shard directories the file leaves empty
+    directory = os.path.dirname(path)
+    while os.path.normpath(directory) != os.path.normpath(root):
+        try:
+            os.rmdir(directory)
+        except OSError:
+            break
+        directory = os.path.dirname(directory)
+
+
+def _stored_files(storage, start_after):
+    """Every file under the upload folders and pending/, in key order"""
+    pending = PENDING_PREFIX.rstrip('/')
+    for prefix in sorted(list(_columns()) + [pending]):
+        if prefix == pending:
+            # raw uploads always wait on local disk, whatever the storage
+            yield from walk_files(upload_path(''), prefix, start_after)
+        else:
+            yield from storage.list(prefix + '/', start_after)
+
+
+def sweep_uploads(batch_size=1000, grace=3600, dry_run=False, start_after=None, progress=None):
+    """
+    Delete uploaded files no row references any more
+    Args:
+        batch_size: files marked and swept together (bounds memory)
+        grace: leave files and stored_images rows younger than this many
+            seconds alone, they may belong to an upload still in flight
+        dry_run: report what would be reclaimed without deleting anything
+        start_after: resume after this key (a previous run's ``last_key``)
+        progress: optional callable receiving the report after each batch
+    Returns:
+        SweepReport
+    """
+    storage = get_storage()
+    report = SweepReport()
+    batch = []
+
+    def flush():
+        garbage, rows_deleted, repaired = _mark(batch, grace)
+        if dry_run:
+            db.session.rollback()
+        else:
+            db.session.commit()
+            for key, _ in garbage:
+                _remove(storage, key)
+        report.deleted += len(garbage)
+        report.reclaimed_bytes += sum(size for _, size in garbage)
+        report.rows_deleted += rows_deleted
+        report.refcounts_repaired += repaired
+        report.batches += 1
+        report.last_key = batch[-1][0]
+        batch.clear()
+        if progress:
+            progress(report)
+
+    for key, size, mtime in _stored_files(storage, start_after):
+        report.scanned += 1
+        ident = _identify(key)
+        # an image's files list next to each other; keep them in one batch
+        if len(batch) >= batch_size and _image_of(ident) != _image_of(batch[-1][1]):
+            flush()
+        batch.append((key, ident, size, mtime))
+    if batch:
+        flush()
+    return report
@@ -0,0 +1,228 @@
+import re
+from flask import current_app
+from sqlalchemy import and_, or_, text
+from sqlalchemy.orm import joinedload
+from extensions import db
+from models.blog import Post
+from models.product import Product
+
+
+class SearchIndex:
+    """A searchable model: which columns are indexed and how they are weighted"""
+
+    def __init__(self, model, fields, weights):
+        self.model = model
+        self.fields = fields
+        self.weights = weights
+
+    @property
+    def table(self):
+        return f'{self.model.__tablename__}_fts'
+
+
+INDEXES = {
+    'products': SearchIndex(Product, ('name', 'description', 'location'), (10.0, 1.0, 3.0)),
+    'posts': SearchIndex(Post, ('title', 'content'), (5.0, 1.0)),
+}
+
+
+def _terms(query):
+    return re.findall(r'\w+', query.lower())[:8]
+
+
+def _escape_like(term):
+    """A term matched literally by LIKE ... ESCAPE '\\'"""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class LikeBackend:
+    """Portable fallback: every term must appear in some field (LIKE), newest first"""
+
+    name = 'like'
+
+    def index(self, kind, obj):
+        pass
+
+    def index_rows(self, kind, rows):
+        pass
+
+    def remove(self, kind, ids):
+        pass
+
+    def search(self, kind, query, limit, offset):
+        spec = INDEXES[kind]
+        model = spec.model
+        clauses = [or_(*(getattr(model, field).ilike(f'%{_escape_like(term)}%', escape='\\') for field in spec.fields))
+                   for term in _terms(query)]
+        if not clauses:
+            return []
+        return list(db.session.scalars(
+            db.select(model.id).where(and_(*clauses))
+            .order_by(model.created_at.desc(), model.id.desc())
+            .limit(limit).offset(offset)
+        ))
+
+
+class SQLiteFTSBackend:
+    """SQLite FTS5 tables (one per index, rowid = model id) ranked with bm25"""
+
+    name = 'fts5'
+
+    @staticmethod
+    def create_schema(conn):
+        for spec in INDEXES.values():
+            conn.execute(text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {spec.table} USING fts5("
+                f"{', '.join(spec.fields)}, prefix='2 3', tokenize='unicode61 remove_diacritics 2')"
+            ))
+
+    @staticmethod
+    def rebuild(conn):
+        """Repopulate every FTS table from its source table"""
+        for spec in INDEXES.values():
+            columns = ', '.join(spec.fields)
+            conn.execute(text(f'DELETE FROM {spec.table}'))
+            conn.execute(text(
+                f'INSERT INTO {spec.table}(rowid, {columns}) '
+                f'SELECT id, {columns} FROM {spec.model.__tablename__}'
+            ))
+            # merge the segments left by the bulk load into one b-tree
+            conn.execute(text(f"INSERT INTO {spec.table}({spec.table}) VALUES ('optimize')"))
+
+    def index(self, kind, obj):
+        spec = INDEXES[kind]
+        self.remove(kind, [obj.id])
+        columns = ', '.join(spec.fields)
+        params = ', '.join(f':{field}' for field in spec.fields)
+        db.session.execute(
+            text(f'INSERT INTO {spec.table}(rowid, {columns}) VALUES (:id, {params})'),
+            dict({field: getattr(obj, field) for field in spec.fields}, id=obj.id)
+        )
+
+    def index_rows(self, kind, rows):
+        spec = INDEXES[kind]
+        columns = ', '.join(spec.fields)
+        params = ', '.join(f':{field}' for field in spec.fields)
+        db.session.execute(text(f'INSERT INTO {spec.table}(rowid, {columns}) VALUES (:id, {params})'),
+                           [{name: row[name] for name in ('id',) + spec.fields} for row in rows])
+
+    def remove(self, kind, ids):
+        ids = list(ids)
+        if ids:
+            db.session.execute(
+                text(f'DELETE FROM {INDEXES[kind].table} WHERE rowid IN ({", ".join(str(int(i)) for i in ids)})')
+            )
+
+    def search(self, kind, query, limit, offset):
+        spec = INDEXES[kind]
+        # Quote every term so user input can't inject FTS syntax. Only the last
+        # (possibly half-typed) word is prefix-matched: FTS5 materializes the
+        # whole doclist for a prefix, which is costly for common words.
+        terms = [f'"{term}"' for term in _terms(query)]
+        if not terms:
+            return []
+        terms[-1] += '*'
+        match = ' '.join(terms)
+        weights = ', '.join(str(weight) for weight in spec.weights)
+        # Rank only the newest SEARCH_RANK_WINDOW matches: FTS5 walks rowids
+        # newest first and stops there, so a word found in half the catalog
+        # costs the same as a rare one.
+        window = max(current_app.config.get('SEARCH_RANK_WINDOW', 500), offset + limit)
+        return list(db.session.scalars(
+            text(f'SELECT rowid FROM ('
+                 f'SELECT rowid, bm25({spec.table}, {weights}) AS score FROM {spec.table} '
+                 f'WHERE {spec.table} MATCH :match ORDER BY rowid DESC LIMIT :window'
+                 f') ORDER BY score LIMIT :limit OFFSET :offset'),
+            {'match': match, 'window': window, 'limit': limit, 'offset': offset}
+        ))
+
+
+BACKENDS = {backend.name: backend for backend in (SQLiteFTSBackend, LikeBackend)}
+
+
+def get_backend():
+    """The configured backend (SEARCH_BACKEND), FTS5 by default on SQLite"""
+    backend = current_app.extensions.get('search_backend')
+    if backend is None:
+        name = current_app.config.get('SEARCH_BACKEND')
+        if not name:
+            name = 'fts5' if db.engine.dialect.name == 'sqlite' else 'like'
+        backend = current_app.extensions['search_backend'] = BACKENDS[name]()
+    return backend
+
+
+def index_document(kind, obj):
+    """Add or refresh one product/post in the search index (call before commit)"""
+    get_backend().index(kind, obj)
+
+
+def index_new_rows(kind, rows):
+    """
+    Add freshly inserted products/posts to the search index in one executemany
+    (call before commit)
+    Args:
+        kind: 'products' or 'posts'
+        rows: dicts holding ``id`` and the indexed fields
+    """
+    if rows:
+        get_backend().index_rows(kind, rows)
+
+
+def remove_documents(kind, ids):
+    """Drop products/posts from the search index (call before commit)"""
+    get_backend().remove(kind, ids)
+
+
+def remove_user_documents(user_id):
+    """Drop everything a user authored, ahead of deleting the user"""
+    for kind, spec in INDEXES.items():
+        ids = db.session.scalars(db.select(spec.model.id).where(spec.model.user_id == user_id))
+        remove_documents(kind, ids)
+
+
+class SearchResults:
+    """A page of ranked results; same interface as KeysetPagination for templates"""
+
+    total = None
+
+    def __init__(self, items, page, has_next):
+        self.items = items
+        self.page = page
+        self.has_next = has_next
+
+    @property
+    def has_prev(self):
+        return self.page > 1
+
+    @property
+    def next_args(self):
+        return {'page': self.page + 1}
+
+    @property
+    def prev_args(self):
+        return {'page': self.page - 1}
+
+    @property
+    def page_numbers(self):
+        numbers = list(range(max(1, self.page - 2), self.page + 1))
+        return numbers + [self.page + 1] if self.has_next else numbers
+
+
+def search(kind, query, page=1, per_page=12):
+    """
+    Ranked search over products or posts
+    Args:
+        kind: 'products' or 'posts'
+        query: free text; every word must match, the last one as a prefix
+        page: 1-based page number
+        per_page: results per page
+    Returns:
+        SearchResults with the matching models, best match first
+    """
+    page = max(page, 1)
+    ids = get_backend().search(kind, query, limit=per_page + 1, offset=(page - 1) * per_page)
+    model = INDEXES[kind].model
+    found = {obj.id: obj for obj in
+             model.query.options(joinedload(model.user)).filter(model.id.in_(ids[:per_page]))}
+    items = [found[i] for i in ids[:per_page] if i in found]
+    return SearchResults(items, page, has_next=len(ids) > per_page)
@@ -0,0 +1,62 @@
+import threading
+import time
+from flask import current_app
+from sqlalchemy import func
+from extensions import db
+from models.user import User
+from models.blog import Post
+
+ROLES = ('admin', 'consultant', 'farmer', 'vendor', 'customer')
+
+_lock = threading.Lock()
+_cache = {'stats': None, 'expires': 0.0, 'generation': 0}
+
+
+def _compute_stats():
+    role_stats = dict.fromkeys(ROLES, 0)
+    role_stats.update(db.session.query(User.role, func.count(User.id)).group_by(User.role).all())
+
+    total_posts, total_comments, total_likes = db.session.query(
+        func.count(Post.id),
+        func.coalesce(func.sum(Post.comment_count), 0),
+        func.coalesce(func.sum(Post.like_count), 0)
+    ).one()
+
+    return {
+        'total_users': sum(role_stats.values()),
+        'total_posts': total_posts,
+        'total_comments': total_comments,
+        'total_likes': total_likes,
+        'role_stats': role_stats
+    }
+
+
+def dashboard_stats():
+    """
+    Site-wide totals for the admin dashboard
+    Returns:
+        dict: total_users, total_posts, total_comments, total_likes and a
+        role -> count mapping under role_stats
+
+    Computed with one GROUP BY over users and one aggregate over posts, then
+    cached for STATS_CACHE_TTL seconds or until invalidate_stats() is called.
+    """
+    now = time.monotonic()
+    with _lock:
+        if _cache['stats'] is not None and now < _cache['expires']:
+            return _cache['stats']
+        generation = _cache['generation']
+    stats = _compute_stats()
+    with _lock:
+        # don't store a result that a concurrent write already invalidated
+        if generation == _cache['generation']:
+            _cache['stats'] = stats
+            _cache['expires'] = now + current_app.config.get('STATS_CACHE_TTL', 30)
+    return stats
+
+
+def invalidate_stats():
+    """Drop the cached dashboard stats after users, posts, comments or likes change"""
+    with _lock:
+        _cache['stats'] = None
+        _cache['generation'] += 1
@@ -0,0 +1,180 @@
+"""Where processed images live.
+
+``get_storage()`` returns the backend selected by ``UPLOAD_STORAGE``:
+
+- ``local`` (default): files under ``UPLOAD_FOLDER``, served from /assets.
+- ``s3``: any S3-compatible bucket. Uses boto3 when ``S3_ENDPOINT_URL`` is
+  an http(s) URL, or ``DirectoryS3Client`` (a local stand-in with the same
+  method signatures) when it is ``file:///some/dir``.
+
+Keys are relative paths such as ``product/ab/cd/<sha256>.jpg``; the two
+leading hash pairs shard directories so no folder grows unbounded.
+
+Both backends can also ``list(prefix, start_after)`` their files as
+(key, size, mtime), streamed in a stable order, for the upload sweeper in
+services/reclaim.py.
+"""
+import mimetypes
+import os
+import shutil
+from datetime import datetime, timezone
+from flask import current_app
+from services.assets import asset_url
+
+CACHE_FOREVER = 'public, max-age=31536000, immutable'
+
+
+def walk_files(root, prefix='', start_after=None):
+    """
+    Stream the files under ``root/prefix`` one directory listing at a time
+    Args:
+        root: directory the keys are relative to
+        prefix: sub-directory to walk ('' for everything)
+        start_after: resume after this key (keys compare path component by
+            path component, which is the order the walk yields them in)
+    Yields:
+        tuple: (key, size in bytes, modification time)
+    """
+    after = start_after.split('/') if start_after else None
+
+    def walk(relative):
+        try:
+            entries = sorted(os.scandir(os.path.join(root, relative)), key=lambda entry: entry.name)
+        except FileNotFoundError:
+            return
+        for entry in entries:
+            key = f'{relative}/{entry.name}' if relative else entry.name
+            parts = key.split('/')
+            if entry.is_dir(follow_symlinks=False):
+                if after is None or parts >= after[:len(parts)]:
+                    yield from walk(key)
+            elif entry.is_file(follow_symlinks=False) and (after is None or parts > after):
+                stat = entry.stat()
+                yield key, stat.st_size, stat.st_mtime
+
+    yield from walk(prefix.strip('/'))
+
+
+def content_key(folder, digest, ext):
+    """Sharded, content-addressed key for an image"""
+    return f'{folder}/{digest[:2]}/{digest[2:4]}/{digest}{ext}'
+
+
+class LocalStorage:
+    name = 'local'
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, key):
+        return os.path.join(self.root, key)
+
+    def put(self, key, source_path):
+        """Move a finished file into place"""
+        destination = self.path(key)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        os.replace(source_path, destination)
+
+    def open(self, key):
+        return open(self.path(key), 'rb')
+
+    def delete(self, key):
+        if os.path.exists(self.path(key)):
+            os.remove(self.path(key))
+
+    def url(self, key):
+        return asset_url('static', filename='uploads/' + key)
+
+    def list(self, prefix='', start_after=None):
+        return walk_files(self.root, prefix, start_after)
+
+
+class S3Storage:
+    name = 's3'
+
+    def __init__(self, client, bucket, public_url):
+        self.client = client
+        self.bucket = bucket
+        self.public_url = public_url.rstrip('/')
+
+    def put(self, key, source_path):
+        content_type = mimetypes.guess_type(key)[0] or 'application/octet-stream'
+        self.client.upload_file(source_path, self.bucket, key,
+                                ExtraArgs={'ContentType': content_type, 'CacheControl': CACHE_FOREVER})
+        os.remove(source_path)
+
+    def open(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=key)['Body']
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def url(self, key):
+        return f'{self.public_url}/{key}'
+
+    def list(self, prefix='', start_after=None):
+        while True:
+            page = self.client.list_objects_v2(Bucket=self.bucket, Prefix=prefix, StartAfter=start_after or '')
+            for item in page.get('Contents', ()):
+                yield item['Key'], item['Size'], item['LastModified'].timestamp()
+                start_after = item['Key']
+            if not page.get('IsTruncated'):
+                return
+
+
+class DirectoryS3Client:
+    """Stand-in for a boto3 S3 client that keeps buckets as local directories"""
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, bucket, key):
+        return os.path.join(self.root, bucket, key)
+
+    def upload_file(self, Filename, Bucket, Key, ExtraArgs=None):
+        destination = self._path(Bucket, Key)
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        shutil.copyfile(Filename, destination)
+
+    def get_object(self, Bucket, Key):
+        return {'Body': open(self._path(Bucket, Key), 'rb')}
+
+    def delete_object(self, Bucket, Key):
+        path = self._path(Bucket, Key)
+        if os.path.exists(path):
+            os.remove(path)
+        return {}
+
+    def list_objects_v2(self, Bucket, Prefix='', StartAfter='', MaxKeys=1000):
+        contents = []
+        for key, size, mtime in walk_files(os.path.join(self.root, Bucket), start_after=StartAfter or None):
+            if key.startswith(Prefix):
+                contents.append({'Key': key, 'Size': size,
+                                 'LastModified': datetime.fromtimestamp(mtime, timezone.utc)})
+                if len(contents) == MaxKeys:
+                    return {'Contents': contents, 'IsTruncated': True}
+        return {'Contents': contents, 'IsTruncated': False}
+
+
+def _s3_client(endpoint_url):
+    if endpoint_url and endpoint_url.startswith('file://'):
+        return DirectoryS3Client(endpoint_url[len('file://'):])
+    try:
+        import boto3
+    except ImportError:
+        raise RuntimeError('UPLOAD_STORAGE = "s3" needs boto3 installed (pip install boto3)')
+    return boto3.client('s3', endpoint_url=endpoint_url)
+
+
+def get_storage():
+    """The configured storage backend for processed images"""
+    storage = current_app.extensions.get('upload_storage')
+    if storage is None:
+        config = current_app.config
+        if config.get('UPLOAD_STORAGE', 'local') == 's3':
+            storage = S3Storage(_s3_client(config.get('S3_ENDPOINT_URL')),
+                                config['S3_BUCKET'], config['S3_PUBLIC_URL'])
+        else:
+            storage = LocalStorage(config['UPLOAD_FOLDER'])
+        current_app.extensions['upload_storage'] = storage
+    return storage